@@ -1,7 +1,22 @@
+import json
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
-from main import execute_process
+from constants import ServerConfig, JobConfig
+from main import execute_process_async, execute_batch_process_async, execute_process_stream, score_analysis, get_cached_analysis
+from utils.concurrency import analysis_limiter, QueueFullError
+from utils.jobs import JobManager, JOB_STAGES
+from utils.job_store import build_job_store
+from utils.raw_metrics_store import raw_metrics_store
+from utils.screener_store import get_screener_store
+from utils.metrics import render_metrics
+from utils.single_flight import single_flight
+from utils.rate_limiter import rate_limit_stats
+from utils.revalidate import background_refresher
+from utils.hedging import hedge_stats
+from utils.request_validation import validate_company_request, validate_peers_cfg
 
 
 logging.basicConfig(
@@ -19,6 +34,28 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 app = FastAPI()
 
 
+async def run_analysis_job(request: dict, progress):
+    # los trabajos comparten el limite de analisis simultaneos del worker,
+    # su cola ya esta acotada por el JobManager
+    async with analysis_limiter.slot(limit_queue=False):
+        return await execute_process_async(
+            ticker=request.get("ticker"),
+            financial_weights=request.get("financial_weights"),
+            peers=request.get("peers"),
+            multiples_weights=request.get("multiples_weights"),
+            progress=progress,
+            time_budget=request.get("time_budget_seconds", ServerConfig.ANALYSIS_TIME_BUDGET_SECONDS)
+        )
+
+
+job_manager = JobManager(
+    store=build_job_store(),
+    workers=JobConfig.WORKERS,
+    runner=run_analysis_job,
+    max_queue=JobConfig.MAX_QUEUED
+)
+
+
 @app.middleware('http')
 async def log_requests(request, call_next):
     logging.info(f'[POST] Received request: {request.method} {request.url.path}')
@@ -35,14 +72,248 @@ async def app_analyze_zone(request: dict) -> dict:
     weights = request.get("financial_weights")
     peers_cfg = request.get("peers")
     multiples_weights = request.get("multiples_weights")
+    time_budget = request.get("time_budget_seconds", ServerConfig.ANALYSIS_TIME_BUDGET_SECONDS)
 
     try:
-        response = execute_process(
+        # analisis reciente: se responde sin descargas (y se refresca en
+        # segundo plano si ya no esta vigente)
+        response = get_cached_analysis(
             ticker=ticker,
             financial_weights=weights,
             peers=peers_cfg,
             multiples_weights=multiples_weights
         )
+        if response is not None:
+            return response
+
+        async with analysis_limiter.slot():
+            response = await execute_process_async(
+                ticker=ticker,
+                financial_weights=weights,
+                peers=peers_cfg,
+                multiples_weights=multiples_weights,
+                time_budget=time_budget
+            )
+        response["metadata"]["cache"] = {"status": "miss", "age_seconds": 0}
         return response
+    except QueueFullError as e:
+        logging.warning(f"Request rechazada: {e}")
+        return JSONResponse(status_code=503, content={"response": str(e), **analysis_limiter.stats()})
     except Exception as e:
-        return {"response": e}
\ No newline at end of file
+        return {"response": e}
+
+
+@app.post("/api/analyze_company/stream/")
+async def app_analyze_company_stream(request: dict, format: str="ndjson"):
+    """Mismo analisis de /api/analyze_company/, entregado por secciones a medida
+    que termina cada etapa (financials.income, financials.balance, ...).
+
+    Con `format=ndjson` cada linea es {"section", "data"}; con `format=sse` se
+    usan Server-Sent Events con `event: <section>`. Si el analisis falla se
+    emite la seccion `error`.
+    """
+    if format not in ("ndjson", "sse"):
+        return JSONResponse(status_code=400, content={"response": f"Formato no soportado: {format}"})
+
+    slot = analysis_limiter.slot()
+    try:
+        await slot.__aenter__()
+    except QueueFullError as e:
+        logging.warning(f"Request rechazada: {e}")
+        return JSONResponse(status_code=503, content={"response": str(e), **analysis_limiter.stats()})
+
+    def _encode(section: str, data) -> str:
+        if format=="sse":
+            return f"event: {section}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+        return json.dumps({"section": section, "data": jsonable_encoder(data)}) + "\n"
+
+    async def _stream():
+        try:
+            async for section, data in execute_process_stream(
+                ticker=request.get("ticker"),
+                financial_weights=request.get("financial_weights"),
+                peers=request.get("peers"),
+                multiples_weights=request.get("multiples_weights"),
+                time_budget=request.get("time_budget_seconds", ServerConfig.ANALYSIS_TIME_BUDGET_SECONDS)
+            ):
+                yield _encode(section, data)
+        except Exception as e:
+            logging.warning(f"Error en el analisis por secciones - {e}")
+            yield _encode("error", str(e))
+        finally:
+            await slot.__aexit__(None, None, None)
+
+    media_type = "text/event-stream" if format=="sse" else "application/x-ndjson"
+    return StreamingResponse(_stream(), media_type=media_type)
+
+
+@app.post("/api/analyze_companies/")
+async def app_analyze_companies(request: dict):
+    """Analiza varias empresas en una sola request, compartiendo las descargas
+    (competidores, estados financieros, precios y tasas de cambio) entre ellas.
+
+    El body es {"companies": [<request de /api/analyze_company/>, ...]} y la
+    respuesta es NDJSON: una linea {"ticker", "response"} o {"ticker", "error"}
+    por empresa, en el orden en que van terminando los analisis.
+    """
+    companies = request.get("companies") or []
+    if not isinstance(companies, list):
+        return JSONResponse(status_code=400, content={"response": "`companies` debe ser una lista"})
+    if len(companies)>ServerConfig.MAX_BATCH_COMPANIES:
+        return JSONResponse(
+            status_code=400,
+            content={"response": f"Maximo {ServerConfig.MAX_BATCH_COMPANIES} empresas por request"}
+        )
+
+    # se valida todo el lote antes de responder: un error dentro del stream
+    # cortaria la respuesta despues de enviar el status 200
+    for i, company in enumerate(companies):
+        try:
+            validate_company_request(company)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"response": f"companies[{i}]: {e}"})
+
+    # cada empresa ocupa su propio cupo del limitador: el lote se rechaza
+    # completo si no cabe en la cola
+    if not analysis_limiter.has_room(len(companies)):
+        analysis_limiter.rejected += 1
+        message = f"Cola de analisis llena ({analysis_limiter.queued} en espera) para {len(companies)} empresas"
+        logging.warning(f"Request rechazada: {message}")
+        return JSONResponse(status_code=503, content={"response": message, **analysis_limiter.stats()})
+
+    logging.info(f"Analisis agrupado de {len(companies)} empresas")
+
+    async def _stream():
+        async for ticker, response, error in execute_batch_process_async(companies, limiter=analysis_limiter):
+            line = {"ticker": ticker}
+            if error is None:
+                line["response"] = response
+            else:
+                line["error"] = str(error)
+            yield json.dumps(jsonable_encoder(line)) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/api/rescore/")
+async def app_rescore(request: dict):
+    """Recalcula los scores de un analisis ya ejecutado con otros pesos, sin
+    descargas. Mismo body de /api/analyze_company/; el ticker y los
+    competidores deben coincidir con un analisis previo (404 si no existe).
+    Si `peers.custom` es un diccionario se usan sus pesos por competidor."""
+
+    ticker = request.get("ticker")
+    peers_cfg = request.get("peers")
+    try:
+        if not isinstance(ticker, str) or not ticker:
+            raise ValueError("`ticker` debe ser un texto no vacio")
+        validate_peers_cfg(peers_cfg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    entry = raw_metrics_store.get(ticker, peers_cfg)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No hay un analisis previo para: {ticker}")
+
+    raw_metrics, created_at = entry
+    peers_weights = None
+    if isinstance(peers_cfg["custom"], dict):
+        peers_weights = {k: v["weight"] for k, v in peers_cfg["custom"].items()}
+
+    response = score_analysis(
+        raw_metrics,
+        financial_weights=request.get("financial_weights"),
+        multiples_weights=request.get("multiples_weights"),
+        peers_weights=peers_weights
+    )
+    response["metadata"] = {"raw_metrics_created_at": created_at}
+
+    return response
+
+
+@app.post("/api/screen/")
+async def app_screen(request: dict):
+    """Consulta el screener precalculado (precompute_universe.py), sin descargas.
+
+    Body: {"filters": [{"field": "score_price_historic", "op": ">", "value": 7}],
+    "sort": "score_financial", "order": "desc", "limit": 50}
+    """
+    try:
+        rows = get_screener_store().query(
+            filters=request.get("filters"),
+            sort=request.get("sort", "score_financial"),
+            order=request.get("order", "desc"),
+            limit=request.get("limit", 50)
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"results": rows, "metadata": get_screener_store().stats()}
+
+
+@app.post("/api/jobs/", status_code=202)
+async def app_submit_job(request: dict):
+    """Encola el analisis de una empresa (mismo body de /api/analyze_company/)
+    y retorna el id del trabajo sin esperar el resultado"""
+    try:
+        job = job_manager.submit(request)
+    except QueueFullError as e:
+        logging.warning(f"Trabajo rechazado: {e}")
+        return JSONResponse(status_code=503, content={"response": str(e), **job_manager.stats()})
+
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def app_job_status(job_id: str) -> dict:
+    """Estado y progreso por etapa de un trabajo"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "progress": {stage: stage in job["stages"] for stage in JOB_STAGES},
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def app_job_result(job_id: str):
+    """Resultado de un trabajo terminado (mismo formato de /api/analyze_company/)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {job_id}")
+    if job["status"]=="error":
+        return JSONResponse(status_code=500, content={"job_id": job_id, "status": job["status"], "error": job["error"]})
+    if job["status"]!="done":
+        return JSONResponse(status_code=409, content={"job_id": job_id, "status": job["status"]})
+
+    return job["result"]
+
+
+@app.get("/api/status/")
+async def app_status() -> dict:
+    """Estado del worker: analisis en ejecucion y en cola, descargas unidas
+    entre requests concurrentes, limites actuales por host, refrescos en
+    segundo plano y descargas duplicadas"""
+    return {
+        "analysis": analysis_limiter.stats(),
+        "jobs": job_manager.stats(),
+        "single_flight": single_flight.stats(),
+        "rate_limits": rate_limit_stats(),
+        "background_refresh": background_refresher.stats(),
+        "hedging": hedge_stats(),
+    }
+
+
+@app.get("/metrics")
+async def app_metrics():
+    """Metricas en formato Prometheus: duracion por etapa del analisis y por
+    consulta a fuentes externas (con hit/miss de los caches locales). Son por
+    proceso, con varios workers de uvicorn cada uno expone las suyas"""
+    content, content_type = render_metrics()
+    return Response(content=content, headers={"Content-Type": content_type})
@@ -0,0 +1,142 @@
+"""Benchmark del scoring vectorizado (`utils.batch_scoring`) vs el scoring por
+ticker de los handlers, sobre datos sinteticos de muchos tickers.
+
+Valida que los scores sean identicos (crecimiento, reglas del balance,
+margenes vs competencia y rank de multiplos) y compara los tiempos.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_batch_scoring.py [--tickers 2000] [--peers 5]
+"""
+import sys
+import time
+import logging
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from constants import Multiples
+from utils.growth import score_growth
+from utils.batch_scoring import (
+    BALANCE_RULES,
+    stack_periods,
+    growth_scores,
+    balance_scores,
+    margin_beat_scores,
+    multiple_rank_scores
+)
+from handlers.balance_handler import score_balance_general
+from handlers.income_handler import score_margins_competitors
+
+
+def synthetic_statements(n_tickers: int, rng):
+    """Estados financieros anuales (4 a 10 periodos, del mas reciente al mas antiguo)"""
+    kpis = ["Revenue", "Gross Profit", "Operating Income", "Net Income"]
+    frames = []
+    for _ in range(n_tickers):
+        n_periods = rng.integers(3, 11)
+        values = rng.uniform(-50, 1000, (n_periods, len(kpis))).round(1)
+        frames.append(pd.DataFrame(values, columns=kpis))
+    return frames, kpis
+
+
+def per_ticker_growth(frames):
+    return np.array([np.nan if (s := score_growth(frame)[0]) is None else s for frame in frames])
+
+
+def per_ticker_balance(values):
+    scores = []
+    for row in values:
+        kpis_rules = {
+            kpi: {"value": value, "rule": rule}
+            for (kpi, rule, _), value in zip(BALANCE_RULES, row)
+        }
+        scores.append(score_balance_general(kpis_rules)[0])
+    return np.array(scores)
+
+
+def per_ticker_margins(ticker_margins, peer_margins, peer_weights=None):
+    scores = []
+    for i, (margin_interes, margins) in enumerate(zip(ticker_margins, peer_margins)):
+        # los competidores sin margenes (NaN) son los descartados
+        beat_peers = {
+            j: [1 if m_t>m_p else 0 for m_t, m_p in zip(margin_interes, margin_peer)]
+            for j, margin_peer in enumerate(margins)
+            if not np.isnan(margin_peer).all()
+        }
+        peers_weights = None if peer_weights is None else dict(enumerate(peer_weights[i]))
+        scores.append(score_margins_competitors(beat_peers, peers_weights))
+    return np.array(scores)
+
+
+def per_ticker_ranks(multiples):
+    scores = []
+    for group in multiples:
+        compare_multiples = pd.DataFrame(group, columns=Multiples.KPIS)
+        for ratio in Multiples.KPIS:
+            compare_multiples[ratio] = np.where(compare_multiples[ratio]<0, np.nan, compare_multiples[ratio])
+        for ratio in Multiples.KPIS:
+            total_not_null = compare_multiples[ratio].notnull().sum()
+            compare_multiples[f"score_{ratio}"] = (compare_multiples[ratio].rank(ascending=False)-1)/(total_not_null-1)
+        scores.append(compare_multiples.filter(like="score_").to_numpy())
+    return np.stack(scores)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def report(name, legacy, batch, t_legacy, t_batch):
+    np.testing.assert_array_equal(legacy, batch)
+    print(f"{name:<10} por ticker {1000*t_legacy:9.1f} ms | vectorizado {1000*t_batch:7.2f} ms | x{t_legacy/t_batch:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--peers", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore", FutureWarning)
+    rng = np.random.default_rng(0)
+    n, n_peers = args.tickers, args.peers
+
+    frames, kpis = synthetic_statements(n, rng)
+    legacy, t_legacy = timed(per_ticker_growth, frames)
+    (batch, _), t_batch = timed(lambda: growth_scores(*stack_periods(frames, kpis)))
+    report("growth", legacy, batch, t_legacy, t_batch)
+
+    # NaN se evalua (no cumple), 0 no se evalua (solo en el primer kpi para
+    # que cada ticker tenga al menos un kpi evaluado)
+    balance = rng.choice([0.2, 0.5, 0.7, 1.5, 3, 6, np.nan], (n, len(BALANCE_RULES)))
+    balance[rng.random(n)<0.1, 0] = 0
+    legacy, t_legacy = timed(per_ticker_balance, balance)
+    (batch, _), t_batch = timed(balance_scores, balance)
+    report("balance", legacy, batch, t_legacy, t_batch)
+
+    ticker_margins = rng.uniform(-0.2, 0.6, (n, 3)).round(2)
+    peer_margins = rng.uniform(-0.2, 0.6, (n, n_peers, 3)).round(2)
+    legacy, t_legacy = timed(per_ticker_margins, ticker_margins, peer_margins)
+    (batch, _), t_batch = timed(margin_beat_scores, ticker_margins, peer_margins)
+    report("margins", legacy, batch, t_legacy, t_batch)
+
+    # pesos por competidor, con competidores descartados (pesos reescalados)
+    peer_weights = rng.dirichlet(np.ones(n_peers), n).round(3)
+    missing = rng.random((n, n_peers))<0.2
+    peer_margins[missing] = np.nan
+    legacy, t_legacy = timed(per_ticker_margins, ticker_margins, peer_margins, peer_weights)
+    (batch, _), t_batch = timed(margin_beat_scores, ticker_margins, peer_margins, peer_weights)
+    report("weighted", legacy, batch, t_legacy, t_batch)
+
+    multiples = rng.choice([-5, 8, 12, 12, 20, 35, np.nan], (n, n_peers + 1, len(Multiples.KPIS))).astype(float)
+    legacy, t_legacy = timed(per_ticker_ranks, multiples)
+    batch, t_batch = timed(multiple_rank_scores, multiples)
+    report("ranks", legacy, batch, t_legacy, t_batch)
+
+
+if __name__ == "__main__":
+    main()
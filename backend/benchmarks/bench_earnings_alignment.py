@@ -0,0 +1,98 @@
+"""Micro-benchmark del cruce precio diario vs earnings ttm de `get_multiples`.
+
+Compara la implementacion anterior (replicar cada earning de manera diaria con
+`pd.date_range` + `pd.concat` y cruzar por string) contra el as-of join de
+`align_earnings_to_prices`, validando que el resultado sea identico.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_earnings_alignment.py
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.insert(0, ".")
+from utils.multiples import align_earnings_to_prices
+
+
+def replicate_earnings_legacy(hist_price: pd.DataFrame, historic_ttm: pd.DataFrame):
+    """Implementacion original de `get_multiples`"""
+    historic_ttm = historic_ttm.reset_index()
+    hist_ttm_replicated = []
+
+    for i in range(historic_ttm.shape[0]):
+
+        row_i = historic_ttm.iloc[i]
+        try:
+            row_iplus1 = historic_ttm.iloc[i+1]
+            ends = row_iplus1["earning_date"]
+            inclusive = "left"
+        except Exception as e:
+            ends = datetime.now().strftime("%Y-%m-%d")
+            inclusive = "both"
+
+        dts = pd.date_range(
+            row_i["earning_date"],
+            ends,
+            inclusive=inclusive
+        )
+        dts = dts.strftime("%Y-%m-%d")
+        replicated_i = pd.DataFrame(dts, columns=["period"])
+        for var, val in row_i.items():
+            replicated_i[var] = val
+
+        hist_ttm_replicated.append(replicated_i)
+
+    hist_ttm_replicated = pd.concat(hist_ttm_replicated)
+
+    return hist_price.merge(hist_ttm_replicated, on=["period"], how="left")
+
+
+def synthetic_data(years: int, seed: int=0):
+    """Precio diario (dias habiles) y earnings ttm trimestrales de `years` años"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(datetime.now().date())
+
+    days = pd.bdate_range(end - pd.DateOffset(years=years), end)
+    hist_price = pd.DataFrame({
+        "period": days.strftime("%Y-%m-%d"),
+        "Close": 100 + np.cumsum(rng.normal(0, 1, len(days))),
+        "Volume": rng.integers(1_000, 10_000, len(days)),
+    })
+    hist_price["close_adj_currency"] = hist_price["Close"].copy()
+
+    quarters = pd.date_range(end - pd.DateOffset(years=years, months=3), end, freq="QE")
+    historic_ttm = pd.DataFrame({
+        "earning_date": quarters.strftime("%Y-%m-%d"),
+        "Revenue": rng.uniform(1e3, 1e4, len(quarters)),
+        "Gross Profit": rng.uniform(1e2, 1e3, len(quarters)),
+        "Net Income": rng.uniform(1e1, 1e2, len(quarters)),
+        "Shares Outstanding (Basic)": rng.uniform(10, 20, len(quarters)),
+        "Free Cash Flow": rng.uniform(1e1, 1e2, len(quarters)),
+    }).set_index("earning_date")
+
+    return hist_price, historic_ttm
+
+
+def main(repeat: int=5):
+    for years in [5, 20]:
+        hist_price, historic_ttm = synthetic_data(years)
+
+        legacy = replicate_earnings_legacy(hist_price, historic_ttm)
+        asof = align_earnings_to_prices(hist_price, historic_ttm)
+        pd.testing.assert_frame_equal(legacy, asof)
+
+        t_legacy = min(timeit.repeat(lambda: replicate_earnings_legacy(hist_price, historic_ttm), number=1, repeat=repeat))
+        t_asof = min(timeit.repeat(lambda: align_earnings_to_prices(hist_price, historic_ttm), number=1, repeat=repeat))
+
+        print(
+            f"{years:>2} años ({len(hist_price)} dias, {len(historic_ttm)} earnings): "
+            f"legacy {1000*t_legacy:8.2f} ms | as-of {1000*t_asof:6.2f} ms | "
+            f"speedup x{t_legacy/t_asof:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Benchmark de punta a punta de `execute_process` y de sus etapas.
+
+Usa respuestas grabadas (DATA_PROVIDER_MODE=replay), por lo que no hay red y
+los resultados son reproducibles. Las respuestas pueden venir de una grabacion
+real (DATA_PROVIDER_MODE=record) o generarse de forma sintetica con
+`--generate` (ticker BENCH y competidores P01..P25).
+
+Para cada caso reporta latencia p50/p95 (ms), la memoria asignada durante la
+ejecucion segun tracemalloc (pico sobre la memoria inicial, y bytes/bloques
+netos al terminar), y guarda todo en JSON para comparar entre commits con `--compare`.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_pipeline.py --generate --output bench.json
+    python benchmarks/bench_pipeline.py --output nuevo.json --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import warnings
+import tracemalloc
+import subprocess
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+sys.path.insert(0, ".")
+
+# todo se sirve desde las respuestas grabadas, sin caches persistentes
+os.environ["DATA_PROVIDER_MODE"] = "replay"
+os.environ.setdefault("DATA_FIXTURES_DIR", "benchmarks/fixtures")
+for var in ["PRICE_STORE_DIR", "FX_STORE_DIR", "PEER_GRAPH_PATH"]:
+    os.environ[var] = ""
+os.environ["STATEMENT_CACHE_ENABLED"] = "false"
+
+from constants import DataProviderConfig, IncomeKpis, BalanceKpis, CashFlowKpis
+from main import execute_process
+from utils.growth import score_growth
+from utils.multiples import get_multiples
+from utils.fetch_context import FetchContext
+from utils.data_provider import FixtureStore, get_data_provider
+from utils.fetch_data import get_financial_data, parse_historic_financial_data
+from handlers.balance_handler import calculate_kpis_balance_general
+from handlers.multiples_peers_handlers import process_compare_multiples_peers
+
+
+TICKER = "BENCH"
+PEER_COUNTS = [1, 5, 25]
+STATEMENT_ROWS = {
+    "income": [
+        "Revenue", "Revenue Growth (YoY)", "Cost of Revenue", "Gross Profit",
+        "Selling, General & Admin", "Total Operating Expenses", "Operating Income",
+        "Net Income", "Shares Outstanding (Basic)"
+    ],
+    "balance_sheet": [
+        "Cash & Equivalents", "Cash & Short-Term Investments", "Inventory",
+        "Total Current Assets", "Goodwill", "Total Assets", "Total Current Liabilities",
+        "Total Debt", "Total Liabilities"
+    ],
+    "cash_flow": ["Operating Cash Flow", "Capital Expenditures", "Free Cash Flow"],
+}
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+MULTIPLES_WEIGHTS = {"pe_ratio": 0.25, "ps_ratio": 0.25, "pgp_ratio": 0.25, "pfcf_ratio": 0.25}
+
+
+def synthetic_page(ticker: str, data_type: str, is_ttm: bool) -> bytes:
+    """Pagina con la estructura de la tabla de stockanalysis"""
+
+    rng = random.Random(f"{ticker}|{data_type}|{is_ttm}")
+    n_periods = 40 if is_ttm else 10
+    end = datetime.now() - timedelta(days=60)
+    dates = [end - timedelta(days=(91 if is_ttm else 365)*i) for i in range(n_periods)]
+
+    header_1 = "".join(f"<th>FY {d.year}</th>" for d in dates)
+    header_2 = "".join(
+        f"<th><span>{d.strftime('%b')} '{d.strftime('%y')}</span> <span>{d.strftime('%b %d, %Y')}</span></th>"
+        for d in dates
+    )
+    base = rng.uniform(100, 1000)
+    body = ""
+    for row in STATEMENT_ROWS[data_type]:
+        if "Growth" in row:
+            cells = [f"{rng.uniform(-5, 20):.2f}%" for _ in dates]
+        elif row=="Shares Outstanding (Basic)":
+            cells = [f"{rng.uniform(10, 20):.0f}" for _ in dates]
+        else:
+            cells = [f"{base * 1.05**-i * rng.uniform(0.3, 1.0):,.1f}" for i in range(n_periods)]
+        body += f"<tr><td>{row}</td>" + "".join(f"<td>{x}</td>" for x in cells) + "</tr>\n"
+
+    # el resto de la pagina (menus, otras tablas) tambien se descarga
+    filler = "<div><table><tr><td>otra tabla</td></tr></table></div>" * 30
+
+    return (
+        "<html><head><title>bench</title></head><body><nav>menu</nav>"
+        f"<table><thead><tr><th>Fiscal Year</th>{header_1}</tr><tr><th>Period Ending</th>{header_2}</tr></thead>"
+        f"<tbody>{body}</tbody></table>{filler}</body></html>"
+    ).encode()
+
+
+def synthetic_price(symbol: str, years: int=5) -> pd.DataFrame:
+    """Precio diario con el formato de `yf.Ticker.history`"""
+
+    end = pd.Timestamp.today().normalize()
+    index = pd.bdate_range(end - pd.DateOffset(years=years), end, tz="America/New_York", name="Date")
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    close = 100 + np.cumsum(rng.normal(0, 1, len(index)))
+
+    return pd.DataFrame({"Close": close, "Volume": rng.integers(1_000, 10_000, len(index))}, index=index)
+
+
+def generate_fixtures(folder: str, tickers: list):
+    """Respuestas sinteticas en el formato de `FixtureStore` (modo replay)"""
+
+    fixtures = FixtureStore(folder)
+    urls = {
+        "income": "https://stockanalysis.com/stocks/{ticker}/financials/{suffix_url}",
+        "balance_sheet": "https://stockanalysis.com/stocks/{ticker}/financials/balance-sheet/{suffix_url}",
+        "cash_flow": "https://stockanalysis.com/stocks/{ticker}/financials/cash-flow-statement/{suffix_url}",
+    }
+    for ticker in tickers:
+        for data_type, url in urls.items():
+            for is_ttm in [False, True]:
+                suffix_url = "?p=trailing" if is_ttm else ""
+                fixtures.write_bytes(
+                    "statements",
+                    url.format(ticker=ticker.lower(), suffix_url=suffix_url),
+                    "html",
+                    synthetic_page(ticker, data_type, is_ttm)
+                )
+        fixtures.write_price(ticker, synthetic_price(ticker))
+        fixtures.write_bytes("currency", ticker, "json", json.dumps({"financialCurrency": "USD"}).encode())
+
+
+def measure(name: str, func, repeat: int) -> dict:
+    """Latencia (p50/p95) en `repeat` ejecuciones y memoria en una ejecucion adicional"""
+
+    func()  # calentamiento
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(1000*(time.perf_counter() - start))
+
+    # memoria asignada durante la ejecucion: pico sobre lo que ya estaba
+    # asignado al empezar, y bytes/bloques netos (asignados - liberados) por linea
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "lineno")
+    net_alloc_bytes = sum(stat.size_diff for stat in stats)
+    net_alloc_blocks = sum(stat.count_diff for stat in stats)
+
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "mean_ms": float(np.mean(latencies)),
+        "peak_alloc_kib": (peak - start_size)/1024,
+        "net_alloc_kib": net_alloc_bytes/1024,
+        "net_alloc_blocks": net_alloc_blocks,
+    }
+    print(
+        f"{name:<40} p50 {result['p50_ms']:9.2f} ms | p95 {result['p95_ms']:9.2f} ms | "
+        f"pico asignado {result['peak_alloc_kib']:9.1f} KiB | neto {result['net_alloc_kib']:8.1f} KiB "
+        f"({net_alloc_blocks} bloques)"
+    )
+    return result
+
+
+def run_benchmarks(ticker: str, peers: list, repeat: int) -> list:
+    provider = get_data_provider()
+    results = []
+
+    # contexto con las descargas ya hechas: mide solo el calculo de cada etapa
+    warm_ctx = FetchContext()
+    for tick in [ticker, *peers]:
+        get_multiples(tick, fetch_ctx=warm_ctx)
+
+    html_data = provider.get_statement_page(
+        f"https://stockanalysis.com/stocks/{ticker.lower()}/financials/"
+    )
+    results.append(measure(
+        "parse_historic_financial_data",
+        lambda: parse_historic_financial_data(html_data, IncomeKpis.ANNUAL),
+        repeat
+    ))
+
+    income_complete, income_stmt = get_financial_data(ticker, "income", IncomeKpis.ANNUAL, fetch_ctx=warm_ctx)
+    get_financial_data(ticker, "balance_sheet", BalanceKpis.ANNUAL, fetch_ctx=warm_ctx)
+    get_financial_data(ticker, "cash_flow", CashFlowKpis.ANNUAL, fetch_ctx=warm_ctx)
+    results.append(measure("score_growth", lambda: score_growth(income_stmt), repeat))
+    results.append(measure("get_multiples", lambda: get_multiples(ticker, fetch_ctx=warm_ctx), repeat))
+    results.append(measure(
+        "calculate_kpis_balance_general",
+        lambda: calculate_kpis_balance_general(ticker, income_complete, fetch_ctx=warm_ctx),
+        repeat
+    ))
+
+    hist_multiples = get_multiples(ticker, fetch_ctx=warm_ctx)
+    for n_peers in PEER_COUNTS:
+        if n_peers>len(peers):
+            continue
+        results.append(measure(
+            f"process_compare_multiples_peers[{n_peers}]",
+            lambda: process_compare_multiples_peers(ticker, hist_multiples, peers[:n_peers], MULTIPLES_WEIGHTS, fetch_ctx=warm_ctx),
+            repeat
+        ))
+
+    # analisis completo con un contexto nuevo en cada ejecucion (lectura de
+    # las respuestas grabadas + parseo + calculo)
+    for n_peers in PEER_COUNTS:
+        if n_peers>len(peers):
+            continue
+        results.append(measure(
+            f"execute_process[{n_peers}]",
+            lambda: execute_process(
+                ticker=ticker,
+                financial_weights=FINANCIAL_WEIGHTS,
+                peers={"custom": peers[:n_peers], "n_competitors": n_peers},
+                multiples_weights=MULTIPLES_WEIGHTS
+            ),
+            max(3, repeat//5)
+        ))
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {x["name"]: x for x in json.load(f)["results"]}
+
+    print(f"\nComparacion vs {baseline_path} (p50 nuevo / p50 base)")
+    for result in results:
+        base = baseline.get(result["name"])
+        if base is not None:
+            print(f"{result['name']:<40} x{result['p50_ms']/base['p50_ms']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--generate", action="store_true", help="genera respuestas sinteticas (BENCH, P01..P25)")
+    parser.add_argument("--ticker", default=TICKER)
+    parser.add_argument("--peers", nargs="*", default=None, help="competidores grabados, por defecto P01..P25")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore", FutureWarning)
+
+    peers = args.peers or [f"P{i:02d}" for i in range(1, max(PEER_COUNTS) + 1)]
+    if args.generate:
+        generate_fixtures(DataProviderConfig.FIXTURES_DIR, [args.ticker, *peers])
+
+    results = run_benchmarks(args.ticker, peers, args.repeat)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "fixtures_dir": DataProviderConfig.FIXTURES_DIR,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
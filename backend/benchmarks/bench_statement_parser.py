@@ -0,0 +1,82 @@
+"""Benchmark del parseo de las paginas de stockanalysis.
+
+Compara `read_html_statement` (`pd.read_html` sobre toda la pagina) contra
+`extract_statement_table` (solo la tabla del estado financiero) sobre un corpus
+de paginas guardadas, validando que ambos estados financieros sean identicos.
+
+El corpus puede ser una carpeta con archivos .html o, por defecto, el html
+crudo guardado en el cache de estados financieros (StatementCache).
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_statement_parser.py [--pages-dir carpeta] [--repeat 5]
+"""
+import os
+import sys
+import glob
+import pickle
+import sqlite3
+import timeit
+import argparse
+import warnings
+import pandas as pd
+
+sys.path.insert(0, ".")
+from constants import StatementCacheConfig
+from utils.statement_parser import extract_statement_table, read_html_statement
+
+
+def load_corpus(pages_dir: str=None) -> dict:
+    """Paginas html {nombre: bytes}"""
+
+    if pages_dir:
+        corpus = {}
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+            with open(path, "rb") as f:
+                corpus[os.path.basename(path)] = f.read()
+        return corpus
+
+    if not os.path.exists(StatementCacheConfig.PATH):
+        return {}
+
+    with sqlite3.connect(StatementCacheConfig.PATH) as conn:
+        rows = conn.execute("SELECT key, payload FROM statements WHERE key LIKE 'html|%'").fetchall()
+
+    return {key: pickle.loads(payload) for key, payload in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages-dir", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pages_dir)
+    if len(corpus)==0:
+        print("Corpus vacio: use --pages-dir o ejecute algunos analisis con el StatementCache habilitado")
+        return
+
+    warnings.simplefilter("ignore", FutureWarning)
+    total_legacy, total_fast = 0, 0
+    for name, html_data in corpus.items():
+        legacy = read_html_statement(html_data)
+        fast = extract_statement_table(html_data)
+        pd.testing.assert_frame_equal(legacy, fast)
+
+        t_legacy = min(timeit.repeat(lambda: read_html_statement(html_data), number=1, repeat=args.repeat))
+        t_fast = min(timeit.repeat(lambda: extract_statement_table(html_data), number=1, repeat=args.repeat))
+        total_legacy += t_legacy
+        total_fast += t_fast
+
+        print(
+            f"{name:<45} {len(html_data)/1024:7.1f} KB | read_html {1000*t_legacy:7.2f} ms | "
+            f"extractor {1000*t_fast:6.2f} ms | x{t_legacy/t_fast:.1f}"
+        )
+
+    print(
+        f"\n{len(corpus)} paginas: read_html {1000*total_legacy:.1f} ms | "
+        f"extractor {1000*total_fast:.1f} ms | speedup x{total_legacy/total_fast:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,174 @@
+import os
+
+
 class FetchData:
     url_income = "https://stockanalysis.com/stocks/{ticker}/financials/{suffix_url}"
     url_balance = "https://stockanalysis.com/stocks/{ticker}/financials/balance-sheet/{suffix_url}"
     url_cash_flow = "https://stockanalysis.com/stocks/{ticker}/financials/cash-flow-statement/{suffix_url}"
-    
+    url_finviz = "https://finviz.com/quote.ashx?t={ticker}&p=d"
+
+
+class DataProviderConfig:
+    # live: fuentes reales, record: fuentes reales + grabar en FIXTURES_DIR,
+    # replay: solo respuestas grabadas (sin red)
+    MODE: str = os.getenv("DATA_PROVIDER_MODE", "live")
+    FIXTURES_DIR: str = os.getenv("DATA_FIXTURES_DIR", "fixtures")
+
+
+class HttpClientConfig:
+    USER_AGENT: str = (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    )
+    CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+    # hosts distintos en el pool y conexiones abiertas por host
+    POOL_HOSTS: int = 4
+    POOL_MAXSIZE_PER_HOST: int = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+    RETRIES: int = int(os.getenv("HTTP_RETRIES", "3"))
+    BACKOFF_FACTOR: float = 0.5
+    BACKOFF_JITTER: float = 0.5
+    RETRY_STATUS: list = [429, 500, 502, 503, 504]
+
+
+class RateLimitConfig:
+    # limite por host de las descargas de la sesion HTTP (stockanalysis, finviz):
+    # token bucket (requests por segundo) + concurrencia adaptativa (AIMD)
+    ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower()=="true"
+    RPS: float = float(os.getenv("RATE_LIMIT_RPS", "5"))
+    BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    HOST_RPS: dict = {"finviz.com": 2.0}
+    INITIAL_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_INITIAL_CONCURRENCY", "4"))
+    MIN_CONCURRENCY: int = 1
+    MAX_CONCURRENCY: int = HttpClientConfig.POOL_MAXSIZE_PER_HOST
+    # ante 429/503 la concurrencia y la tasa se multiplican por este factor,
+    # maximo una vez por ventana de `COOLDOWN_SECONDS`
+    DECREASE_FACTOR: float = 0.5
+    COOLDOWN_SECONDS: float = 2.0
+    THROTTLE_STATUS: list = [429, 503]
+
+
+class HedgeConfig:
+    # descargas duplicadas (paginas de stockanalysis y precios de yfinance): si
+    # una descarga no responde en el percentil `PERCENTILE` de las latencias
+    # recientes se lanza una copia y se usa la primera respuesta
+    ENABLED: bool = os.getenv("HEDGE_ENABLED", "false").lower()=="true"
+    PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    # latencias recientes por tipo de descarga y minimo para empezar a duplicar
+    WINDOW: int = 200
+    MIN_SAMPLES: int = 20
+    MIN_DELAY_SECONDS: float = 0.05
+    # maximo de copias como fraccion de las descargas (0.05 = 5% mas de carga),
+    # con rafagas de hasta `MAX_BURST` copias
+    BUDGET_RATIO: float = float(os.getenv("HEDGE_BUDGET_RATIO", "0.05"))
+    MAX_BURST: int = 5
+    WORKERS: int = int(os.getenv("HEDGE_WORKERS", "32"))
+
+
+class StatementCacheConfig:
+    ENABLED: bool = os.getenv("STATEMENT_CACHE_ENABLED", "true").lower()=="true"
+    PATH: str = os.getenv("STATEMENT_CACHE_PATH", "cache/statements.sqlite")
+    MAX_BYTES: int = int(os.getenv("STATEMENT_CACHE_MAX_MB", "256"))*1024*1024
+    # dias entre cierres de periodo y dias que tarda la empresa en reportar
+    PERIOD_DAYS: dict = {"annual": 365, "ttm": 91}
+    FILING_LAG_DAYS: dict = {"annual": 90, "ttm": 45}
+    # si la fecha esperada del reporte ya paso, se revisa de nuevo en estas horas
+    RETRY_TTL_HOURS: int = 12
+
+
+class AsyncFetchConfig:
+    # maximo de descargas simultaneas por request
+    MAX_CONCURRENCY: int = int(os.getenv("FETCH_MAX_CONCURRENCY", "8"))
+    # hilos del proceso para descargas bloqueantes, compartidos entre requests
+    IO_WORKERS: int = int(os.getenv("FETCH_IO_WORKERS", "32"))
+
+
+class FxStoreConfig:
+    # monedas en memoria y carpeta para persistir las series ("" para no persistir)
+    MAX_CURRENCIES: int = int(os.getenv("FX_STORE_MAX_CURRENCIES", "32"))
+    DISK_DIR: str = os.getenv("FX_STORE_DIR", "cache/fx")
+
+
+class PriceStoreConfig:
+    # carpeta con un Parquet por ticker ("" para descargar siempre)
+    DIR: str = os.getenv("PRICE_STORE_DIR", "cache/prices")
+    YEARS: int = 5
+
+
+class StaleCacheConfig:
+    # stale-while-revalidate: los datos vencidos dentro de su presupuesto se
+    # sirven de inmediato y se refrescan en segundo plano
+    ENABLED: bool = os.getenv("STALE_CACHE_ENABLED", "true").lower()=="true"
+    # estados financieros: dias que se pueden servir despues de vencer
+    STATEMENT_STALE_DAYS: float = float(os.getenv("STALE_STATEMENT_DAYS", "7"))
+    # precios: vigentes por estos minutos con el mercado abierto (cerrado, hasta
+    # el siguiente cierre) y servibles vencidos hasta estas horas
+    PRICE_FRESH_MINUTES: float = float(os.getenv("STALE_PRICE_FRESH_MINUTES", "15"))
+    PRICE_STALE_HOURS: float = float(os.getenv("STALE_PRICE_HOURS", "24"))
+    # analisis completos (raw_metrics_store, maximo RAW_METRICS_TTL_HOURS):
+    # vigentes con el mismo criterio de los precios
+    ANALYSIS_STALE_HOURS: float = float(os.getenv("STALE_ANALYSIS_HOURS", "12"))
+    REFRESH_WORKERS: int = int(os.getenv("STALE_REFRESH_WORKERS", "2"))
+    MARKET_TZ: str = "America/New_York"
+    MARKET_OPEN: tuple = (9, 30)
+    MARKET_CLOSE: tuple = (16, 0)
+
+
+class ServerConfig:
+    # analisis simultaneos por worker de uvicorn y maximo en cola
+    MAX_CONCURRENT_ANALYSES: int = int(os.getenv("MAX_CONCURRENT_ANALYSES", "4"))
+    MAX_QUEUED_ANALYSES: int = int(os.getenv("MAX_QUEUED_ANALYSES", "32"))
+    # maximo de empresas por request en /api/analyze_companies/
+    MAX_BATCH_COMPANIES: int = int(os.getenv("MAX_BATCH_COMPANIES", "50"))
+    # segundos por analisis (sobreescribible con `time_budget_seconds` en la
+    # request): los competidores que no responden a tiempo se descartan, 0 = sin limite
+    ANALYSIS_TIME_BUDGET_SECONDS: float = float(os.getenv("ANALYSIS_TIME_BUDGET", "30"))
+
+
+class RawMetricsConfig:
+    # artefactos de indicadores sin pesos para /api/rescore/ (en memoria)
+    MAX_ENTRIES: int = int(os.getenv("RAW_METRICS_MAX_ENTRIES", "256"))
+    TTL_HOURS: int = int(os.getenv("RAW_METRICS_TTL_HOURS", "12"))
+
+
+class JobConfig:
+    # trabajos de analisis en segundo plano: workers, cola y store (memory o sqlite)
+    WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    MAX_QUEUED: int = int(os.getenv("JOB_MAX_QUEUED", "100"))
+    STORE: str = os.getenv("JOB_STORE", "memory")
+    SQLITE_PATH: str = os.getenv("JOB_STORE_PATH", "cache/jobs.sqlite")
+    # horas que se guardan los trabajos despues de su ultima actualizacion
+    TTL_HOURS: int = int(os.getenv("JOB_TTL_HOURS", "24"))
+
+
+class PeerGraphConfig:
+    # competidores de finviz por ticker ("" para consultar siempre finviz)
+    PATH: str = os.getenv("PEER_GRAPH_PATH", "cache/peer_graph.sqlite")
+    TTL_DAYS: int = int(os.getenv("PEER_GRAPH_TTL_DAYS", "14"))
+    # pausa entre paginas de finviz en la precarga (preload_peers.py)
+    PRELOAD_DELAY_SECONDS: float = float(os.getenv("PEER_GRAPH_PRELOAD_DELAY", "0.5"))
+
+
+class ScreenerConfig:
+    # store de scores precalculados del universo (ver precompute_universe.py)
+    PATH: str = os.getenv("SCREENER_STORE_PATH", "cache/screener.sqlite")
+    # archivo con los tickers del universo, uno por linea
+    UNIVERSE_FILE: str = os.getenv("SCREENER_UNIVERSE_FILE", "universe.txt")
+    # empresas por lote de `execute_batch_process_async`
+    CHUNK_SIZE: int = int(os.getenv("SCREENER_CHUNK_SIZE", "25"))
+    MAX_LIMIT: int = 500
+    # configuracion de cada analisis del precalculo
+    N_COMPETITORS: int = int(os.getenv("SCREENER_N_COMPETITORS", "5"))
+    FINANCIAL_WEIGHTS: dict = {"income": {"growth": 0.5, "peers": 0.5}}
+    MULTIPLES_WEIGHTS: dict = None
+
+
+class MetricsConfig:
+    # etiqueta `ticker` en las metricas (false para limitar la cardinalidad)
+    TICKER_LABEL: bool = os.getenv("METRICS_TICKER_LABEL", "true").lower()=="true"
+    # limites de los histogramas de duracion, en segundos
+    BUCKETS: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
 
 class IncomeKpis:
     ANNUAL: list = [
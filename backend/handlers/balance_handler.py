@@ -1,17 +1,8 @@
 import logging
 import pandas as pd
-import numpy as np
 from constants import BalanceKpis
 from utils.fetch_data import get_financial_data
-
-
-def clean_kpi(x: str):
-  if x=="-":
-    newx = 0
-  else:
-    newx = x
-  
-  return float(newx)
+from utils.fetch_context import FetchContext
 
 
 def score_balance_general(kpis_rules: dict):
@@ -50,7 +41,8 @@ def score_balance_general(kpis_rules: dict):
 
 def calculate_kpis_balance_general(
     ticker: str,
-    income_stmt_complete: pd.DataFrame
+    income_stmt_complete: pd.DataFrame,
+    fetch_ctx: FetchContext=None
 ):
   """Esta función calcula los indicadores del balance general, como:
   1. Razon corriente
@@ -58,16 +50,20 @@ def calculate_kpis_balance_general(
   3. Deuda sobre los activos totales
   4. Numero de meses de operación con el dinero en caja
   """
-  balance_complete, balance = get_financial_data(ticker=ticker, data_type="balance_sheet", kpis=BalanceKpis.ANNUAL)
+  balance_complete, balance = get_financial_data(
+    ticker=ticker, 
+    data_type="balance_sheet", 
+    kpis=BalanceKpis.ANNUAL, 
+    fetch_ctx=fetch_ctx
+  )
 
   # Dinero en caja que cubra mas de tres meses de operación
   # Total cash and short term investments > selling general & admin expenses (gastos totales de operacion)
-  income_stmt_complete = income_stmt_complete.set_index(["nding"])
   try:
-    operation_expenses_12month = income_stmt_complete.iloc[:,0]["Selling, General & Admin"]
+    operation_expenses_12month = income_stmt_complete["Selling, General & Admin"].iloc[0]
   except Exception as e:
     logging.warning(f"'Selling, General & Admin' no existe en el dataframe 'income_stmt_complete' - {e}")
-    operation_expenses_12month = income_stmt_complete.iloc[:,0]["Total Operating Expenses"]
+    operation_expenses_12month = income_stmt_complete["Total Operating Expenses"].iloc[0]
     logging.warning(f" '-> Usando 'Total Operating Expenses': {operation_expenses_12month} para identificar los gastos de operacion a 12 meses")
 
   operation_expenses_month = float(operation_expenses_12month) / 12
@@ -87,23 +83,27 @@ def calculate_kpis_balance_general(
   months_operation = round(cash / operation_expenses_month, 2)
   logging.info(f"Meses de operación con el dinero en caja - months_operation: {months_operation}")
 
+  # indicadores del ultimo periodo en el orden de la pagina (los activos van
+  # antes de 'Total Assets' y los pasivos entre este y 'Total Liabilities'),
+  # los valores sin dato ("-") cuentan como 0
+  balance_items = list(balance_complete.columns)
+  last_balance = balance_complete.iloc[0].fillna(0)
+
   # activos corrientes
   try:
     current_assets = balance["Total Current Assets"].iloc[0]
   except Exception as e:
     logging.warning(f"'Total Current Assets' no existe en el dataframe 'balance' - {e}")
     logging.warning(f" '-> Realizando calculo manual de current_assets")
-    ixtotalassets = np.where(balance_complete["nding"]=="Total Assets")[0][0]
-    total_assets = clean_kpi(balance_complete.iloc[ixtotalassets, 1])
-    data_assets = balance_complete.iloc[:ixtotalassets, :]
+    ixtotalassets = balance_items.index("Total Assets")
+    total_assets = last_balance["Total Assets"]
+    data_assets = balance_items[:ixtotalassets]
 
     # quitarle el long term al total para calcular el current
-    non_current_item_names = data_assets[data_assets["nding"].str.contains("Long")]["nding"].to_list()
+    non_current_item_names = [x for x in data_assets if "Long" in x]
     non_current_item_names += ["Goodwill", "Property, Plant & Equipment", "Other Intangible Assets"]
-    non_current_item_names = np.unique(non_current_item_names)
-    non_current_item_names = list(non_current_item_names)
     non_current_value = sum([
-        clean_kpi(x) for x in data_assets[data_assets["nding"].isin(non_current_item_names)].iloc[:,1]
+        last_balance[x] for x in data_assets if x in non_current_item_names
     ])
     current_assets = total_assets-non_current_value
 
@@ -115,16 +115,14 @@ def calculate_kpis_balance_general(
   except Exception as e:
     logging.warning(f"'Total Current Liabilities' no existe en el dataframe 'balance' - {e}")
     logging.warning(f" '-> Realizando calculo manual de current_liabili")
-    ixtotalliabilities = np.where(balance_complete["nding"]=="Total Liabilities")[0][0]
-    total_liabilities = float(balance_complete.iloc[ixtotalliabilities, 1])
-    data_liabilities = balance_complete.iloc[(ixtotalassets+1):ixtotalliabilities, :]
+    ixtotalassets = balance_items.index("Total Assets")
+    ixtotalliabilities = balance_items.index("Total Liabilities")
+    total_liabilities = last_balance["Total Liabilities"]
+    data_liabilities = balance_items[(ixtotalassets+1):ixtotalliabilities]
 
     # quitarle el long term al total para calcular el current
-    non_current_item_names = data_liabilities[data_liabilities["nding"].str.contains("Long")]["nding"].to_list()
-    non_current_item_names = [x for x in non_current_item_names if "Current" not in x]
-    non_current_value = sum([
-        clean_kpi(x) for x in data_liabilities[data_liabilities["nding"].isin(non_current_item_names)].iloc[:,1]
-    ])
+    non_current_item_names = [x for x in data_liabilities if "Long" in x and "Current" not in x]
+    non_current_value = sum([last_balance[x] for x in non_current_item_names])
     current_liabili = total_liabilities-non_current_value    
 
   logging.info(f"Pasivos corrientes - current_liabili: {current_liabili}")
@@ -168,7 +166,8 @@ def calculate_kpis_balance_general(
 
 def process_balance_general(
     ticker: str, 
-    income_stmt_complete: pd.DataFrame
+    income_stmt_complete: pd.DataFrame,
+    fetch_ctx: FetchContext=None
 ):
     """Balance General
 
@@ -181,7 +180,8 @@ def process_balance_general(
     """
     kpis_balance = calculate_kpis_balance_general(
         ticker=ticker, 
-        income_stmt_complete=income_stmt_complete
+        income_stmt_complete=income_stmt_complete,
+        fetch_ctx=fetch_ctx
     )
     # reglas de sanidad de una empresa
     kpis_rules = {
@@ -1,15 +1,17 @@
 from constants import CashFlowKpis
 from utils.growth import score_growth
 from utils.fetch_data import get_financial_data
+from utils.fetch_context import FetchContext
 
 
-def process_cash_flow(ticker: str):
+def process_cash_flow(ticker: str, fetch_ctx: FetchContext=None):
     
     data_type = "cash_flow"
     _, cash_flow = get_financial_data(
         ticker=ticker, 
         data_type=data_type,
-        kpis=CashFlowKpis.ANNUAL
+        kpis=CashFlowKpis.ANNUAL,
+        fetch_ctx=fetch_ctx
     )
     score_cash_flow_growth, cash_flow_growth = score_growth(cash_flow)
 
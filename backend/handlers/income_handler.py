@@ -1,10 +1,15 @@
 import re
+import time
 import logging
 import pandas as pd
-from finvizfinance.quote import finvizfinance
 from constants import IncomeKpis
 from utils.growth import score_growth
 from utils.fetch_data import get_financial_data
+from utils.fetch_context import FetchContext, bounded, skip_peer
+from utils.data_provider import get_data_provider
+from utils.peer_graph import get_peer_graph
+from utils.metrics import upstream_span, observe_upstream
+from utils.single_flight import single_flight
 
 
 def get_margins_ttm(inc_stmt: pd.DataFrame):
@@ -20,15 +25,15 @@ def get_margins_ttm(inc_stmt: pd.DataFrame):
   return margins
 
 
-def get_competitors_tickers(ticker: str, n_competitors: int):
-  """Obtiene los tickers de los competidores asociados a un ticker dado,
-  desde la pagina de finviz.com"""
+def fetch_finviz_peers(ticker: str):
+  """Descarga la pagina de finviz del ticker y extrae, en una sola pasada por
+  sus links, la lista completa (ordenada) de competidores, el sector y la industria"""
 
   logging.info("Identificando competidores usando finviz...")
 
-  # Obtener tickers de la competencia
-  # Ticker de interes
-  stock = finvizfinance(ticker)
+  # pagina del ticker de interes segun el proveedor de datos configurado
+  with upstream_span("finviz", "peers", ticker):
+    soup = get_data_provider().get_finviz_soup(ticker)
 
   # Obtencion de los competidores segun FinViz
   # basado en la estructura html de la pagina
@@ -36,11 +41,63 @@ def get_competitors_tickers(ticker: str, n_competitors: int):
     "class": "tab-link",
     "href": re.compile("^screener")
   }
-  peers = [
-    x for x in stock.soup.findAll("a", attrs)
-    if "Peers" in x
-  ][0]
-  peers = peers.get("href").split("=")[1].split(",")
+  peers, sector, industry = None, None, None
+  for link in soup.findAll("a", attrs):
+    href = link.get("href")
+    if peers is None and "Peers" in link:
+      peers = href.split("=")[1].split(",")
+    elif sector is None and "f=sec_" in href:
+      sector = link.get_text(strip=True)
+    elif industry is None and "f=ind_" in href:
+      industry = link.get_text(strip=True)
+
+  if peers is None:
+    raise ValueError(f"finviz no tiene competidores para: {ticker}")
+
+  return peers, sector, industry
+
+
+def get_competitors_tickers(ticker: str, n_competitors: int, fetch_ctx: FetchContext=None):
+  """Obtiene los tickers de los competidores asociados a un ticker dado,
+  desde el grafo de competidores (PeerGraph) o la pagina de finviz.com"""
+
+  key = ("peers", ticker.upper(), n_competitors)
+
+  def _load():
+    # las requests concurrentes por el mismo ticker esperan una sola consulta
+    return single_flight.do(key, lambda: load_competitors_tickers(ticker, n_competitors))
+
+  if fetch_ctx is None:
+    return list(_load())
+
+  return list(fetch_ctx.get_or_fetch(key, _load))
+
+
+def load_competitors_tickers(ticker: str, n_competitors: int):
+  """Primeros `n_competitors` competidores del PeerGraph, o de finviz si no
+  estan vigentes (con la ultima lista conocida si finviz falla)"""
+
+  peer_graph = get_peer_graph()
+  start = time.perf_counter()
+  entry = None if peer_graph is None else peer_graph.get(ticker)
+
+  if entry is None:
+    try:
+      peers, sector, industry = fetch_finviz_peers(ticker)
+    except Exception as e:
+      # si finviz falla se usa la ultima lista conocida, aunque este vencida
+      entry = None if peer_graph is None else peer_graph.get(ticker, allow_stale=True)
+      if entry is None:
+        raise
+      logging.warning(f"Error consultando finviz, usando competidores guardados de {ticker} - {e}")
+      peers = entry["peers"]
+    else:
+      if peer_graph is not None:
+        peer_graph.put(ticker, peers, sector, industry)
+  else:
+    logging.info(f"Competidores de {ticker} desde el PeerGraph")
+    observe_upstream("finviz", "peers", ticker, "hit", time.perf_counter()-start)
+    peers = entry["peers"]
 
   # primeros n competidores
   peers = peers[:n_competitors]
@@ -50,56 +107,80 @@ def get_competitors_tickers(ticker: str, n_competitors: int):
   return peers
 
 
-def get_margins_peers(peers: list, data_type: str, kpis: list):
+def resolve_peers(ticker: str, peers_cfg: dict, fetch_ctx: FetchContext=None):
+  """Define los competidores a partir de la configuracion de la request:
+  encontrados en finviz, una lista personalizada o un diccionario con pesos.
+
+  Return:
+  -------
+  peers (list): tickers de los competidores
+  peers_dict (dict): configuracion con pesos por competidor, None si no hay pesos
+  """
+  peers_dict = None
+  if peers_cfg["custom"] is None:
+    # Definiendo los competidores
+    n_competitors = peers_cfg["n_competitors"]
+    peers = get_competitors_tickers(ticker, n_competitors, fetch_ctx=fetch_ctx)
+  elif isinstance(peers_cfg["custom"], list):
+    peers = peers_cfg["custom"]
+  elif isinstance(peers_cfg["custom"], dict):
+    peers_dict = peers_cfg["custom"]
+    peers = list(peers_dict.keys())
+
+  return peers, peers_dict
+
+
+def get_margins_peers(
+    peers: list, 
+    data_type: str, 
+    kpis: list, 
+    fetch_ctx: FetchContext=None
+  ):
   """Esta funcion calcula los margenes de los estados de resultados para una lista de tickers,
-    que son los competidores del ticker analizado"""
+    que son los competidores del ticker analizado. Los competidores con error o
+    que no responden antes del deadline de la request se descartan"""
 
   logging.info("Calculando margenes de la competencia...")
   peers_margin = {}
   for tick_peer in peers:
     try:
-      _, income_stmt_peer = get_financial_data(tick_peer, data_type, kpis)
+      with bounded(fetch_ctx):
+        _, income_stmt_peer = get_financial_data(tick_peer, data_type, kpis, fetch_ctx=fetch_ctx)
       peers_margin[tick_peer] = get_margins_ttm(income_stmt_peer)
     except Exception as e:
       logging.warning(f"Error ticker: {tick_peer} - {e}")
+      skip_peer(fetch_ctx, tick_peer, "income", e)
 
   return peers_margin
 
 
-def score_stmt_margins_competitors(
+def compare_margins_competitors(
     ticker: str, 
     income_stmt: pd.DataFrame,
-    peers_cfg: dict
+    peers_cfg: dict,
+    fetch_ctx: FetchContext=None
   ):
-  """Esta función calcula el score de los margenes del estado de resultados
-  del ticker de interes vs los competidores.
-  El score es la proporcion de indicadores (multiplicado por 10) en los que el ticker de interes
-  supera en margenes a los competidores. Todos los indicadores-competidores tienen el mismo peso.
+  """Esta función compara los margenes del estado de resultados del ticker de
+  interes vs los competidores, indicador por indicador. No aplica pesos: el
+  score se calcula con `score_margins_competitors`.
 
   Arguments:
   ----------
   ticker (str): Ticker de la empresa que se desea analizar.
   income_stmt (pd.DataFrame): Indicadores analizados en el estado de resultados de la empresa de interes.
-  n_competitors (int): Cantidad máxima de competidores que se van a extraer para comparar
+  peers_cfg (dict): configuracion de los competidores de la request
+  fetch_ctx (FetchContext): contexto de descarga de la request
 
   Return:
   -------
-  score_margins_peers (float): score de 0 a 10
+  response (dict): competidores, pesos de la request por competidor (None si no hay),
+    margenes del ticker y de los competidores, y para cada competidor una lista
+    con 1 en los indicadores en los que el ticker lo supera
   """
   logging.info(f"Calculando los margenes de la empresa: {ticker}")
   margin_interes = get_margins_ttm(income_stmt)
 
-  weighted = False
-  if peers_cfg["custom"] is None:
-    # Definiendo los competidores
-    n_competitors = peers_cfg["n_competitors"]
-    peers = get_competitors_tickers(ticker, n_competitors)
-  elif isinstance(peers_cfg["custom"], list):
-    peers = peers_cfg["custom"]
-  elif isinstance(peers_cfg["custom"], dict):
-    peers_dict = peers_cfg["custom"]
-    peers = list(peers_dict.keys())
-    weighted = True
+  peers, peers_dict = resolve_peers(ticker, peers_cfg, fetch_ctx=fetch_ctx)
 
   logging.info(f"peers: {peers}")
   
@@ -107,10 +188,11 @@ def score_stmt_margins_competitors(
   margin_peers = get_margins_peers(
     peers=peers,
     data_type="income",
-    kpis=IncomeKpis.ANNUAL
+    kpis=IncomeKpis.ANNUAL,
+    fetch_ctx=fetch_ctx
   )
-  # se calculara el score de comparacion de margenes
-  result_peers = {}
+  # indicadores en los que el ticker supera a cada competidor
+  beat_peers = {}
   for peer_ticker, peer_margin in margin_peers.items():
     beat_peer = []
     for kpi in peer_margin:
@@ -118,11 +200,43 @@ def score_stmt_margins_competitors(
         beat_peer.append(1)
       else:
         beat_peer.append(0)
-    
-    if weighted:
-      w = peers_dict[peer_ticker]["weight"]
+    beat_peers[peer_ticker] = beat_peer
+
+  response = {
+    "peers": peers, 
+    "peers_weights": None if peers_dict is None else {k: v["weight"] for k, v in peers_dict.items()},
+    "margin_ticker_interes": margin_interes,
+    "margin_peers": margin_peers, 
+    "beat_peers": beat_peers,
+  }
+
+  return response
+
+
+def score_margins_competitors(beat_peers: dict, peers_weights: dict=None):
+  """Score de los margenes del ticker de interes vs los competidores.
+  El score es la proporcion de indicadores (multiplicado por 10) en los que el ticker de interes
+  supera en margenes a los competidores. Sin `peers_weights` todos los
+  indicadores-competidores tienen el mismo peso; con `peers_weights`, si
+  faltan competidores (descartados), los pesos se reescalan para que sumen lo
+  mismo que en la request.
+
+  Return:
+  -------
+  score_margins_peers (float): score de 0 a 10
+  """
+  scale = 1
+  if peers_weights is not None and set(beat_peers)!=set(peers_weights):
+    total_answered = sum(peers_weights[x] for x in beat_peers)
+    if total_answered>0:
+      scale = sum(peers_weights.values())/total_answered
+
+  result_peers = {}
+  for peer_ticker, beat_peer in beat_peers.items():
+    if peers_weights is not None:
+      w = scale*peers_weights[peer_ticker]
     else:
-      w = 1/len(margin_peers)
+      w = 1/len(beat_peers)
     
     logging.info(f"peer_ticker: {peer_ticker} - weight: {w}")
     result_peers[peer_ticker] = w * sum(beat_peer)/len(beat_peer)
@@ -132,28 +246,28 @@ def score_stmt_margins_competitors(
   logging.info(f"Aporte al score, ticker vs cada competidor - result_peer: {result_peers}")
   logging.info(f"Score comparación vs competencia - score_margins_peers: {score_margins_peers}")
 
-  response = {
-    "peers": peers, 
-    "margin_ticker_interes": margin_interes,
-    "margin_peers": margin_peers, 
-    "score_margins_peers": score_margins_peers,
-  }
+  return score_margins_peers
 
-  return response
 
-
-def process_income(
+def compute_income_metrics(
     ticker: str, 
-    weights: dict,
-    peers_cfg
+    peers_cfg,
+    fetch_ctx: FetchContext=None
 ):
+    """Indicadores del estado de resultados que no dependen de los pesos de la
+    request: crecimiento y comparacion de margenes vs la competencia"""
 
     # estado de resultados
     data_type = "income"
     logging.info(f"Tipo de resultados: {data_type}")
     logging.info(f"KPI's analizar: {IncomeKpis.ANNUAL}\n")
 
-    income_stmt_complete, income_stmt = get_financial_data(ticker=ticker, data_type=data_type, kpis=IncomeKpis.ANNUAL)
+    income_stmt_complete, income_stmt = get_financial_data(
+        ticker=ticker, 
+        data_type=data_type, 
+        kpis=IncomeKpis.ANNUAL, 
+        fetch_ctx=fetch_ctx
+    )
     logging.info(f"earnings date: {income_stmt.index.values}")
 
     # evaluar crecimiento de la empresa
@@ -161,31 +275,51 @@ def process_income(
     score_stmt_res_growth, stmt_res_growth = score_growth(income_stmt)
 
     # Comparar margenes: estado de resultados vs la competencia
-    response_margins = score_stmt_margins_competitors(
+    response_margins = compare_margins_competitors(
         ticker, 
         income_stmt,
-        peers_cfg
+        peers_cfg,
+        fetch_ctx
     )
+
+    return {
+        "income_complete": income_stmt_complete,
+        "income": income_stmt,
+        "score_stmt_growth": score_stmt_res_growth,
+        **response_margins
+    }
+
+
+def score_income(income_metrics: dict, weights: dict, peers_weights: dict=None):
+    """Score del estado de resultados a partir de `compute_income_metrics`,
+    sin descargas. `peers_weights` reemplaza los pesos por competidor de la request original"""
+
+    if peers_weights is None:
+        peers_weights = income_metrics["peers_weights"]
+
+    score_margins_peers = score_margins_competitors(income_metrics["beat_peers"], peers_weights)
+
     # score total de los estados de resultados (income)
     score_stmt_res = (
-        score_stmt_res_growth*weights["income"]["growth"] + 
-        response_margins["score_margins_peers"]*weights["income"]["peers"]
+        income_metrics["score_stmt_growth"]*weights["income"]["growth"] + 
+        score_margins_peers*weights["income"]["peers"]
     )
 
     # parsing response    
     response = {"income": {}}
-    response["income"]["income_complete"] = income_stmt_complete
-    response["income"]["income"] = income_stmt
+    if "income_complete" in income_metrics:
+        response["income"]["income_complete"] = income_metrics["income_complete"]
+    response["income"]["income"] = income_metrics["income"]
 
     # resultados del crecimiento
-    response["income"]["score_stmt_growth"] = score_stmt_res_growth
+    response["income"]["score_stmt_growth"] = income_metrics["score_stmt_growth"]
     # response["income"]["detail_growth"] = stmt_res_growth
 
     # resultados de comparacion de margenes vs la competencia
-    response["peers"] = response_margins["peers"]
-    response["income"]["score_margins_peers"] = response_margins["score_margins_peers"]
-    response["income"]["margin_peers"] = response_margins["margin_peers"]
-    response["income"]["margin_ticker_interes"] = response_margins["margin_ticker_interes"]
+    response["peers"] = income_metrics["peers"]
+    response["income"]["score_margins_peers"] = score_margins_peers
+    response["income"]["margin_peers"] = income_metrics["margin_peers"]
+    response["income"]["margin_ticker_interes"] = income_metrics["margin_ticker_interes"]
 
     # score final
     response["income"]["score_final"] = score_stmt_res
@@ -193,3 +327,12 @@ def process_income(
     return response
 
 
+def process_income(
+    ticker: str, 
+    weights: dict,
+    peers_cfg,
+    fetch_ctx: FetchContext=None
+):
+    income_metrics = compute_income_metrics(ticker, peers_cfg, fetch_ctx=fetch_ctx)
+
+    return score_income(income_metrics, weights)
@@ -1,17 +1,16 @@
 import logging
 from constants import Multiples
 from utils.multiples import get_multiples
+from utils.fetch_context import FetchContext
 
 
-def process_multiples_price_historic(
-    ticker: str,
-    multiples_weights: dict
-):
+def compute_multiples_price_historic(ticker: str, fetch_ctx: FetchContext=None):
     """Esta funcion nos ayudara a realizar la valoración por multiplos de una compañia de interes.
-    En especifico, se encarga de revisar los multiplos historicos de la acción.
+    En especifico, se encarga de revisar los multiplos historicos de la acción: para cada
+    multiplo, su valor actual vs el minimo y maximo historico. No aplica pesos.
     """
     # obtener los multiplos del ticker de interes
-    hist_multiples_ticker = get_multiples(ticker=ticker)
+    hist_multiples_ticker = get_multiples(ticker=ticker, fetch_ctx=fetch_ctx)
     
     dict_score_precio_hist = {}
     dict_detail_multiples = {}
@@ -36,6 +35,16 @@ def process_multiples_price_historic(
             "score_multiplo": score_multiplo
         }
 
+    return {"price": hist_multiples_ticker, "detail_multiples": dict_detail_multiples}
+
+
+def score_multiples_price_historic(historic_metrics: dict, multiples_weights: dict):
+    """Score del precio historico a partir de `compute_multiples_price_historic`, sin descargas"""
+
+    dict_score_precio_hist = {
+        multiplo: detail["score_multiplo"]
+        for multiplo, detail in historic_metrics["detail_multiples"].items()
+    }
     if isinstance(multiples_weights, dict):
         score_precio_hist = 10*sum([value*multiples_weights[x] for x, value in dict_score_precio_hist.items()])
     else:
@@ -44,9 +53,17 @@ def process_multiples_price_historic(
     logging.info(f"\n\nScore precio historico-> score_precio_hist: {score_precio_hist}")
 
     # response price_historic
-    response = {}
-    response["price"] = hist_multiples_ticker
-    response["detail_multiples"] = dict_detail_multiples
+    response = {**historic_metrics}
     response["score_final"] = score_precio_hist
 
     return response
+
+
+def process_multiples_price_historic(
+    ticker: str,
+    multiples_weights: dict,
+    fetch_ctx: FetchContext=None
+):
+    historic_metrics = compute_multiples_price_historic(ticker, fetch_ctx=fetch_ctx)
+
+    return score_multiples_price_historic(historic_metrics, multiples_weights)
@@ -3,15 +3,19 @@ import pandas as pd
 import numpy as np
 from constants import Multiples
 from utils.multiples import get_multiples
+from utils.fetch_context import FetchContext, bounded, skip_peer
 
 
-def process_compare_multiples_peers(
+def compute_compare_multiples_peers(
     ticker: str,
     hist_multiples_ticker: pd.DataFrame,
     peers: list,
-    multiples_weights: dict
+    fetch_ctx: FetchContext=None
 ):
-    """Esta funcion compara los multiplos del ticker de interes con los peers o competidores"""
+    """Esta funcion compara los multiplos del ticker de interes con los peers o competidores.
+    Retorna los multiplos actuales de cada empresa y el score (por rank) de cada multiplo, sin pesos.
+    Los competidores con error o que no responden antes del deadline de la
+    request se descartan (el rank se calcula solo con los que respondieron)."""
     
     # multiplos del ticker de interes segun el precio del ultimo dia
     current_multiples_ticker = hist_multiples_ticker.iloc[-1, :].copy()
@@ -21,13 +25,15 @@ def process_compare_multiples_peers(
     for peer_ticker in peers:
         try:
             logging.info("=="*20)
-            hist_multiples_peer = get_multiples(ticker=peer_ticker)
+            with bounded(fetch_ctx):
+                hist_multiples_peer = get_multiples(ticker=peer_ticker, fetch_ctx=fetch_ctx)
             logging.info(f"hist_multiples_peer.shape: {hist_multiples_peer.shape}")
 
             current_multiples_peer = hist_multiples_peer.iloc[-1, :].copy()
             multiples_peers[peer_ticker] = current_multiples_peer
         except Exception as e:
             logging.info(f"ERROR No se pudo extraer informacion del ticker: {peer_ticker}")
+            skip_peer(fetch_ctx, peer_ticker, "price_competitors", e)
 
     # multiplos ticker interes + competencia
     compare_multiples = pd.DataFrame({ticker: current_multiples_ticker, **multiples_peers}).T
@@ -42,14 +48,17 @@ def process_compare_multiples_peers(
         total_not_null = compare_multiples[ratio].notnull().sum()
         compare_multiples[f"score_{ratio}"] = (compare_multiples[ratio].rank(ascending=False)-1)/(total_not_null-1)
 
+    return compare_multiples
+
+
+def score_compare_multiples_peers(compare_multiples: pd.DataFrame, multiples_weights: dict):
+    """Score de los multiplos vs la competencia a partir de `compute_compare_multiples_peers`, sin descargas"""
+
     # se revisa si se usa pesos para consolidar los multiplos
     if isinstance(multiples_weights, dict):
         logging.info("Usando los pesos de los multiplos: multiples_weights...")
-        score_multiples_peers = 10*(
-            compare_multiples
-            .filter(like="score_")
-            .apply(lambda x: sum([w*x["score_"+wname] for wname, w in multiples_weights.items()]), axis=1)
-        )
+        # suma ponderada por columnas, en el mismo orden de los pesos
+        score_multiples_peers = 10*sum([w*compare_multiples["score_"+wname] for wname, w in multiples_weights.items()])
     else:
         score_multiples_peers = 10*compare_multiples.filter(like="score_").mean(axis=1)
 
@@ -60,4 +69,16 @@ def process_compare_multiples_peers(
         "detail_multiples": compare_multiples
     }
 
-    return response
\ No newline at end of file
+    return response
+
+
+def process_compare_multiples_peers(
+    ticker: str,
+    hist_multiples_ticker: pd.DataFrame,
+    peers: list,
+    multiples_weights: dict,
+    fetch_ctx: FetchContext=None
+):
+    compare_multiples = compute_compare_multiples_peers(ticker, hist_multiples_ticker, peers, fetch_ctx=fetch_ctx)
+
+    return score_compare_multiples_peers(compare_multiples, multiples_weights)
\ No newline at end of file
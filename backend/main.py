@@ -1,18 +1,111 @@
-from handlers.income_handler import process_income
+import time
+import asyncio
+import logging
+import functools
+from contextlib import nullcontext
+from constants import StaleCacheConfig
+from handlers.income_handler import compute_income_metrics, score_income
 from handlers.balance_handler import process_balance_general
 from handlers.cash_flow_handler import process_cash_flow
 from handlers.financial_score_handler import get_financial_score_global
-from handlers.multiples_historic_handlers import process_multiples_price_historic
-from handlers.multiples_peers_handlers import process_compare_multiples_peers
+from handlers.multiples_historic_handlers import compute_multiples_price_historic, score_multiples_price_historic
+from handlers.multiples_peers_handlers import compute_compare_multiples_peers, score_compare_multiples_peers
+from utils.fetch_context import FetchContext
+from utils.deadline import Deadline, build_deadline
+from utils.metrics import stage_span
+from utils.revalidate import background_refresher, price_is_fresh
+from utils.raw_metrics_store import raw_metrics_store
+from utils.async_fetch import prefetch_analysis_data, prefetch_batch_data, resolve_peers_async
+from utils.concurrency import AnalysisLimiter, analysis_executor
+
+
+# etapas de `execute_process` y su ubicacion en la respuesta
+STAGE_SECTIONS = {
+    "income": "financials.income",
+    "balance": "financials.balance",
+    "cash_flow": "financials.cash_flow",
+    "score_final": "financials.score_final",
+    "price_historic": "price_historic",
+    "price_competitors": "price_competitors",
+}
+
+
+def serialize_section(stage: str, section):
+    """Version serializable de la seccion de la respuesta de una etapa:
+    los DataFrames se convierten a diccionarios y se quitan los
+    resultados intermedios que solo usan otras etapas"""
+
+    if not isinstance(section, dict):
+        return section
+
+    section = dict(section)
+    if stage=="income":
+        section.pop("income_complete", None)
+        section["income"] = section["income"].to_dict()
+    elif stage=="cash_flow":
+        section["cash_flow"] = section["cash_flow"].to_dict()
+    elif stage=="price_historic":
+        section.pop("price", None)
+    elif stage=="price_competitors":
+        section["detail_multiples"] = section["detail_multiples"].to_dict()
+        section["score_final"] = section["score_final"].to_dict()
+
+    return section
+
+
+def skipped_peers(income_metrics: dict, compare_multiples, fetch_ctx: FetchContext) -> list:
+    """Competidores descartados en cada etapa, con el motivo (`deadline` o `error`)"""
+
+    skipped = []
+    for stage, answered in (
+        ("income", income_metrics["margin_peers"]),
+        ("price_competitors", compare_multiples.index),
+    ):
+        for peer in income_metrics["peers"]:
+            if peer not in answered:
+                skipped.append({"ticker": peer, "stage": stage, "reason": fetch_ctx.skip_reason(peer, stage)})
+
+    return skipped
+
+
+async def wait_prefetch(prefetch, deadline: Deadline=None):
+    """Espera la descarga en paralelo maximo hasta el deadline; lo que falte
+    lo espera cada etapa del analisis (con deadline para los competidores)"""
+
+    try:
+        await asyncio.wait_for(prefetch, None if deadline is None else deadline.remaining())
+    except asyncio.TimeoutError:
+        logging.warning("Deadline vencido durante la descarga en paralelo, se continua con los datos disponibles")
 
 
 def execute_process(
     ticker: str,
     financial_weights: dict,
     peers: dict,
-    multiples_weights: dict
+    multiples_weights: dict,
+    fetch_ctx: FetchContext=None,
+    progress=None,
+    time_budget: float=None
 ):
 
+    # `time_budget` (segundos): los competidores que no responden a tiempo se
+    # descartan y se listan en `metadata.skipped_peers`
+    # `progress(stage, section)` se llama al terminar cada etapa del analisis
+    # con la seccion de la respuesta ya serializada
+    serialized = {}
+
+    def report(stage: str, section):
+        serialized[stage] = serialize_section(stage, section)
+        if progress is not None:
+            progress(stage, serialized[stage])
+
+    # contexto de descarga de la request, evita descargar
+    # la misma pagina mas de una vez entre handlers
+    if fetch_ctx is None:
+        fetch_ctx = FetchContext(deadline=build_deadline(time_budget))
+    elif fetch_ctx.deadline is None:
+        fetch_ctx.deadline = build_deadline(time_budget)
+
     # response structure
     response = {
         "financials": {},
@@ -21,13 +114,15 @@ def execute_process(
     }
 
     ### Analisis de los estados de resultados de la empresa
-    results_process_income = process_income(
-        ticker, 
-        financial_weights,
-        peers
-    )
+    # primero los indicadores sin pesos (se guardan para recalcular los
+    # scores con otros pesos) y luego el score con los pesos de la request
+    with stage_span("income", ticker):
+        income_metrics = compute_income_metrics(ticker, peers, fetch_ctx=fetch_ctx)
+        results_process_income = score_income(income_metrics, financial_weights)
     response["financials"]["income"] = results_process_income["income"]
     response["peers"] = results_process_income["peers"]
+    report("income", response["financials"]["income"])
+    report("peers", response["peers"])
 
     ### Balance General
     # De aqui obtenemos:
@@ -35,13 +130,18 @@ def execute_process(
     # 2. Razón corriente "acida"
     # 3. Deuda sobre los activos totales
     # 4. Numero de meses de operación con el dinero en caja
-    response["financials"]["balance"] = process_balance_general(
-        ticker=ticker, 
-        income_stmt_complete=response["financials"]["income"]["income_complete"]
-    )
+    with stage_span("balance", ticker):
+        response["financials"]["balance"] = process_balance_general(
+            ticker=ticker, 
+            income_stmt_complete=response["financials"]["income"]["income_complete"],
+            fetch_ctx=fetch_ctx
+        )
+    report("balance", response["financials"]["balance"])
 
     ### Flujo de caja creciente
-    response["financials"]["cash_flow"] = process_cash_flow(ticker=ticker)
+    with stage_span("cash_flow", ticker):
+        response["financials"]["cash_flow"] = process_cash_flow(ticker=ticker, fetch_ctx=fetch_ctx)
+    report("cash_flow", response["financials"]["cash_flow"])
 
     ### Score salud financiera global
     response["financials"]["score_final"] = get_financial_score_global(
@@ -50,34 +150,316 @@ def execute_process(
         score_cash_flow_growth=response["financials"]["cash_flow"]["score_final"],
         weights=financial_weights
     )
+    report("score_final", response["financials"]["score_final"])
     # ---
     ### Análisis del precio historico
-    response["price_historic"] = process_multiples_price_historic(
-        ticker=ticker,
-        multiples_weights=multiples_weights
-    )
+    with stage_span("price_historic", ticker):
+        historic_metrics = compute_multiples_price_historic(ticker=ticker, fetch_ctx=fetch_ctx)
+        response["price_historic"] = score_multiples_price_historic(historic_metrics, multiples_weights)
+    report("price_historic", response["price_historic"])
 
     # Comparando el precio con la competencia
-    response["price_competitors"] = process_compare_multiples_peers(
-        ticker=ticker,
-        hist_multiples_ticker=response["price_historic"]["price"],
-        peers=response["peers"],
-        multiples_weights=multiples_weights
+    with stage_span("price_competitors", ticker):
+        compare_multiples = compute_compare_multiples_peers(
+            ticker=ticker,
+            hist_multiples_ticker=historic_metrics["price"],
+            peers=response["peers"],
+            fetch_ctx=fetch_ctx
+        )
+        response["price_competitors"] = score_compare_multiples_peers(compare_multiples, multiples_weights)
+    report("price_competitors", response["price_competitors"])
+
+    # la respuesta final se arma con las secciones ya serializadas
+    for stage, path in STAGE_SECTIONS.items():
+        parent = response["financials"] if path.startswith("financials.") else response
+        parent[stage] = serialized[stage]
+
+    skipped = skipped_peers(income_metrics, compare_multiples, fetch_ctx)
+
+    # artefacto de indicadores sin pesos, para `score_analysis` (el balance
+    # y el flujo de caja no usan pesos y se guardan ya serializados). Un
+    # analisis parcial por deadline no se guarda, no debe servirse desde el cache
+    income_metrics.pop("income_complete")
+    historic_metrics.pop("price")
+    if not any(x["reason"]=="deadline" for x in skipped):
+        raw_metrics_store.put(ticker, peers, {
+            "income": income_metrics,
+            "balance": response["financials"]["balance"],
+            "cash_flow": response["financials"]["cash_flow"],
+            "price_historic": historic_metrics,
+            "price_competitors": compare_multiples,
+        })
+
+    # descargas ahorradas dentro de la request y competidores descartados
+    response["metadata"] = {"fetch_cache": fetch_ctx.stats(), "skipped_peers": skipped}
+
+    return response
+
+
+def score_analysis(
+    raw_metrics: dict,
+    financial_weights: dict,
+    multiples_weights: dict,
+    peers_weights: dict=None
+):
+    """Calcula todos los scores de un analisis a partir de sus indicadores sin
+    pesos (artefacto guardado por `execute_process`), sin descargas. La
+    respuesta tiene el mismo formato de `execute_process`, sin `metadata`.
+
+    Arguments
+    ---------
+    raw_metrics (dict): artefacto de `raw_metrics_store`
+    financial_weights (dict): pesos del score financiero
+    multiples_weights (dict): pesos de los multiplos, None para pesos iguales
+    peers_weights (dict): pesos por competidor {ticker: peso}, None para usar
+        los de la request original
+    """
+    response = {
+        "financials": {},
+        "price_historic": {},
+        "price_competitors": {}
+    }
+
+    results_income = score_income(raw_metrics["income"], financial_weights, peers_weights)
+    response["financials"]["income"] = results_income["income"]
+    response["peers"] = results_income["peers"]
+    response["financials"]["balance"] = raw_metrics["balance"]
+    response["financials"]["cash_flow"] = raw_metrics["cash_flow"]
+    response["financials"]["score_final"] = get_financial_score_global(
+        score_stmt_res=response["financials"]["income"]["score_final"],
+        score_balance=response["financials"]["balance"]["score_final"],
+        score_cash_flow_growth=response["financials"]["cash_flow"]["score_final"],
+        weights=financial_weights
     )
+    response["price_historic"] = score_multiples_price_historic(raw_metrics["price_historic"], multiples_weights)
+    response["price_competitors"] = score_compare_multiples_peers(raw_metrics["price_competitors"], multiples_weights)
 
-    del response["financials"]["income"]["income_complete"] 
-    # response["financials"]["income"]["income_complete"] = response["financials"]["income"]["income_complete"].to_dict()
-    response["financials"]["income"]["income"] = response["financials"]["income"]["income"].to_dict()
-    # response["financials"]["income"]["detail_growth"] = response["financials"]["income"]["detail_growth"].to_dict()
+    # el balance y el flujo de caja se guardan ya serializados
+    response["financials"]["income"] = serialize_section("income", response["financials"]["income"])
+    for stage in ["price_historic", "price_competitors"]:
+        response[stage] = serialize_section(stage, response[stage])
 
-    # response["financials"]["balance"]["balance"] = response["financials"]["balance"]["balance"].to_dict()
+    return response
 
-    response["financials"]["cash_flow"]["cash_flow"] = response["financials"]["cash_flow"]["cash_flow"].to_dict()
-    # response["financials"]["cash_flow"]["detail_growth"] = response["financials"]["cash_flow"]["detail_growth"].to_dict()
 
-    del response["price_historic"]["price"]
-    # response["price_historic"]["price"] = response["price_historic"]["price"].to_dict()
-    response["price_competitors"]["detail_multiples"] = response["price_competitors"]["detail_multiples"].to_dict()
-    response["price_competitors"]["score_final"] = response["price_competitors"]["score_final"].to_dict()
+def get_cached_analysis(
+    ticker: str,
+    financial_weights: dict,
+    peers: dict,
+    multiples_weights: dict
+):
+    """Analisis servido desde `raw_metrics_store` (stale-while-revalidate), sin
+    descargas. Si el analisis ya no esta vigente (mismo criterio de los precios)
+    se retorna igual y se recalcula en segundo plano; si tiene mas de
+    `ANALYSIS_STALE_HOURS` o no existe se retorna None.
+
+    `metadata.cache` indica el estado (`fresh` o `stale`) y la edad de los datos.
+    """
+    if not StaleCacheConfig.ENABLED:
+        return None
+
+    entry = raw_metrics_store.get(ticker, peers)
+    if entry is None:
+        return None
+
+    raw_metrics, created_at = entry
+    age_seconds = time.time() - created_at
+    if age_seconds>StaleCacheConfig.ANALYSIS_STALE_HOURS*3600:
+        return None
+
+    # los pesos por competidor son los de esta request
+    peers_weights = None
+    if isinstance(peers["custom"], dict):
+        peers_weights = {k: v["weight"] for k, v in peers["custom"].items()}
+
+    response = score_analysis(raw_metrics, financial_weights, multiples_weights, peers_weights)
+
+    status = "fresh" if price_is_fresh(created_at) else "stale"
+    if status=="stale":
+        # el recalculo corre en el pool de analisis, comparte su limite de
+        # analisis simultaneos con las requests
+        background_refresher.schedule(
+            ("analysis", *raw_metrics_store.make_key(ticker, peers)),
+            lambda: analysis_executor.submit(
+                execute_process,
+                ticker=ticker,
+                financial_weights=financial_weights,
+                peers=peers,
+                multiples_weights=multiples_weights
+            ).result()
+        )
+
+    response["metadata"] = {"cache": {"status": status, "age_seconds": round(age_seconds, 1)}}
+
+    return response
+
+
+async def execute_process_async(
+    ticker: str,
+    financial_weights: dict,
+    peers: dict,
+    multiples_weights: dict,
+    progress=None,
+    time_budget: float=None
+):
+    """Version asincrona de `execute_process`: primero se descargan en paralelo
+    los datos del ticker y de sus competidores, y luego se ejecuta el
+    analisis (secuencial) sobre los datos ya descargados. Con `time_budget`
+    la descarga en paralelo se espera maximo hasta el deadline."""
+
+    fetch_ctx = FetchContext(deadline=build_deadline(time_budget))
+
+    # los competidores se necesitan antes de poder descargar sus datos
+    peers_list, _ = await resolve_peers_async(ticker, peers, fetch_ctx=fetch_ctx)
+    await wait_prefetch(
+        asyncio.ensure_future(prefetch_analysis_data(ticker, peers_list, fetch_ctx)),
+        fetch_ctx.deadline
+    )
+
+    # el calculo corre en un pool dedicado para no bloquear el event loop
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(
+        analysis_executor,
+        functools.partial(
+            execute_process,
+            ticker=ticker,
+            financial_weights=financial_weights,
+            peers=peers,
+            multiples_weights=multiples_weights,
+            fetch_ctx=fetch_ctx,
+            progress=progress
+        )
+    )
+    return response
+
+
+async def execute_batch_process_async(companies: list, limiter: AnalysisLimiter=None):
+    """Analiza varias empresas compartiendo las descargas entre ellas.
+
+    Se resuelven los competidores de todas las empresas, se descarga una sola
+    vez la union de los recursos necesarios y luego se ejecuta `execute_process`
+    para cada empresa sobre los datos compartidos. Es un generador asincrono que
+    entrega `(ticker, response, error)` a medida que termina cada analisis.
+
+    Arguments
+    ---------
+    companies (list): lista de requests de `/api/analyze_company/`, cada una con
+        ticker, financial_weights, peers y multiples_weights (ya validadas con
+        `validate_company_request`)
+    limiter (AnalysisLimiter): si se entrega, cada empresa ocupa su propio cupo
+        del limitador mientras se ejecuta su analisis (sin rechazo por cola llena,
+        quien llama valida el espacio del lote con `has_room`)
+    """
+    # descargas compartidas por el lote; cada empresa tiene su propio contexto
+    # (sobre el compartido) para reportar sus hits/misses y competidores descartados
+    fetch_ctx = FetchContext()
+    companies_ctx = [FetchContext(parent=fetch_ctx) for _ in companies]
+
+    peers_lists = await asyncio.gather(
+        *[
+            resolve_peers_async(x["ticker"], x["peers"], fetch_ctx=ctx_i)
+            for x, ctx_i in zip(companies, companies_ctx)
+        ],
+        return_exceptions=True
+    )
+    await prefetch_batch_data(
+        [
+            (company["ticker"], peers_i[0])
+            for company, peers_i in zip(companies, peers_lists)
+            if not isinstance(peers_i, Exception)
+        ],
+        fetch_ctx
+    )
+
+    loop = asyncio.get_running_loop()
+
+    async def _run(company: dict, peers_i, ctx_i: FetchContext):
+        try:
+            if isinstance(peers_i, Exception):
+                raise peers_i
+            async with nullcontext() if limiter is None else limiter.slot(limit_queue=False):
+                response = await loop.run_in_executor(
+                    analysis_executor,
+                    functools.partial(
+                        execute_process,
+                        ticker=company["ticker"],
+                        financial_weights=company["financial_weights"],
+                        peers=company["peers"],
+                        multiples_weights=company.get("multiples_weights"),
+                        fetch_ctx=ctx_i
+                    )
+                )
+            return company["ticker"], response, None
+        except Exception as e:
+            logging.warning(f"Error analizando el ticker: {company['ticker']} - {e}")
+            return company["ticker"], None, e
+
+    tasks = [
+        _run(company, peers_i, ctx_i)
+        for company, peers_i, ctx_i in zip(companies, peers_lists, companies_ctx)
+    ]
+    for task in asyncio.as_completed(tasks):
+        yield await task
+
+
+async def execute_process_stream(
+    ticker: str,
+    financial_weights: dict,
+    peers: dict,
+    multiples_weights: dict,
+    time_budget: float=None
+):
+    """Version de `execute_process_async` que entrega cada seccion de la
+    respuesta apenas termina su etapa. Es un generador asincrono de
+    `(section, data)`, con `section` como en `STAGE_SECTIONS` (mas `peers`
+    y `metadata` al final).
+
+    A diferencia de `execute_process_async`, el analisis no espera a que
+    termine la descarga en paralelo: corre al tiempo con ella y cada etapa
+    solo espera los datos que necesita (`FetchContext` comparte las
+    descargas en curso), por lo que la primera seccion llega en cuanto
+    estan los datos de la etapa mas rapida.
+    """
+    fetch_ctx = FetchContext(deadline=build_deadline(time_budget))
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def progress(stage: str, section):
+        # se llama desde el hilo del analisis
+        loop.call_soon_threadsafe(queue.put_nowait, (STAGE_SECTIONS.get(stage, stage), section))
+
+    peers_list, _ = await resolve_peers_async(ticker, peers, fetch_ctx=fetch_ctx)
+    prefetch = asyncio.create_task(prefetch_analysis_data(ticker, peers_list, fetch_ctx))
+    analysis = loop.run_in_executor(
+        analysis_executor,
+        functools.partial(
+            execute_process,
+            ticker=ticker,
+            financial_weights=financial_weights,
+            peers=peers,
+            multiples_weights=multiples_weights,
+            fetch_ctx=fetch_ctx,
+            progress=progress
+        )
+    )
+
+    completed = False
+    try:
+        while not (analysis.done() and queue.empty()):
+            get_section = asyncio.ensure_future(queue.get())
+            await asyncio.wait([get_section, analysis], return_when=asyncio.FIRST_COMPLETED)
+            if get_section.done():
+                yield get_section.result()
+            else:
+                get_section.cancel()
 
-    return response
\ No newline at end of file
+        response = await analysis
+        yield "metadata", response["metadata"]
+        completed = True
+    finally:
+        if completed:
+            await wait_prefetch(prefetch, fetch_ctx.deadline)
+        else:
+            # analisis fallido o cancelado (ej: el cliente cerro la conexion):
+            # no se espera la descarga de los competidores
+            prefetch.cancel()
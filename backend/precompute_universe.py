@@ -0,0 +1,73 @@
+"""Precalculo nocturno del screener.
+
+Ejecuta el analisis completo (`execute_batch_process_async`, por lotes que
+comparten descargas) sobre un universo de tickers y guarda los scores de cada
+seccion y los ratios principales en el store del screener, que consulta
+`/api/screen/` sin descargas.
+
+Uso (desde la carpeta backend), por ejemplo con cron todas las noches:
+    python precompute_universe.py [--universe universe.txt] [--tickers AAPL MSFT ...]
+"""
+import time
+import asyncio
+import logging
+import argparse
+
+from constants import ScreenerConfig
+from main import execute_batch_process_async
+from utils.universe import load_universe
+from utils.screener_store import get_screener_store, screen_row_from_response
+
+
+logging.basicConfig(
+    format="%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s",
+    datefmt="%Y-%m-%d:%H:%M:%S",
+    level=logging.INFO,
+)
+
+
+async def precompute_universe(tickers: list, chunk_size: int=ScreenerConfig.CHUNK_SIZE) -> dict:
+    """Analiza el universo por lotes y guarda cada resultado en el store del screener"""
+
+    store = get_screener_store()
+    summary = {"ok": 0, "error": 0}
+    for i in range(0, len(tickers), chunk_size):
+        chunk = tickers[i:i+chunk_size]
+        logging.info(f"Precalculo lote {i//chunk_size + 1}: {chunk}")
+        companies = [
+            {
+                "ticker": ticker,
+                "financial_weights": ScreenerConfig.FINANCIAL_WEIGHTS,
+                "peers": {"custom": None, "n_competitors": ScreenerConfig.N_COMPETITORS},
+                "multiples_weights": ScreenerConfig.MULTIPLES_WEIGHTS,
+            }
+            for ticker in chunk
+        ]
+        async for ticker, response, error in execute_batch_process_async(companies):
+            if error is not None:
+                summary["error"] += 1
+                continue
+            try:
+                store.upsert(screen_row_from_response(ticker, response))
+                summary["ok"] += 1
+            except Exception as e:
+                logging.warning(f"No se pudo guardar el ticker {ticker} en el screener - {e}")
+                summary["error"] += 1
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default=ScreenerConfig.UNIVERSE_FILE)
+    parser.add_argument("--tickers", nargs="*", default=None)
+    args = parser.parse_args()
+
+    tickers = args.tickers or load_universe(args.universe)
+    start = time.time()
+    summary = asyncio.run(precompute_universe(tickers))
+    logging.info(f"Precalculo terminado en {time.time()-start:.1f} s - {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Precarga del grafo de competidores (PeerGraph) desde finviz.
+
+Recorre el universo en anchura: para cada ticker se consulta su pagina de
+finviz (si no esta vigente en el grafo) y sus competidores se agregan a la
+cola hasta la profundidad indicada, de modo que las paginas de los
+competidores tambien quedan en el grafo. Los analisis con competidores
+automaticos quedan sin consultas a finviz mientras el grafo este vigente.
+
+Uso (desde la carpeta backend):
+    python preload_peers.py [--universe universe.txt] [--tickers AAPL MSFT ...] [--depth 1]
+"""
+import time
+import logging
+import argparse
+from collections import deque
+
+from constants import PeerGraphConfig, ScreenerConfig
+from handlers.income_handler import fetch_finviz_peers
+from utils.universe import load_universe
+from utils.peer_graph import get_peer_graph
+
+
+logging.basicConfig(
+    format="%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s",
+    datefmt="%Y-%m-%d:%H:%M:%S",
+    level=logging.INFO,
+)
+
+
+def preload_peer_graph(tickers: list, depth: int=1, delay: float=PeerGraphConfig.PRELOAD_DELAY_SECONDS) -> dict:
+    """Recorrido en anchura del grafo de competidores desde `tickers`"""
+
+    peer_graph = get_peer_graph()
+    if peer_graph is None:
+        raise ValueError("El PeerGraph esta deshabilitado (PEER_GRAPH_PATH)")
+
+    summary = {"cached": 0, "fetched": 0, "error": 0}
+    queue = deque((ticker.upper(), 0) for ticker in tickers)
+    seen = set(ticker for ticker, _ in queue)
+    while queue:
+        ticker, level = queue.popleft()
+
+        entry = peer_graph.get(ticker)
+        if entry is not None:
+            peers = entry["peers"]
+            summary["cached"] += 1
+        else:
+            try:
+                peers, sector, industry = fetch_finviz_peers(ticker)
+                peer_graph.put(ticker, peers, sector, industry)
+                summary["fetched"] += 1
+            except Exception as e:
+                logging.warning(f"No se pudo consultar finviz para {ticker} - {e}")
+                summary["error"] += 1
+                continue
+            finally:
+                time.sleep(delay)
+
+        if level<depth:
+            for peer in peers:
+                peer = peer.upper()
+                if peer not in seen:
+                    seen.add(peer)
+                    queue.append((peer, level + 1))
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default=ScreenerConfig.UNIVERSE_FILE)
+    parser.add_argument("--tickers", nargs="*", default=None)
+    parser.add_argument("--depth", type=int, default=1)
+    args = parser.parse_args()
+
+    tickers = args.tickers or load_universe(args.universe)
+    start = time.time()
+    summary = preload_peer_graph(tickers, depth=args.depth)
+    logging.info(f"Precarga de competidores terminada en {time.time()-start:.1f} s - {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# los tests usan respuestas sinteticas grabadas (sin red) y ningun cache
+# persistente: se configura antes de importar `constants`
+FIXTURES_DIR = tempfile.mkdtemp(prefix="fixtures-")
+os.environ["DATA_PROVIDER_MODE"] = "replay"
+os.environ["DATA_FIXTURES_DIR"] = FIXTURES_DIR
+for var in ["PRICE_STORE_DIR", "FX_STORE_DIR", "PEER_GRAPH_PATH"]:
+    os.environ[var] = ""
+os.environ["STATEMENT_CACHE_ENABLED"] = "false"
+os.environ["JOB_STORE"] = "memory"
+
+TICKER = "BENCH"
+PEERS = ["P01", "P02", "P03"]
+
+
+@pytest.fixture(scope="session")
+def replay_fixtures():
+    """Paginas, precios y monedas sinteticas de `TICKER` y `PEERS` (modo replay)"""
+    from benchmarks.bench_pipeline import generate_fixtures
+
+    generate_fixtures(FIXTURES_DIR, [TICKER, *PEERS])
+    return FIXTURES_DIR
@@ -0,0 +1,35 @@
+import json
+import asyncio
+from main import execute_process, execute_process_async
+from utils.fetch_context import FetchContext
+from utils.async_fetch import prefetch_analysis_data
+from conftest import TICKER, PEERS
+
+
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+PEERS_CFG = {"custom": PEERS}
+
+
+def canonical(response: dict) -> str:
+    response = {k: v for k, v in response.items() if k!="metadata"}
+    return json.dumps(response, sort_keys=True, default=str)
+
+
+def test_prefetch_covers_every_download_of_the_analysis(replay_fixtures):
+    fetch_ctx = FetchContext()
+    asyncio.run(prefetch_analysis_data(TICKER, PEERS, fetch_ctx))
+    misses = fetch_ctx.stats()["misses"]
+
+    execute_process(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None, fetch_ctx=fetch_ctx)
+
+    # el analisis solo lee lo ya descargado
+    assert fetch_ctx.stats()["misses"]==misses
+    assert fetch_ctx.stats()["hits"]>0
+
+
+def test_async_analysis_matches_sequential(replay_fixtures):
+    sequential = execute_process(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None)
+    concurrent = asyncio.run(execute_process_async(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None))
+
+    assert canonical(concurrent)==canonical(sequential)
+    assert concurrent["metadata"]["skipped_peers"]==[]
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from utils import multiples as multiples_module
+from utils import price_store as price_module
+from utils.fetch_context import FetchContext
+from utils.fx_store import FxRateStore
+from utils.multiples import get_historic_prices_batch, get_historic_price, get_exchange_rate
+from test_price_store import FakePriceProvider
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = FakePriceProvider(last_day=pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+    monkeypatch.setattr(price_module, "get_data_provider", lambda: provider)
+    monkeypatch.setattr(price_module, "get_price_store", lambda: None)
+    monkeypatch.setattr(multiples_module, "fx_store", FxRateStore(max_currencies=4))
+    return provider
+
+
+def test_tickers_and_currency_pairs_in_one_download(provider):
+    fetch_ctx = FetchContext()
+
+    price_matrix = get_historic_prices_batch(["AAA", "BBB"], currencies=["USD", "CNY", "CNY"], fetch_ctx=fetch_ctx)
+
+    assert provider.calls==[(("AAA", "BBB", "CNY=X"), None)]
+    assert set(price_matrix.columns.get_level_values(1))=={"AAA", "BBB", "CNY=X"}
+
+    # las series quedan en el contexto del analisis, sin nuevas descargas
+    hist_price = get_historic_price("BBB", fetch_ctx=fetch_ctx)
+    exchange_rate = get_exchange_rate("CNY", fetch_ctx=fetch_ctx)
+    assert len(provider.calls)==1
+    assert len(hist_price)==len(price_matrix)
+    assert list(exchange_rate.columns)==["period", "exchange"]
+    assert fetch_ctx.stats()["hits"]==2
+
+
+def test_missing_symbol_is_not_seeded(provider, monkeypatch):
+    download_prices = provider.download_prices
+    monkeypatch.setattr(provider, "download_prices", lambda symbols, **kwargs: {
+        symbol: hist_price for symbol, hist_price in download_prices(symbols, **kwargs).items() if symbol!="BBB"
+    })
+    fetch_ctx = FetchContext()
+
+    price_matrix = get_historic_prices_batch(["AAA", "BBB"], fetch_ctx=fetch_ctx)
+
+    assert set(price_matrix.columns.get_level_values(1))=={"AAA"}
+    assert ("price", "BBB") not in fetch_ctx._memo
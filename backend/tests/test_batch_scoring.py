@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from constants import Multiples
+from handlers.income_handler import score_margins_competitors
+from utils.batch_scoring import (
+    BALANCE_RULES,
+    stack_periods,
+    growth_scores,
+    balance_scores,
+    margin_beat_scores,
+    multiple_rank_scores
+)
+from benchmarks.bench_batch_scoring import (
+    synthetic_statements,
+    per_ticker_growth,
+    per_ticker_balance,
+    per_ticker_margins,
+    per_ticker_ranks
+)
+
+
+N_TICKERS = 200
+N_PEERS = 5
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_growth_matches_score_growth(rng):
+    frames, kpis = synthetic_statements(N_TICKERS, rng)
+    scores, _ = growth_scores(*stack_periods(frames, kpis))
+
+    np.testing.assert_array_equal(scores, per_ticker_growth(frames))
+
+
+def test_balance_matches_score_balance_general(rng):
+    # NaN se evalua (no cumple) y 0 no se evalua, como en `score_balance_general`
+    balance = rng.choice([0.2, 0.5, 0.7, 1.5, 3, 6, np.nan], (N_TICKERS, len(BALANCE_RULES)))
+    balance[rng.random(N_TICKERS)<0.2, 0] = 0
+    scores, _ = balance_scores(balance)
+
+    np.testing.assert_array_equal(scores, per_ticker_balance(balance))
+
+
+def test_margins_match_score_margins_competitors(rng):
+    ticker_margins = rng.uniform(-0.2, 0.6, (N_TICKERS, 3)).round(2)
+    peer_margins = rng.uniform(-0.2, 0.6, (N_TICKERS, N_PEERS, 3)).round(2)
+    peer_margins[rng.random((N_TICKERS, N_PEERS))<0.2] = np.nan
+    scores, _ = margin_beat_scores(ticker_margins, peer_margins)
+
+    np.testing.assert_array_equal(scores, per_ticker_margins(ticker_margins, peer_margins))
+
+
+def test_weighted_margins_rescale_dropped_peers(rng):
+    ticker_margins = rng.uniform(-0.2, 0.6, (N_TICKERS, 3)).round(2)
+    peer_margins = rng.uniform(-0.2, 0.6, (N_TICKERS, N_PEERS, 3)).round(2)
+    peer_margins[rng.random((N_TICKERS, N_PEERS))<0.2] = np.nan
+    peer_weights = rng.dirichlet(np.ones(N_PEERS), N_TICKERS).round(3)
+    scores, _ = margin_beat_scores(ticker_margins, peer_margins, peer_weights)
+
+    np.testing.assert_array_equal(scores, per_ticker_margins(ticker_margins, peer_margins, peer_weights))
+
+
+def test_dropped_peer_weight_is_redistributed():
+    # el ticker supera en todos los margenes al competidor que respondio
+    ticker_margins = np.array([[0.5, 0.3]])
+    peer_margins = np.array([[[0.1, 0.1], [np.nan, np.nan]]])
+    peer_weights = np.array([[0.6, 0.4]])
+    scores, beats = margin_beat_scores(ticker_margins, peer_margins, peer_weights)
+
+    expected = score_margins_competitors({"A": [1, 1]}, {"A": 0.6, "B": 0.4})
+    assert scores[0]==expected==10
+    assert beats[0, 0]==2
+
+
+def test_ranks_match_compare_multiples_peers(rng):
+    multiples = rng.choice([-5, 8, 12, 12, 20, 35, np.nan], (N_TICKERS, N_PEERS + 1, len(Multiples.KPIS))).astype(float)
+
+    np.testing.assert_array_equal(multiple_rank_scores(multiples), per_ticker_ranks(multiples))
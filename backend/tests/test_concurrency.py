@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from main import execute_batch_process_async
+from utils.concurrency import AnalysisLimiter, QueueFullError
+from conftest import TICKER, PEERS
+
+
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+
+
+def test_limiter_caps_concurrent_analyses():
+    async def scenario():
+        limiter = AnalysisLimiter(max_concurrent=2, max_queue=10)
+        active = []
+
+        async def analysis():
+            async with limiter.slot():
+                active.append(limiter.active)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[analysis() for _ in range(6)])
+        return active, limiter.stats()
+
+    active, stats = asyncio.run(scenario())
+
+    assert max(active)==2
+    assert stats["completed"]==6
+    assert (stats["active"], stats["queued"])==(0, 0)
+
+
+def test_analyze_endpoint_returns_503_when_queue_is_full(monkeypatch):
+    limiter = AnalysisLimiter(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(app_module, "analysis_limiter", limiter)
+
+    response = TestClient(app_module.app).post("/api/analyze_company/", json={
+        "ticker": "FULL",
+        "financial_weights": FINANCIAL_WEIGHTS,
+        "peers": {"custom": PEERS},
+    })
+
+    assert response.status_code==503
+    assert response.json()["rejected"]==1
+
+
+def test_full_queue_rejects_new_analyses():
+    async def scenario():
+        limiter = AnalysisLimiter(max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with limiter.slot():
+                await release.wait()
+
+        running = asyncio.ensure_future(hold_slot())
+        waiting = asyncio.ensure_future(hold_slot())
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.queued)==(1, 1)
+        assert not limiter.has_room(1)
+
+        with pytest.raises(QueueFullError):
+            async with limiter.slot():
+                pass
+
+        # quien ya acoto su cola (trabajos, lotes) espera sin ser rechazado
+        unbounded = asyncio.ensure_future(hold_slot_unbounded(limiter, release))
+        await asyncio.sleep(0)
+        assert limiter.queued==2
+
+        release.set()
+        await asyncio.gather(running, waiting, unbounded)
+        return limiter.stats()
+
+    async def hold_slot_unbounded(limiter, release):
+        async with limiter.slot(limit_queue=False):
+            await release.wait()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["completed"]==3
+    assert stats["rejected"]==1
+
+
+def test_batch_takes_one_slot_per_company(replay_fixtures):
+    companies = [
+        {"ticker": ticker, "financial_weights": FINANCIAL_WEIGHTS, "peers": {"custom": [p for p in PEERS if p!=ticker]}}
+        for ticker in [TICKER, *PEERS]
+    ]
+
+    async def scenario():
+        limiter = AnalysisLimiter(max_concurrent=2, max_queue=10)
+        results = [x async for x in execute_batch_process_async(companies, limiter=limiter)]
+        return limiter.stats(), results
+
+    stats, results = asyncio.run(scenario())
+
+    assert [error for _, _, error in results]==[None]*len(companies)
+    assert stats["completed"]==len(companies)
@@ -0,0 +1,85 @@
+import datetime
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+from utils.data_provider import (
+    DataProvider,
+    FixtureStore,
+    FixtureNotFoundError,
+    RecordProvider,
+    ReplayProvider
+)
+
+
+URL = "https://stockanalysis.com/stocks/aapl/financials/?p=trailing"
+
+
+def price(start: str, periods: int) -> pd.DataFrame:
+    index = pd.bdate_range(start, periods=periods, tz="America/New_York", name="Date")
+    return pd.DataFrame({"Close": range(periods), "Volume": range(100, 100 + periods)}, index=index, dtype=float)
+
+
+class FakeLiveProvider(DataProvider):
+    """Respuestas fijas en lugar de las fuentes reales"""
+
+    def get_statement_page(self, url):
+        return b"<html><table></table></html>"
+
+    def get_price_history(self, symbol, period=None, start=None):
+        return price("2024-01-01", 10)
+
+    def download_prices(self, symbols, period=None, start=None):
+        return {symbol: price("2024-01-01", 10) for symbol in symbols}
+
+    def get_financial_currency(self, ticker):
+        return "EUR"
+
+    def get_finviz_soup(self, ticker):
+        return BeautifulSoup("<html><body>finviz</body></html>", "lxml")
+
+
+def test_incomplete_provider_fails_on_instantiation():
+    class StatementsOnly(DataProvider):
+        def get_statement_page(self, url):
+            return b""
+
+    with pytest.raises(TypeError):
+        StatementsOnly()
+
+
+def test_recorded_responses_are_replayed(tmp_path):
+    fixtures = FixtureStore(str(tmp_path))
+    record = RecordProvider(FakeLiveProvider(), fixtures)
+    replay = ReplayProvider(fixtures)
+
+    page = record.get_statement_page(URL)
+    history = record.get_price_history("AAPL", period="5y")
+    prices = record.download_prices(["MSFT", "EURUSD=X"], period="5y")
+    currency = record.get_financial_currency("SAP")
+    record.get_finviz_soup("AAPL")
+
+    assert replay.get_statement_page(URL)==page
+    pd.testing.assert_frame_equal(replay.get_price_history("AAPL", period="5y"), history)
+    replayed = replay.download_prices(["MSFT", "EURUSD=X"], period="5y")
+    assert set(replayed)==set(prices)
+    pd.testing.assert_frame_equal(replayed["MSFT"], prices["MSFT"])
+    assert replay.get_financial_currency("SAP")==currency
+    assert "finviz" in replay.get_finviz_soup("AAPL").text
+
+
+def test_replayed_prices_are_trimmed_by_start(tmp_path):
+    replay = ReplayProvider(FixtureStore(str(tmp_path)))
+    RecordProvider(FakeLiveProvider(), replay.fixtures).get_price_history("AAPL", period="5y")
+
+    hist_price = replay.get_price_history("AAPL", start=datetime.date(2024, 1, 8))
+
+    assert len(hist_price)==5
+    assert hist_price.index[0].strftime("%Y-%m-%d")=="2024-01-08"
+
+
+def test_missing_fixture(tmp_path):
+    replay = ReplayProvider(FixtureStore(str(tmp_path)))
+
+    with pytest.raises(FixtureNotFoundError):
+        replay.get_statement_page(URL)
+    assert replay.download_prices(["AAPL"], period="5y")=={}
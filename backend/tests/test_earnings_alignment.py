@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+from utils.multiples import align_earnings_to_prices
+from benchmarks.bench_earnings_alignment import replicate_earnings_legacy, synthetic_data
+
+
+@pytest.mark.parametrize("years", [1, 5])
+def test_asof_join_matches_daily_replication(years):
+    hist_price, historic_ttm = synthetic_data(years, seed=years)
+
+    pd.testing.assert_frame_equal(
+        align_earnings_to_prices(hist_price, historic_ttm),
+        replicate_earnings_legacy(hist_price, historic_ttm)
+    )
+
+
+def test_each_day_takes_the_last_reported_earning():
+    hist_price = pd.DataFrame({
+        "period": ["2024-03-29", "2024-03-31", "2024-04-01", "2024-06-30", "2024-07-01"],
+        "Close": [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    historic_ttm = pd.DataFrame(
+        {"Revenue": [200.0, 100.0]},
+        index=pd.Index(["2024-06-30", "2024-03-31"], name="earning_date")
+    )
+
+    aligned = align_earnings_to_prices(hist_price, historic_ttm)
+
+    # antes del primer earning no hay datos, el dia del reporte ya lo usa
+    assert aligned["Revenue"].isna().tolist()==[True, False, False, False, False]
+    assert aligned["Revenue"].tolist()[1:]==[100.0, 100.0, 200.0, 200.0]
+    assert aligned["period"].tolist()==hist_price["period"].tolist()
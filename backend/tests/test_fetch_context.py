@@ -0,0 +1,77 @@
+import time
+import threading
+import pytest
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.fetch_context import FetchContext, skip_peer
+
+
+def test_values_are_memoized():
+    fetch_ctx = FetchContext()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"value": 1}
+
+    first = fetch_ctx.get_or_fetch(("statement", "AAPL"), loader)
+    second = fetch_ctx.get_or_fetch(("statement", "AAPL"), loader)
+
+    assert first is second
+    assert len(calls)==1
+    assert fetch_ctx.stats()=={"hits": 1, "misses": 1}
+
+
+def test_errors_are_not_memoized():
+    fetch_ctx = FetchContext()
+
+    def failing_loader():
+        raise ValueError("404")
+
+    with pytest.raises(ValueError):
+        fetch_ctx.get_or_fetch(("statement", "AAPL"), failing_loader)
+
+    assert fetch_ctx.get_or_fetch(("statement", "AAPL"), lambda: "ok")=="ok"
+    assert fetch_ctx.stats()=={"hits": 0, "misses": 2}
+
+
+def test_bounded_fetch_respects_deadline():
+    fetch_ctx = FetchContext(deadline=Deadline(0.05))
+    release = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        return "tarde"
+
+    start = time.monotonic()
+    with fetch_ctx.bounded(), pytest.raises(DeadlineExceeded):
+        fetch_ctx.get_or_fetch(("statement", "P01"), slow_loader)
+    assert time.monotonic() - start<1
+
+    # con el deadline vencido no se inician nuevas descargas
+    with fetch_ctx.bounded(), pytest.raises(DeadlineExceeded):
+        fetch_ctx.get_or_fetch(("statement", "P02"), lambda: "ok")
+
+    # fuera de `bounded()` la descarga espera sin limite
+    assert fetch_ctx.get_or_fetch(("statement", "AAPL"), lambda: "ok")=="ok"
+    release.set()
+
+
+def test_children_share_memo_with_own_stats():
+    parent = FetchContext()
+    first, second = FetchContext(parent=parent), FetchContext(parent=parent)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "tabla"
+
+    assert first.get_or_fetch(("statement", "MSFT"), loader)=="tabla"
+    assert second.get_or_fetch(("statement", "MSFT"), loader)=="tabla"
+
+    assert len(calls)==1
+    assert first.stats()=={"hits": 0, "misses": 1}
+    assert second.stats()=={"hits": 1, "misses": 0}
+
+    skip_peer(first, "p01", "income", DeadlineExceeded())
+    assert first.skip_reason("P01", "income")=="deadline"
+    assert second.skip_reason("P01", "income")=="error"
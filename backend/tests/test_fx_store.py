@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from datetime import date, timedelta
+from utils import fx_store as fx_module
+from utils.fx_store import FxRateStore, exchange_rate_from_price
+
+
+class FakeFxProvider:
+    """Historia del par de monedas hasta `last_day`; las descargas desde una
+    fecha sin cotizaciones retornan un DataFrame vacio sin indice de fechas"""
+
+    def __init__(self, last_day: date):
+        self.last_day = last_day
+        self.starts = []
+
+    def get_price_history(self, symbol, period=None, start=None):
+        self.starts.append(start)
+        index = pd.bdate_range(end=self.last_day, periods=30, name="Date")
+        hist_price = pd.DataFrame({"Close": [4000.0 + i for i in range(len(index))]}, index=index)
+        if start is not None:
+            hist_price = hist_price[hist_price.index.date>=start]
+            if hist_price.empty:
+                return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+        return hist_price
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = FakeFxProvider(last_day=date.today() - timedelta(days=3))
+    monkeypatch.setattr(fx_module, "get_data_provider", lambda: provider)
+    return provider
+
+
+def test_empty_price_history():
+    exchange_rate = exchange_rate_from_price(pd.DataFrame(columns=["Close"]))
+
+    assert list(exchange_rate.columns)==["period", "exchange"]
+    assert exchange_rate.empty
+
+
+def test_series_is_refreshed_from_last_period(provider):
+    store = FxRateStore(max_currencies=2)
+    first = store.get("COP")
+    assert provider.starts==[None]
+
+    # al dia siguiente solo se descargan los dias desde el ultimo guardado
+    store._refreshed_on["COP"] = date.today() - timedelta(days=1)
+    provider.last_day = provider.last_day + timedelta(days=7)
+    refreshed = store.get("COP")
+
+    assert provider.starts[1]==date.fromisoformat(first["period"].iloc[-1])
+    assert refreshed["period"].iloc[-1]>first["period"].iloc[-1]
+    assert refreshed["period"].is_unique
+    assert refreshed["period"].is_monotonic_increasing
+
+
+def test_empty_tail_keeps_cached_series(provider):
+    store = FxRateStore(max_currencies=2)
+    first = store.get("COP")
+
+    # sin cotizaciones desde el ultimo periodo guardado (fin de semana o festivo)
+    store._refreshed_on["COP"] = date.today() - timedelta(days=1)
+    provider.last_day = date.fromisoformat(first["period"].iloc[-1]) - timedelta(days=1)
+    refreshed = store.get("COP")
+
+    pd.testing.assert_frame_equal(refreshed, first)
+    assert store._refreshed_on["COP"]==date.today()
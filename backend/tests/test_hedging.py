@@ -0,0 +1,78 @@
+import threading
+import pandas as pd
+import pytest
+from constants import HedgeConfig
+from utils import data_provider
+from utils.hedging import Hedger, hedge_stats
+
+
+@pytest.fixture
+def hedger(monkeypatch):
+    """Hedger con suficientes latencias rapidas y presupuesto para una copia"""
+
+    monkeypatch.setattr(HedgeConfig, "BUDGET_RATIO", 1.0)
+    hedger = Hedger("test")
+    for _ in range(HedgeConfig.MIN_SAMPLES):
+        hedger.call(lambda: "ok")
+
+    return hedger
+
+
+def test_fast_response_is_not_hedged(hedger):
+    assert hedger.call(lambda: "rapida")=="rapida"
+    assert hedger.stats()["hedged"]==0
+
+
+def test_slow_primary_launches_backup_and_first_result_wins(hedger):
+    release = threading.Event()
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+            attempt = len(calls)
+        if attempt==1:
+            # la descarga original se queda esperando
+            release.wait(5)
+            return "original"
+        return "copia"
+
+    try:
+        assert hedger.call(fetch)=="copia"
+    finally:
+        release.set()
+
+    assert len(calls)==2
+    assert hedger.stats()["hedged"]==1
+    assert hedger.stats()["won"]==1
+
+
+def test_failed_backup_waits_for_primary(hedger):
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+            attempt = len(calls)
+        if attempt==1:
+            threading.Event().wait(2*HedgeConfig.MIN_DELAY_SECONDS)
+            return "original"
+        raise ConnectionError("copia fallida")
+
+    assert hedger.call(fetch)=="original"
+    assert hedger.stats()["won"]==0
+
+
+def test_batched_price_download_is_hedged(monkeypatch):
+    monkeypatch.setattr(HedgeConfig, "ENABLED", True)
+    index = pd.date_range("2024-01-02", periods=3, name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "Volume"], ["AAPL", "MSFT"]])
+    frame = pd.DataFrame([[1.0, 2.0, 10, 20]]*3, index=index, columns=columns)
+    monkeypatch.setattr(data_provider.yf, "download", lambda **kwargs: frame)
+
+    prices = data_provider.LiveProvider().download_prices(["AAPL", "MSFT"], period="5d")
+
+    assert set(prices)=={"AAPL", "MSFT"}
+    assert hedge_stats()["download"]["requests"]>=1
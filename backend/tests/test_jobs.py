@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from utils.jobs import JobManager
+from utils.job_store import JobStore, InMemoryJobStore, SQLiteJobStore
+from utils.concurrency import QueueFullError
+
+
+async def wait_status(manager: JobManager, job_id: str, status: str) -> dict:
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job["status"]==status:
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"El trabajo no llego a {status}: {job['status']}")
+
+
+def test_job_lifecycle():
+    async def scenario():
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def runner(request, progress):
+            progress("income")
+            started.set()
+            await finish.wait()
+            progress("balance")
+            return {"ticker": request["ticker"], "score": 1.5}
+
+        manager = JobManager(InMemoryJobStore(), workers=1, runner=runner, max_queue=10)
+        job = manager.submit({"ticker": "AAPL"})
+        assert job["status"]=="queued"
+
+        await started.wait()
+        running = manager.get(job["job_id"])
+        assert running["status"]=="running"
+        assert running["stages"]==["income"]
+
+        finish.set()
+        return await wait_status(manager, job["job_id"], "done")
+
+    done = asyncio.run(scenario())
+
+    assert done["stages"]==["income", "balance"]
+    assert done["result"]=={"ticker": "AAPL", "score": 1.5}
+    assert done["error"] is None
+
+
+def test_job_error_is_reported():
+    async def scenario():
+        async def runner(request, progress):
+            raise ValueError("ticker no encontrado")
+
+        manager = JobManager(InMemoryJobStore(), workers=1, runner=runner, max_queue=10)
+        job = manager.submit({"ticker": "XXXX"})
+        return await wait_status(manager, job["job_id"], "error")
+
+    failed = asyncio.run(scenario())
+
+    assert failed["error"]=="ticker no encontrado"
+    assert failed["result"] is None
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        async def runner(request, progress):
+            return {}
+
+        manager = JobManager(InMemoryJobStore(), workers=1, runner=runner, max_queue=1)
+        # sin ceder el event loop, el worker aun no toma el primer trabajo
+        manager.submit({"ticker": "AAPL"})
+        with pytest.raises(QueueFullError):
+            manager.submit({"ticker": "MSFT"})
+
+    asyncio.run(scenario())
+
+
+def test_incomplete_store_fails_on_instantiation():
+    class CreateOnly(JobStore):
+        def create(self, job):
+            pass
+
+    with pytest.raises(TypeError):
+        CreateOnly()
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_store_round_trip(kind, tmp_path):
+    store = InMemoryJobStore() if kind=="memory" else SQLiteJobStore(str(tmp_path / "jobs.sqlite"))
+    job = {
+        "job_id": "abc", "status": "queued", "stages": [], "request": {"ticker": "AAPL"},
+        "result": None, "error": None, "created_at": 1.0, "updated_at": 1.0,
+    }
+    store.create(job)
+    store.update("abc", status="done", stages=["income"], result={"score": 1.5})
+
+    saved = store.get("abc")
+    assert (saved["status"], saved["stages"], saved["result"])==("done", ["income"], {"score": 1.5})
+    assert saved["request"]=={"ticker": "AAPL"}
+
+    store.purge(older_than=saved["updated_at"] + 1)
+    assert store.get("abc") is None
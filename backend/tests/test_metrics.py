@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import app as app_module
+from constants import MetricsConfig
+from main import execute_process
+from utils.metrics import stage_span, upstream_span
+from conftest import TICKER, PEERS
+
+
+def observations(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(f"{name}_count", labels) or 0
+
+
+def test_stage_span_observes_even_on_error():
+    before = observations("analysis_stage_seconds", stage="test_stage", ticker="AAA")
+
+    with stage_span("test_stage", "aaa"):
+        pass
+    with pytest.raises(ValueError):
+        with stage_span("test_stage", "aaa"):
+            raise ValueError("etapa fallida")
+
+    assert observations("analysis_stage_seconds", stage="test_stage", ticker="AAA")==before + 2
+
+
+def test_upstream_span_cache_label_and_ticker_cardinality(monkeypatch):
+    monkeypatch.setattr(MetricsConfig, "TICKER_LABEL", False)
+    labels = {"source": "test", "data_type": "page", "ticker": "*"}
+    hits = observations("upstream_request_seconds", **labels, cache="hit")
+
+    # el bloque cambia la etiqueta `cache` antes de registrar
+    with upstream_span("test", "page", "AAA") as span_labels:
+        span_labels["cache"] = "hit"
+
+    assert observations("upstream_request_seconds", **labels, cache="hit")==hits + 1
+    assert observations("upstream_request_seconds", **labels, cache="miss")==0
+
+
+def test_metrics_endpoint_exposes_analysis_stages(replay_fixtures):
+    execute_process(TICKER, {"income": {"growth": 0.5, "peers": 0.5}}, {"custom": PEERS}, None)
+
+    response = TestClient(app_module.app).get("/metrics")
+
+    assert response.status_code==200
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ["income", "balance", "cash_flow", "price_historic", "price_competitors"]:
+        assert f'analysis_stage_seconds_count{{stage="{stage}",ticker="{TICKER}"}}' in response.text
+    assert "upstream_request_seconds_count" in response.text
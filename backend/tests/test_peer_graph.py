@@ -0,0 +1,80 @@
+import time
+import pytest
+import preload_peers
+from handlers import income_handler
+from utils.peer_graph import PeerGraph
+
+
+FINVIZ = {
+    "AAA": (["BBB", "CCC", "DDD"], "Technology", "Software"),
+    "BBB": (["AAA", "EEE"], "Technology", "Software"),
+}
+
+
+@pytest.fixture
+def graph(tmp_path):
+    return PeerGraph(path=str(tmp_path / "peer_graph.sqlite"), ttl_seconds=3600)
+
+
+@pytest.fixture
+def finviz(monkeypatch):
+    calls = []
+
+    def fetch_finviz_peers(ticker):
+        calls.append(ticker)
+        if ticker not in FINVIZ:
+            raise ConnectionError(f"finviz no responde: {ticker}")
+        return FINVIZ[ticker]
+
+    monkeypatch.setattr(income_handler, "fetch_finviz_peers", fetch_finviz_peers)
+    monkeypatch.setattr(preload_peers, "fetch_finviz_peers", fetch_finviz_peers)
+    return calls
+
+
+def expire(graph: PeerGraph, ticker: str):
+    with graph._connection() as conn:
+        conn.execute("UPDATE peer_graph SET fetched_at=? WHERE ticker=?", (time.time() - 2*graph.ttl_seconds, ticker))
+
+
+def test_entries_persist_and_expire(graph):
+    graph.put("aaa", ["BBB", "CCC"], "Technology", "Software")
+
+    entry = PeerGraph(path=graph.path, ttl_seconds=graph.ttl_seconds).get("AAA")
+    assert (entry["peers"], entry["sector"], entry["industry"])==(["BBB", "CCC"], "Technology", "Software")
+
+    expire(graph, "AAA")
+    assert graph.get("AAA") is None
+    assert graph.get("AAA", allow_stale=True)["peers"]==["BBB", "CCC"]
+
+
+def test_competitors_from_graph_without_finviz(graph, finviz, monkeypatch):
+    monkeypatch.setattr(income_handler, "get_peer_graph", lambda: graph)
+
+    # la primera consulta guarda la lista completa, la segunda no consulta finviz
+    assert income_handler.load_competitors_tickers("AAA", 2)==["BBB", "CCC"]
+    assert income_handler.load_competitors_tickers("AAA", 3)==["BBB", "CCC", "DDD"]
+    assert finviz==["AAA"]
+
+
+def test_stale_competitors_when_finviz_fails(graph, finviz, monkeypatch):
+    monkeypatch.setattr(income_handler, "get_peer_graph", lambda: graph)
+    graph.put("ZZZ", ["YYY"])
+    expire(graph, "ZZZ")
+
+    assert income_handler.load_competitors_tickers("ZZZ", 5)==["YYY"]
+    with pytest.raises(ConnectionError):
+        income_handler.load_competitors_tickers("NEW", 5)
+
+
+def test_preload_walks_the_graph_breadth_first(graph, finviz, monkeypatch):
+    monkeypatch.setattr(preload_peers, "get_peer_graph", lambda: graph)
+
+    summary = preload_peers.preload_peer_graph(["AAA"], depth=1, delay=0)
+
+    # AAA y sus competidores: BBB existe en finviz, CCC y DDD fallan
+    assert finviz==["AAA", "BBB", "CCC", "DDD"]
+    assert summary=={"cached": 0, "fetched": 2, "error": 2}
+    assert graph.get("BBB")["peers"]==["AAA", "EEE"]
+
+    summary = preload_peers.preload_peer_graph(["AAA"], depth=0, delay=0)
+    assert summary=={"cached": 1, "fetched": 0, "error": 0}
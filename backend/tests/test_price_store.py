@@ -0,0 +1,90 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from utils import price_store as price_module
+from utils.price_store import PriceStore, to_price_matrix, price_from_matrix, normalize_price
+
+
+class FakePriceProvider:
+    """Precio diario de cada simbolo hasta `last_day`, con `close_offset` para
+    simular un historico ajustado por yfinance (dividendos o splits)"""
+
+    def __init__(self, last_day: pd.Timestamp):
+        self.last_day = last_day
+        self.close_offset = 0.0
+        self.calls = []
+
+    def download_prices(self, symbols, period=None, start=None):
+        self.calls.append((tuple(symbols), start))
+        index = pd.bdate_range(end=self.last_day, periods=300, name="Date")
+        prices = {}
+        for symbol in symbols:
+            hist_price = pd.DataFrame(
+                # el cierre depende solo de la fecha: el mismo dia tiene el mismo precio en cada descarga
+                {"Close": (index - pd.Timestamp("2000-01-01")).days + 100.0 + self.close_offset, "Volume": 1_000},
+                index=index
+            )
+            if start is not None:
+                hist_price = hist_price[hist_price.index.date>=start]
+            prices[symbol] = hist_price
+        return prices
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = FakePriceProvider(last_day=pd.Timestamp.today().normalize() - pd.Timedelta(days=10))
+    monkeypatch.setattr(price_module, "get_data_provider", lambda: provider)
+    return provider
+
+
+def age_files(folder: str, days: float):
+    """Simula que los precios guardados se refrescaron hace `days` dias"""
+    refreshed_at = time.time() - days*86400
+    for name in os.listdir(folder):
+        os.utime(os.path.join(folder, name), (refreshed_at, refreshed_at))
+
+
+def test_partial_rows_without_volume():
+    index = pd.date_range("2024-01-02", periods=3, name="period")
+    matrix = to_price_matrix({
+        "AAPL": pd.DataFrame({"Close": [1.0, 2.0, 3.0], "Volume": [10.0, np.nan, 30.0]}, index=index),
+        "MSFT": pd.DataFrame({"Close": [4.0, np.nan, 6.0], "Volume": [40.0, np.nan, 60.0]}, index=index),
+    })
+
+    aapl = price_from_matrix(matrix, "AAPL")
+    assert aapl["Volume"].tolist()==[10, 0, 30]
+    assert aapl["Volume"].dtype=="int64"
+    assert len(price_from_matrix(matrix, "MSFT"))==2
+
+
+def test_outdated_prices_download_only_the_missing_days(provider, tmp_path):
+    store = PriceStore(folder=str(tmp_path), years=5)
+    first = store.get_many(["AAPL", "MSFT"], allow_stale=False)
+    assert provider.calls==[(("AAPL", "MSFT"), None)]
+
+    age_files(str(tmp_path), days=3)
+    provider.last_day = provider.last_day + pd.Timedelta(days=7)
+    refreshed = store.get_many(["AAPL", "MSFT"], allow_stale=False)
+
+    # una sola descarga agrupada desde el penultimo dia guardado
+    symbols, start = provider.calls[1]
+    assert set(symbols)=={"AAPL", "MSFT"}
+    assert start==first["AAPL"].index[-2].date()
+    assert refreshed["AAPL"].index[-1]>first["AAPL"].index[-1]
+    assert refreshed["AAPL"].index.is_unique
+    pd.testing.assert_frame_equal(refreshed["AAPL"].loc[first["AAPL"].index], first["AAPL"])
+
+
+def test_adjusted_history_is_downloaded_again(provider, tmp_path):
+    store = PriceStore(folder=str(tmp_path), years=5)
+    store.get_many(["AAPL"], allow_stale=False)
+
+    age_files(str(tmp_path), days=3)
+    provider.close_offset = 5.0
+    refreshed = store.get_many(["AAPL"], allow_stale=False)
+
+    assert provider.calls[-1]==(("AAPL",), None)
+    expected = normalize_price(provider.download_prices(["AAPL"])["AAPL"])
+    pd.testing.assert_series_equal(refreshed["AAPL"]["Close"], expected["Close"])
@@ -0,0 +1,142 @@
+import time
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from utils.rate_limiter import HostLimiter, host_key, get_host_limiter
+from utils.http_client import was_throttled, _build_session
+
+
+def build_limiter(**kwargs) -> HostLimiter:
+    config = dict(
+        host="example.com",
+        max_rate=100.0,
+        burst=100,
+        initial_limit=8,
+        min_limit=1,
+        max_limit=16,
+        decrease_factor=0.5,
+        cooldown=60.0
+    )
+    config.update(kwargs)
+    return HostLimiter(**config)
+
+
+def test_throttled_response_halves_concurrency_and_rate():
+    limiter = build_limiter()
+    limiter.acquire()
+    limiter.release("throttled")
+
+    assert limiter.stats()["concurrency_limit"]==4
+    assert limiter.rate==50.0
+    assert limiter.throttled==1
+
+
+def test_burst_of_throttled_responses_decreases_once_per_cooldown():
+    limiter = build_limiter()
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release("throttled")
+
+    assert limiter.stats()["concurrency_limit"]==4
+    assert limiter.rate==50.0
+
+
+def test_limits_never_go_below_minimum():
+    limiter = build_limiter(initial_limit=2, cooldown=0.0)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release("throttled")
+
+    assert limiter.stats()["concurrency_limit"]==1
+    assert limiter.rate==limiter.min_rate
+
+
+def test_successes_recover_rate_and_concurrency():
+    limiter = build_limiter(initial_limit=2, cooldown=0.0)
+    limiter.acquire()
+    limiter.release("throttled")
+    assert limiter.stats()["concurrency_limit"]==1
+
+    # una ventana de `limit` respuestas exitosas con la concurrencia en uso
+    limiter.acquire()
+    limiter.release("ok")
+
+    assert limiter.stats()["concurrency_limit"]==2
+    assert limiter.rate==60.0
+
+
+def test_connection_errors_do_not_change_limits():
+    limiter = build_limiter()
+    limiter.acquire()
+    limiter.release("error")
+
+    assert limiter.stats()["concurrency_limit"]==8
+    assert limiter.rate==100.0
+
+
+def test_empty_bucket_waits_for_tokens():
+    limiter = build_limiter(max_rate=20.0, burst=1)
+    limiter.acquire()
+    limiter.release("ok")
+
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.release("ok")
+
+    assert time.monotonic() - start>=0.04
+
+
+def test_throttled_after_retries():
+    retries = SimpleNamespace(history=[SimpleNamespace(status=429)])
+    response = SimpleNamespace(status_code=200, raw=SimpleNamespace(retries=retries))
+
+    assert was_throttled(response)
+    assert not was_throttled(SimpleNamespace(status_code=200, raw=None))
+    assert was_throttled(SimpleNamespace(status_code=503, raw=None))
+
+
+def test_host_key_ignores_www():
+    assert host_key("https://www.finviz.com/quote.ashx?t=AAPL")=="finviz.com"
+
+
+@pytest.fixture
+def throttling_server():
+    """Servidor local que responde 429 a la primera request y 200 a las siguientes"""
+
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            status = 429 if len(calls)==1 else 200
+            body = b"ok" if status==200 else b"too many requests"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/page", calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_each_retry_goes_through_the_limiter(throttling_server):
+    url, calls = throttling_server
+    limiter = get_host_limiter(url)
+    completed, throttled = limiter.completed, limiter.throttled
+
+    response = _build_session().get(url, timeout=5)
+
+    assert response.status_code==200
+    assert len(calls)==2
+    # el 429 y el reintento tomaron cada uno su token y cupo
+    assert limiter.completed - completed==2
+    assert limiter.throttled - throttled==1
@@ -0,0 +1,81 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from main import execute_process, score_analysis
+from utils.raw_metrics_store import raw_metrics_store
+from conftest import TICKER, PEERS
+
+
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+MULTIPLES_WEIGHTS = {"pe_ratio": 0.25, "ps_ratio": 0.25, "pgp_ratio": 0.25, "pfcf_ratio": 0.25}
+NEW_FINANCIAL_WEIGHTS = {
+    "income": {"total": 0.5, "growth": 0.2, "peers": 0.8},
+    "balance": {"total": 0.3},
+    "cash_flow": {"total": 0.2},
+}
+NEW_MULTIPLES_WEIGHTS = {"pe_ratio": 0.4, "ps_ratio": 0.1, "pgp_ratio": 0.1, "pfcf_ratio": 0.4}
+
+
+def peers_cfg(weights: list) -> dict:
+    return {"custom": {peer: {"weight": w} for peer, w in zip(PEERS, weights)}}
+
+
+def canonical(response: dict) -> str:
+    # NaN != NaN: se comparan las respuestas serializadas
+    return json.dumps(response, sort_keys=True, default=str)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_rescore_matches_full_run(replay_fixtures):
+    execute_process(TICKER, FINANCIAL_WEIGHTS, peers_cfg([0.2, 0.3, 0.5]), MULTIPLES_WEIGHTS)
+    raw_metrics, _ = raw_metrics_store.get(TICKER, peers_cfg([0.2, 0.3, 0.5]))
+
+    rescored = score_analysis(
+        raw_metrics,
+        financial_weights=NEW_FINANCIAL_WEIGHTS,
+        multiples_weights=NEW_MULTIPLES_WEIGHTS,
+        peers_weights=dict(zip(PEERS, [0.6, 0.3, 0.1]))
+    )
+    full_run = execute_process(TICKER, NEW_FINANCIAL_WEIGHTS, peers_cfg([0.6, 0.3, 0.1]), NEW_MULTIPLES_WEIGHTS)
+    full_run.pop("metadata")
+
+    assert canonical(rescored)==canonical(full_run)
+
+
+def test_rescore_endpoint_matches_full_run(replay_fixtures, client):
+    execute_process(TICKER, FINANCIAL_WEIGHTS, peers_cfg([0.2, 0.3, 0.5]), MULTIPLES_WEIGHTS)
+
+    response = client.post("/api/rescore/", json={
+        "ticker": TICKER,
+        "financial_weights": NEW_FINANCIAL_WEIGHTS,
+        "peers": peers_cfg([0.6, 0.3, 0.1]),
+        "multiples_weights": NEW_MULTIPLES_WEIGHTS,
+    })
+    assert response.status_code==200
+    rescored = response.json()
+
+    full_run = execute_process(TICKER, NEW_FINANCIAL_WEIGHTS, peers_cfg([0.6, 0.3, 0.1]), NEW_MULTIPLES_WEIGHTS)
+    assert rescored["financials"]["score_final"]==full_run["financials"]["score_final"]
+    assert rescored["financials"]["income"]["score_final"]==pytest.approx(full_run["financials"]["income"]["score_final"])
+    assert rescored["price_historic"]["score_final"]==pytest.approx(full_run["price_historic"]["score_final"])
+
+
+@pytest.mark.parametrize("peers", [None, {}, {"n_competitors": 3}, {"custom": "MSFT"}, {"custom": {"MSFT": 1}}])
+def test_rescore_rejects_invalid_peers(client, peers):
+    response = client.post("/api/rescore/", json={"ticker": TICKER, "financial_weights": FINANCIAL_WEIGHTS, "peers": peers})
+    assert response.status_code==400
+
+
+def test_rescore_without_previous_analysis(client):
+    response = client.post("/api/rescore/", json={
+        "ticker": "NOPE",
+        "financial_weights": FINANCIAL_WEIGHTS,
+        "peers": {"custom": ["P01"]},
+    })
+    assert response.status_code==404
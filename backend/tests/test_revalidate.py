@@ -0,0 +1,95 @@
+import threading
+from datetime import datetime
+import pytest
+
+import main
+from constants import StaleCacheConfig
+from main import execute_process, get_cached_analysis
+from utils.raw_metrics_store import raw_metrics_store
+from utils.revalidate import MARKET_TZ, BackgroundRefresher, is_market_open, last_market_close, price_is_fresh
+from conftest import TICKER, PEERS
+
+
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+PEERS_CFG = {"custom": PEERS}
+
+# miercoles con el mercado abierto y sabado con el mercado cerrado
+WEDNESDAY_NOON = datetime(2024, 6, 12, 12, 0, tzinfo=MARKET_TZ)
+SATURDAY = datetime(2024, 6, 15, 10, 0, tzinfo=MARKET_TZ)
+
+
+class FakeRefresher:
+    def __init__(self):
+        self.keys = []
+
+    def schedule(self, key, refresh):
+        self.keys.append(key)
+        return True
+
+
+def test_last_market_close():
+    assert is_market_open(WEDNESDAY_NOON)
+    assert not is_market_open(SATURDAY)
+    assert last_market_close(WEDNESDAY_NOON)==datetime(2024, 6, 11, 16, 0, tzinfo=MARKET_TZ)
+    assert last_market_close(SATURDAY)==datetime(2024, 6, 14, 16, 0, tzinfo=MARKET_TZ)
+    # el lunes antes de abrir el ultimo cierre es el viernes
+    assert last_market_close(datetime(2024, 6, 17, 8, 0, tzinfo=MARKET_TZ))==datetime(2024, 6, 14, 16, 0, tzinfo=MARKET_TZ)
+
+
+def test_price_freshness_follows_the_market():
+    minutes = StaleCacheConfig.PRICE_FRESH_MINUTES*60
+    assert price_is_fresh(WEDNESDAY_NOON.timestamp() - minutes/2, now=WEDNESDAY_NOON)
+    assert not price_is_fresh(WEDNESDAY_NOON.timestamp() - 2*minutes, now=WEDNESDAY_NOON)
+
+    # con el mercado cerrado vale hasta el siguiente cierre
+    friday_close = datetime(2024, 6, 14, 16, 5, tzinfo=MARKET_TZ)
+    assert price_is_fresh(friday_close.timestamp(), now=SATURDAY)
+    assert not price_is_fresh(datetime(2024, 6, 14, 15, 0, tzinfo=MARKET_TZ).timestamp(), now=SATURDAY)
+
+
+def test_refresher_skips_pending_keys_and_counts_failures():
+    refresher = BackgroundRefresher(workers=2)
+    release = threading.Event()
+
+    assert refresher.schedule(("price", "AAA"), lambda: release.wait(5))
+    assert not refresher.schedule(("price", "AAA"), lambda: None)
+    release.set()
+
+    def fail():
+        raise ConnectionError("sin respuesta")
+
+    refresher.schedule(("price", "BBB"), fail)
+    refresher._executor.shutdown(wait=True)
+
+    assert refresher.stats()=={"pending": 0, "scheduled": 2, "completed": 1, "failed": 1}
+
+
+@pytest.fixture
+def cached_analysis(replay_fixtures, monkeypatch):
+    refresher = FakeRefresher()
+    monkeypatch.setattr(main, "background_refresher", refresher)
+    execute_process(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None)
+    return refresher
+
+
+def test_recent_analysis_is_fresh(cached_analysis):
+    response = get_cached_analysis(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None)
+
+    assert response["metadata"]["cache"]["status"]=="fresh"
+    assert cached_analysis.keys==[]
+
+
+def test_expired_analysis_is_served_and_refreshed(cached_analysis, monkeypatch):
+    monkeypatch.setattr(main, "price_is_fresh", lambda refreshed_at: False)
+
+    response = get_cached_analysis(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None)
+
+    assert response["metadata"]["cache"]["status"]=="stale"
+    assert cached_analysis.keys==[("analysis", *raw_metrics_store.make_key(TICKER, PEERS_CFG))]
+
+
+def test_analysis_past_its_budget_is_not_served(cached_analysis, monkeypatch):
+    monkeypatch.setattr(StaleCacheConfig, "ANALYSIS_STALE_HOURS", 0)
+
+    assert get_cached_analysis(TICKER, FINANCIAL_WEIGHTS, PEERS_CFG, None) is None
+    assert cached_analysis.keys==[]
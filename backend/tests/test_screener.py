@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from utils.screener_store import ScreenerStore
+
+
+ROWS = [
+    {"ticker": "AAA", "score_financial": 8.0, "score_price_historic": 7.5, "debt_ratio": 0.2, "peers": ["BBB"]},
+    {"ticker": "BBB", "score_financial": 6.0, "score_price_historic": 9.0, "debt_ratio": 0.6, "peers": ["AAA"]},
+    {"ticker": "CCC", "score_financial": None, "score_price_historic": 3.0, "debt_ratio": 0.4, "peers": []},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScreenerStore(path=str(tmp_path / "screener.sqlite"))
+    for row in ROWS:
+        store.upsert(row)
+    return store
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(app_module, "get_screener_store", lambda: store)
+    return TestClient(app_module.app)
+
+
+def test_filters_sort_and_limit(store):
+    rows = store.query(filters=[{"field": "score_price_historic", "op": ">", "value": 5}], sort="debt_ratio", order="asc")
+    assert [row["ticker"] for row in rows]==["AAA", "BBB"]
+    assert rows[0]["peers"]==["BBB"]
+
+    # los valores nulos van al final sin importar el orden
+    rows = store.query(sort="score_financial", order="asc", limit=2)
+    assert [row["ticker"] for row in rows]==["BBB", "AAA"]
+
+
+def test_screen_endpoint(client):
+    response = client.post("/api/screen/", json={"filters": [{"field": "debt_ratio", "op": "<=", "value": 0.4}]})
+
+    assert response.status_code==200
+    assert [row["ticker"] for row in response.json()["results"]]==["AAA", "CCC"]
+    assert response.json()["metadata"]["tickers"]==3
+
+
+@pytest.mark.parametrize("body", [
+    {"filters": ["score_financial > 5"]},
+    {"filters": {"field": "score_financial", "op": ">", "value": 5}},
+    {"filters": [{"field": "ticker; DROP TABLE screen", "op": ">", "value": 5}]},
+    {"filters": [{"field": "score_financial", "op": "LIKE", "value": 5}]},
+    {"filters": [{"field": "score_financial", "op": ">", "value": "alto"}]},
+    {"filters": [{"field": "score_financial", "op": ">"}]},
+    {"sort": "peers"},
+    {"order": "random"},
+])
+def test_invalid_screen_request(client, body):
+    assert client.post("/api/screen/", json=body).status_code==400
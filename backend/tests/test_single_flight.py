@@ -0,0 +1,66 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from utils.single_flight import SingleFlight
+
+
+def run_concurrently(single_flight: SingleFlight, loader, n: int=4):
+    """`n` llamados con la misma llave, el loader espera a que todos esten en curso"""
+
+    release = threading.Event()
+
+    def _loader():
+        release.wait(5)
+        return loader()
+
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        futures = [executor.submit(single_flight.do, ("statement", "AAPL"), _loader) for _ in range(n)]
+        # todos los llamados quedan esperando la descarga del primero
+        while single_flight.coalesced<n - 1:
+            threading.Event().wait(0.01)
+        release.set()
+
+    return futures
+
+
+def test_concurrent_calls_share_one_result():
+    single_flight = SingleFlight()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"value": 1}
+
+    results = [f.result() for f in run_concurrently(single_flight, loader)]
+
+    assert len(calls)==1
+    assert all(result is results[0] for result in results)
+    assert single_flight.stats()=={"in_flight": 0, "executed": 1, "coalesced": 3}
+
+
+def test_concurrent_calls_share_one_error():
+    single_flight = SingleFlight()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise ValueError("404")
+
+    futures = run_concurrently(single_flight, loader)
+
+    assert len(calls)==1
+    errors = [f.exception() for f in futures]
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_error_is_not_kept():
+    single_flight = SingleFlight()
+
+    def failing_loader():
+        raise ValueError("404")
+
+    with pytest.raises(ValueError):
+        single_flight.do(("statement", "AAPL"), failing_loader)
+
+    assert single_flight.do(("statement", "AAPL"), lambda: "ok")=="ok"
+    assert single_flight.executed==2
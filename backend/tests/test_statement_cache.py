@@ -0,0 +1,56 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from utils.statement_cache import StatementCache, next_expected_filing
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StatementCache(path=str(tmp_path / "statements.sqlite"), max_bytes=10_000, stale_seconds=60)
+
+
+def test_entry_is_served_until_it_expires(cache):
+    cache.set("html|AAPL|income|0", b"<html>", "AAPL", "income", False, time.time() + 60)
+
+    assert cache.get("html|AAPL|income|0")==b"<html>"
+
+
+def test_expired_entry_is_stale_within_budget(cache):
+    expires_at = time.time() - 30
+    cache.set("html|AAPL|income|0", b"<html>", "AAPL", "income", False, expires_at)
+
+    # vencida: no se sirve como vigente, pero si como stale dentro del presupuesto
+    assert cache.get("html|AAPL|income|0") is None
+    assert cache.get_entry("html|AAPL|income|0")==(b"<html>", expires_at)
+
+
+def test_entry_past_stale_budget_is_deleted(cache):
+    cache.set("html|AAPL|income|0", b"<html>", "AAPL", "income", False, time.time() - 120)
+
+    assert cache.get_entry("html|AAPL|income|0") is None
+    assert cache.get_entry("html|AAPL|income|0", allow_stale=True) is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    payload = b"x"*4_000
+    cache.set("a", payload, "A", "income", False, time.time() + 60)
+    cache.set("b", payload, "B", "income", False, time.time() + 60)
+    cache.get("a")
+    cache.set("c", payload, "C", "income", False, time.time() + 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a")==payload
+    assert cache.get("c")==payload
+
+
+def test_next_expected_filing_after_last_period():
+    last_period = datetime.now() - timedelta(days=10)
+    expected = next_expected_filing([last_period.strftime("%Y-%m-%d")], is_ttm=True)
+
+    assert expected>time.time() + 30*86400
+
+
+def test_late_filing_is_retried_soon():
+    expected = next_expected_filing(["2000-12-31"], is_ttm=False)
+
+    assert expected<time.time() + 2*86400
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from constants import BalanceKpis
+from utils.fetch_context import FetchContext
+from utils.fetch_data import parse_historic_financial_data
+from utils.statement_parser import extract_statement_table, read_html_statement
+from handlers.balance_handler import calculate_kpis_balance_general
+
+
+DATES = ["Dec 31, 2023", "Dec 31, 2022", "Dec 31, 2021"]
+
+# balance de un banco: sin activos/pasivos corrientes, caja de corto plazo ni inventario
+BANK_BALANCE = {
+    "Cash & Equivalents": ["100", "90", "80"],
+    "Investment Securities": ["200", "180", "150"],
+    "Long-Term Loans": ["500", "450", "400"],
+    "Goodwill": ["50", "50", "50"],
+    "Total Assets": ["850", "770", "680"],
+    "Deposits": ["400", "380", "350"],
+    "Long-Term Debt": ["200", "150", "-"],
+    "Total Liabilities": ["600", "530", "350"],
+    "Total Debt": ["200", "150", "100"],
+}
+
+
+def statement_page(rows: dict, dates: list=DATES, locked: int=0) -> bytes:
+    """Pagina con la estructura de la tabla de stockanalysis, los primeros
+    `locked` periodos bloqueados ("Upgrade")"""
+
+    header_1 = "".join(f"<th>FY {d[-4:]}</th>" for d in dates)
+    header_2 = "".join(f"<th><span>{d[:3]} '{d[-2:]}</span> <span>{d}</span></th>" for d in dates)
+    body = ""
+    for name, cells in rows.items():
+        cells = ["Upgrade"]*locked + cells[locked:]
+        body += f"<tr><td>{name}</td>" + "".join(f"<td>{x}</td>" for x in cells) + "</tr>"
+
+    return (
+        "<html><head><meta charset='utf-8'></head><body><nav>menu</nav>"
+        f"<table><thead><tr><th>Fiscal Year</th>{header_1}</tr>"
+        f"<tr><th>Period Ending</th>{header_2}</tr></thead><tbody>{body}</tbody></table>"
+        "<div><table><tr><td>otra tabla</td></tr></table></div></body></html>"
+    ).encode()
+
+
+@pytest.mark.parametrize("locked", [0, 1])
+def test_extractor_matches_read_html(locked):
+    page = statement_page({"Revenue": ["1,200.5", "1,000", "-"], "Revenue Growth (YoY)": ["20.05%", "5%", "-"]}, locked=locked)
+
+    fast = extract_statement_table(page)
+    pd.testing.assert_frame_equal(fast, read_html_statement(page))
+
+    assert isinstance(fast.index, pd.DatetimeIndex)
+    assert fast.index.name=="earning_date"
+    assert (fast.dtypes==float).all()
+    assert len(fast)==len(DATES) - locked
+    if not locked:
+        assert fast["Revenue"].iloc[0]==1200.5
+        assert fast["Revenue Growth (YoY)"].iloc[1]==5.0
+        assert pd.isnull(fast["Revenue"].iloc[2])
+
+
+def test_missing_kpis_are_dropped():
+    complete, balance = parse_historic_financial_data(statement_page(BANK_BALANCE), BalanceKpis.ANNUAL)
+
+    assert list(balance.columns)==["Cash & Equivalents", "Total Debt", "Total Assets"]
+    assert list(balance.index)==["2023-12-31", "2022-12-31", "2021-12-31"]
+    assert list(complete.columns)==list(BANK_BALANCE)
+
+
+def test_balance_without_current_items_uses_manual_fallbacks():
+    fetch_ctx = FetchContext()
+    fetch_ctx.seed(("statement", "BANK", "balance_sheet", False), extract_statement_table(statement_page(BANK_BALANCE)))
+    income_complete = pd.DataFrame({"Selling, General & Admin": [120.0]})
+
+    kpis = calculate_kpis_balance_general("BANK", income_complete, fetch_ctx=fetch_ctx)
+
+    # caja: 'Cash & Equivalents', activos corrientes: 850 - (500 + 50), pasivos corrientes: 600 - 200
+    assert kpis["cash"]==100
+    assert kpis["months_operation"]==10
+    assert kpis["current_ratio"]==0.75
+    assert kpis["quick_ratio"] is None
+    assert kpis["debt_ratio"]==0.24
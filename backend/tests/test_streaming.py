@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+import main
+from main import execute_process_stream
+from conftest import TICKER, PEERS
+
+
+FINANCIAL_WEIGHTS = {"income": {"growth": 0.5, "peers": 0.5}}
+
+
+async def collect(ticker: str, time_budget: float=None) -> list:
+    sections = []
+    async for section, data in execute_process_stream(
+        ticker=ticker,
+        financial_weights=FINANCIAL_WEIGHTS,
+        peers={"custom": PEERS},
+        multiples_weights=None,
+        time_budget=time_budget
+    ):
+        sections.append(section)
+    return sections
+
+
+def test_sections_are_streamed_in_stage_order(replay_fixtures):
+    sections = asyncio.run(collect(TICKER))
+
+    assert sections==[
+        "financials.income",
+        "peers",
+        "financials.balance",
+        "financials.cash_flow",
+        "financials.score_final",
+        "price_historic",
+        "price_competitors",
+        "metadata",
+    ]
+
+
+def test_failed_analysis_does_not_wait_for_prefetch(replay_fixtures, monkeypatch):
+    prefetch_cancelled = []
+
+    async def endless_prefetch(ticker, peers, fetch_ctx):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            prefetch_cancelled.append(ticker)
+            raise
+
+    monkeypatch.setattr(main, "prefetch_analysis_data", endless_prefetch)
+
+    async def scenario():
+        # ticker sin respuestas grabadas: el analisis falla y no hay deadline
+        with pytest.raises(Exception) as error:
+            await asyncio.wait_for(collect("NOPE"), timeout=10)
+        assert not isinstance(error.value, asyncio.TimeoutError)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert prefetch_cancelled==["NOPE"]
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from constants import AsyncFetchConfig, IncomeKpis, BalanceKpis, CashFlowKpis
+from utils.fetch_context import FetchContext
+from utils.fetch_data import get_financial_data
+from utils.multiples import get_historic_price, get_financial_currency, get_exchange_rate, get_historic_prices_batch
+from handlers.income_handler import resolve_peers
+
+
+# hilos compartidos por todas las requests para las descargas bloqueantes
+# (requests/yfinance), el limite por request lo pone el semaforo
+_io_executor = ThreadPoolExecutor(
+    max_workers=AsyncFetchConfig.IO_WORKERS,
+    thread_name_prefix="fetch-io"
+)
+
+
+async def _run_blocking(semaphore: asyncio.Semaphore, func, *args, **kwargs):
+    """Ejecuta una descarga bloqueante en un hilo, respetando el limite de concurrencia"""
+    loop = asyncio.get_running_loop()
+    if semaphore is None:
+        return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+    async with semaphore:
+        return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def get_financial_data_async(
+    ticker: str,
+    data_type: str,
+    kpis: list,
+    semaphore: asyncio.Semaphore,
+    is_ttm: bool=False,
+    fetch_ctx: FetchContext=None
+):
+    """Version asincrona de `get_financial_data`"""
+    return await _run_blocking(
+        semaphore, get_financial_data,
+        ticker=ticker, data_type=data_type, kpis=kpis, is_ttm=is_ttm, fetch_ctx=fetch_ctx
+    )
+
+
+async def get_historic_price_async(ticker: str, semaphore: asyncio.Semaphore, fetch_ctx: FetchContext=None):
+    """Version asincrona de `get_historic_price` (yfinance)"""
+    return await _run_blocking(semaphore, get_historic_price, ticker, fetch_ctx=fetch_ctx)
+
+
+async def get_financial_currency_async(ticker: str, semaphore: asyncio.Semaphore, fetch_ctx: FetchContext=None):
+    """Version asincrona de `get_financial_currency` (yfinance `tick.info`)"""
+    return await _run_blocking(semaphore, get_financial_currency, ticker, fetch_ctx=fetch_ctx)
+
+
+async def get_exchange_rate_async(currency: str, semaphore: asyncio.Semaphore, fetch_ctx: FetchContext=None):
+    """Version asincrona de `get_exchange_rate` (yfinance)"""
+    return await _run_blocking(semaphore, get_exchange_rate, currency, fetch_ctx=fetch_ctx)
+
+
+async def resolve_peers_async(ticker: str, peers_cfg: dict, fetch_ctx: FetchContext=None):
+    """Version asincrona de `resolve_peers` (puede consultar finviz)"""
+    return await _run_blocking(None, resolve_peers, ticker, peers_cfg, fetch_ctx=fetch_ctx)
+
+
+async def get_historic_prices_batch_async(
+    tickers: list,
+    currencies: list,
+    semaphore: asyncio.Semaphore,
+    fetch_ctx: FetchContext=None
+):
+    """Version asincrona de `get_historic_prices_batch` (una descarga agrupada)"""
+    return await _run_blocking(semaphore, get_historic_prices_batch, tickers, currencies, fetch_ctx=fetch_ctx)
+
+
+async def _prefetch_prices(tickers: list, semaphore: asyncio.Semaphore, fetch_ctx: FetchContext):
+    """Las tasas de cambio dependen de la moneda de los earnings: primero se
+    consulta la moneda de cada ticker y luego se descargan juntos los precios
+    de todos los tickers y los pares de monedas necesarios"""
+    currencies = await asyncio.gather(
+        *[get_financial_currency_async(tick, semaphore, fetch_ctx=fetch_ctx) for tick in tickers],
+        return_exceptions=True
+    )
+    currencies = sorted({x for x in currencies if isinstance(x, str)})
+    await get_historic_prices_batch_async(tickers, currencies, semaphore, fetch_ctx=fetch_ctx)
+
+
+def plan_analysis_fetches(ticker: str, peers: list):
+    """Recursos que necesita `execute_process` para un ticker y sus competidores.
+
+    Return
+    ------
+    statements (set): tuplas (ticker, data_type, kpis, is_ttm) de estados financieros
+    price_tickers (list): tickers de los que se necesita precio historico y moneda
+    """
+    statements = {
+        (ticker, "income", tuple(IncomeKpis.ANNUAL), False),
+        (ticker, "balance_sheet", tuple(BalanceKpis.ANNUAL), False),
+        (ticker, "cash_flow", tuple(CashFlowKpis.ANNUAL), False),
+    }
+    for tick in [ticker, *peers]:
+        statements |= {
+            (tick, "income", tuple(IncomeKpis.TTM), True),
+            (tick, "cash_flow", tuple(CashFlowKpis.TTM), True),
+        }
+    statements |= {(peer, "income", tuple(IncomeKpis.ANNUAL), False) for peer in peers}
+
+    return statements, list(dict.fromkeys([ticker, *peers]))
+
+
+async def prefetch_batch_data(
+    analyses: list,
+    fetch_ctx: FetchContext,
+    max_concurrency: int=AsyncFetchConfig.MAX_CONCURRENCY
+):
+    """Descarga de forma concurrente todo lo que necesitan varios analisis.
+
+    Se planea la union de recursos (estados financieros, precio historico, moneda
+    de los earnings y tasas de cambio) de todos los pares (ticker, competidores)
+    de `analyses` y cada recurso se descarga una sola vez. Lo descargado queda en
+    `fetch_ctx`, de modo que los handlers, que siguen siendo secuenciales, no
+    hacen requests.
+
+    Los errores no se propagan: el handler correspondiente vuelve a intentar
+    la descarga y maneja el error como siempre lo ha hecho.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    statements, price_tickers = set(), []
+    for ticker, peers in analyses:
+        statements_i, price_tickers_i = plan_analysis_fetches(ticker, peers)
+        statements |= statements_i
+        price_tickers += price_tickers_i
+
+    tasks = [
+        get_financial_data_async(tick, data_type, list(kpis), semaphore, is_ttm=is_ttm, fetch_ctx=fetch_ctx)
+        for tick, data_type, kpis, is_ttm in sorted(statements)
+    ]
+    tasks.append(_prefetch_prices(list(dict.fromkeys(price_tickers)), semaphore, fetch_ctx))
+
+    logging.info(f"Descargando {len(tasks)} recursos en paralelo (max_concurrency={max_concurrency})")
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    for e in errors:
+        logging.warning(f"Error en la descarga en paralelo - {e}")
+    logging.info(f"Descarga en paralelo finalizada, errores: {len(errors)}")
+
+
+async def prefetch_analysis_data(
+    ticker: str,
+    peers: list,
+    fetch_ctx: FetchContext,
+    max_concurrency: int=AsyncFetchConfig.MAX_CONCURRENCY
+):
+    """Descarga de forma concurrente todo lo que necesita `execute_process` para
+    el ticker y sus competidores (ver `prefetch_batch_data`)"""
+    await prefetch_batch_data([(ticker, peers)], fetch_ctx, max_concurrency=max_concurrency)
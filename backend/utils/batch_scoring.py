@@ -0,0 +1,175 @@
+"""Scoring vectorizado de muchos tickers a la vez (arreglos tickers x ...).
+
+Reproduce exactamente los scores por ticker de los handlers (`score_growth`,
+`score_balance_general`, `score_margins_competitors` y el rank de
+`compute_compare_multiples_peers`, ver tests/test_batch_scoring.py). No se usa
+en `execute_process` ni en los lotes: cada analisis califica un solo ticker
+con pocos competidores, donde armar los arreglos cuesta mas que el scoring por
+ticker; es para el scoring transversal de universos completos (ver
+benchmarks/bench_batch_scoring.py).
+"""
+import numpy as np
+
+
+# reglas de `process_balance_general`, en el mismo orden: (kpi, regla, menor es mejor)
+BALANCE_RULES = [
+    ("months_operation", 3, False),
+    ("current_ratio", 0.7, False),
+    ("debt_ratio", 0.5, True),
+    ("quick_ratio", 0.7, False),
+]
+
+
+def _sum_axis(values: np.ndarray, axis: int):
+    """Suma secuencial sobre un eje (mismo orden y redondeo del `sum` de python,
+    a diferencia de la suma por pares de numpy), vectorizada sobre los demas ejes.
+    El ciclo es sobre el eje corto (kpis o competidores), cada paso suma todos
+    los tickers a la vez"""
+    total = 0
+    for i in range(values.shape[axis]):
+        total = total + np.take(values, i, axis=axis)
+    return total
+
+
+def stack_periods(frames: list, kpis: list):
+    """Apila estados financieros (periodos x kpis, del mas reciente al mas antiguo)
+    en un arreglo tickers x periodos x kpis, completando con NaN al final.
+
+    Return
+    ------
+    values (np.ndarray): tickers x periodos x kpis
+    n_periods (np.ndarray): periodos de cada ticker
+    """
+    n_periods = np.array([frame.shape[0] for frame in frames], dtype=int)
+    values = np.full((len(frames), max(n_periods, default=0), len(kpis)), np.nan)
+    for i, frame in enumerate(frames):
+        values[i, :n_periods[i], :] = frame[kpis].to_numpy(dtype=float)
+
+    return values, n_periods
+
+
+def growth_scores(values: np.ndarray, n_periods: np.ndarray=None):
+    """Version vectorizada de `utils.growth.score_growth` para muchos tickers.
+
+    Arguments
+    ---------
+    values (np.ndarray): tickers x periodos x kpis, del periodo mas reciente al mas antiguo
+    n_periods (np.ndarray): periodos validos de cada ticker (los demas son relleno)
+
+    Return
+    ------
+    scores (np.ndarray): score de 0 a 10 por ticker, NaN si tiene 3 periodos o menos
+    proportions (np.ndarray): tickers x kpis, proporcion de periodos con crecimiento
+    """
+    n_tickers, max_periods, _ = values.shape
+    if n_periods is None:
+        n_periods = np.full(n_tickers, max_periods)
+
+    # cada periodo vs el anterior, solo entre periodos validos del ticker
+    valid = np.arange(max_periods - 1)[None, :] < (n_periods[:, None] - 1)
+    grows = (values[:, :-1, :] > values[:, 1:, :]) & valid[:, :, None]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proportions = grows.sum(axis=1) / (n_periods[:, None] - 1)
+        scores = 10*_sum_axis(proportions, axis=1)/values.shape[2]
+
+    scores = np.where(n_periods>3, scores, np.nan)
+
+    return scores, proportions
+
+
+def balance_scores(values: np.ndarray, present: np.ndarray=None):
+    """Version vectorizada de `score_balance_general` para muchos tickers.
+
+    Arguments
+    ---------
+    values (np.ndarray): tickers x kpis, en el orden de `BALANCE_RULES`
+    present (np.ndarray): tickers x kpis, False si el kpi no se evalua (en
+        `score_balance_general`, valores None o 0). Por defecto solo los 0 no
+        se evaluan: como en `score_balance_general` (`if kpi:`), un NaN se
+        evalua y no cumple la regla
+
+    Return
+    ------
+    scores (np.ndarray): score de 0 a 10 por ticker
+    decisions (np.ndarray): tickers x kpis, 1 cumple, 0 no cumple, NaN sin evaluar
+    """
+    if present is None:
+        present = values!=0
+
+    rules = np.array([rule for _, rule, _ in BALANCE_RULES])
+    lower_is_better = np.array([lower for _, _, lower in BALANCE_RULES])
+
+    meets = np.where(lower_is_better, values<=rules, values>=rules)
+    decisions = np.where(present, meets.astype(float), np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = 10*np.where(present, meets, False).sum(axis=1)/present.sum(axis=1)
+
+    return scores, decisions
+
+
+def margin_beat_scores(ticker_margins: np.ndarray, peer_margins: np.ndarray, peer_weights: np.ndarray=None):
+    """Version vectorizada de la comparacion de margenes vs la competencia
+    (`compare_margins_competitors` + `score_margins_competitors`).
+
+    Arguments
+    ---------
+    ticker_margins (np.ndarray): tickers x margenes
+    peer_margins (np.ndarray): tickers x competidores x margenes, NaN en los
+        competidores sin informacion (relleno)
+    peer_weights (np.ndarray): tickers x competidores, None para pesos iguales.
+        Si faltan competidores, los pesos de los disponibles se reescalan para
+        que sumen lo mismo que todos los pesos del ticker
+
+    Return
+    ------
+    scores (np.ndarray): score de 0 a 10 por ticker
+    beats (np.ndarray): tickers x competidores, margenes en los que el ticker supera al competidor
+    """
+    available = ~np.isnan(peer_margins).all(axis=2)
+    beats = (ticker_margins[:, None, :] > peer_margins).sum(axis=2)
+    n_margins = peer_margins.shape[2]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if peer_weights is None:
+            peer_weights = np.broadcast_to(1/available.sum(axis=1)[:, None], beats.shape)
+        else:
+            total = _sum_axis(peer_weights, axis=1)
+            total_answered = _sum_axis(np.where(available, peer_weights, 0.0), axis=1)
+            rescale = ~available.all(axis=1) & (total_answered>0)
+            scale = np.where(rescale, total/total_answered, 1.0)
+            peer_weights = scale[:, None]*peer_weights
+        contributions = np.where(available, peer_weights*beats/n_margins, 0.0)
+
+    return 10*_sum_axis(contributions, axis=1), beats
+
+
+def multiple_rank_scores(multiples: np.ndarray):
+    """Version vectorizada del score por rank de `compute_compare_multiples_peers`.
+
+    Arguments
+    ---------
+    multiples (np.ndarray): grupos x empresas x multiplos (cada grupo es el ticker
+        de interes y sus competidores), NaN en las empresas sin informacion
+
+    Return
+    ------
+    scores (np.ndarray): grupos x empresas x multiplos, (rank descendente - 1)/(empresas con dato - 1)
+    """
+    # los multiplos negativos no se comparan
+    multiples = np.where(multiples<0, np.nan, multiples)
+    valid = ~np.isnan(multiples)
+
+    # rank promedio descendente (como `pd.Series.rank(ascending=False)`):
+    # empresas con mayor multiplo + (empates + 1)/2
+    x, y = multiples[:, :, None, :], multiples[:, None, :, :]
+    greater = (y > x).sum(axis=2)
+    ties = (y == x).sum(axis=2)
+    ranks = np.where(valid, greater + (ties + 1)/2, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = (ranks - 1)/(valid.sum(axis=1, keepdims=True) - 1)
+
+    return scores
+
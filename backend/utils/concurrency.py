@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from constants import ServerConfig
+
+
+class QueueFullError(Exception):
+    """Se lanza cuando la cola de analisis del worker esta llena"""
+
+
+class AnalysisLimiter:
+    """Limita la cantidad de analisis que un worker de uvicorn ejecuta al tiempo.
+
+    Los analisis que superan el limite esperan en cola (sin bloquear el event loop)
+    y si la cola supera `max_queue` se rechazan con `QueueFullError`.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def has_room(self, n: int) -> bool:
+        """Caben `n` analisis mas en la cola"""
+        return self.queued + n<=self.max_queue
+
+    @asynccontextmanager
+    async def slot(self, limit_queue: bool=True):
+        """Espera un cupo para ejecutar un analisis. Con `limit_queue=False` no
+        se rechaza por cola llena (quien llama ya acoto su propia cola, ej: los
+        trabajos en segundo plano o un lote validado con `has_room`)"""
+
+        if limit_queue and self.queued>=self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Cola de analisis llena ({self.queued} en espera)")
+
+        self.queued += 1
+        logging.info(f"Analisis en cola - active: {self.active}, queued: {self.queued}")
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# hilos dedicados al calculo de los analisis (pandas), separados del
+# pool de descargas y del executor por defecto del event loop
+analysis_executor = ThreadPoolExecutor(
+    max_workers=ServerConfig.MAX_CONCURRENT_ANALYSES,
+    thread_name_prefix="analysis"
+)
+
+analysis_limiter = AnalysisLimiter(
+    max_concurrent=ServerConfig.MAX_CONCURRENT_ANALYSES,
+    max_queue=ServerConfig.MAX_QUEUED_ANALYSES
+)
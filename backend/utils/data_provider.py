@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+import yfinance as yf
+from bs4 import BeautifulSoup
+from constants import DataProviderConfig, FetchData
+from utils.http_client import http_get
+from utils.hedging import hedged
+
+
+class FixtureNotFoundError(LookupError):
+    """Se lanza en modo replay cuando no hay una respuesta grabada"""
+
+
+class DataProvider(ABC):
+    """Interfaz de las fuentes externas del analisis: paginas de stockanalysis,
+    precios e info de yfinance y pagina de finviz.
+
+    Las fechas de `start` son `datetime.date`; sin `start` se trae el `period`.
+    """
+
+    @abstractmethod
+    def get_statement_page(self, url: str) -> bytes:
+        """Html crudo de una pagina de estados financieros"""
+
+    @abstractmethod
+    def get_price_history(self, symbol: str, period: str=None, start=None) -> pd.DataFrame:
+        """Precio historico de yfinance (`Ticker.history`) de un simbolo"""
+
+    @abstractmethod
+    def download_prices(self, symbols: list, period: str=None, start=None) -> dict:
+        """Precio historico de varios simbolos en una descarga agrupada
+        (`yf.download`, auto ajustado). Retorna {simbolo: DataFrame con Close y
+        Volume}, los simbolos sin datos no se incluyen"""
+
+    @abstractmethod
+    def get_financial_currency(self, ticker: str) -> str:
+        """Moneda de los estados financieros segun yfinance"""
+
+    @abstractmethod
+    def get_finviz_soup(self, ticker: str) -> BeautifulSoup:
+        """Pagina de finviz del ticker"""
+
+
+class LiveProvider(DataProvider):
+    """Consulta las fuentes reales. Las paginas de estados financieros, la
+    historia de precios y las descargas agrupadas de precios se duplican si
+    tardan mas de lo normal (ver `hedged`)"""
+
+    def get_statement_page(self, url: str) -> bytes:
+        # sesion compartida (keep-alive, timeouts y reintentos),
+        # lanza una excepcion si la respuesta no es exitosa
+        return hedged("statement", lambda: http_get(url).content)
+
+    def get_price_history(self, symbol: str, period: str=None, start=None) -> pd.DataFrame:
+        def _history():
+            tick_yf = yf.Ticker(symbol)
+            if start is None:
+                return tick_yf.history(period=period)
+            return tick_yf.history(start=start.strftime("%Y-%m-%d"))
+
+        return hedged("history", _history)
+
+    def download_prices(self, symbols: list, period: str=None, start=None) -> dict:
+        kwargs = {"period": period} if start is None else {"start": start.strftime("%Y-%m-%d")}
+        # latencias propias: una descarga agrupada tarda mas que la de un simbolo
+        data = hedged("download", lambda: yf.download(
+            tickers=list(symbols),
+            group_by="column",
+            auto_adjust=True,
+            progress=False,
+            **kwargs
+        ))
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, symbols])
+
+        prices = {}
+        for symbol in symbols:
+            if symbol not in data.columns.get_level_values(1):
+                continue
+            hist_price = data.xs(symbol, axis=1, level=1).dropna(subset=["Close"])
+            if hist_price.empty:
+                continue
+            prices[symbol] = hist_price.assign(Volume=hist_price["Volume"].fillna(0).astype("int64"))
+
+        return prices
+
+    def get_financial_currency(self, ticker: str) -> str:
+        return yf.Ticker(ticker).info["financialCurrency"]
+
+    def get_finviz_soup(self, ticker: str) -> BeautifulSoup:
+        # sesion compartida: pasa por el limitador de tasa y concurrencia de finviz
+        url = FetchData.url_finviz.format(ticker=ticker.upper())
+        return BeautifulSoup(http_get(url).content, "lxml")
+
+
+def _fixture_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._=-]+", "_", value).strip("_")
+
+
+class FixtureStore:
+    """Respuestas grabadas en una carpeta local, un archivo por recurso:
+
+    - statements/<url>.html
+    - prices/<simbolo>.pkl (historia mas larga grabada, se recorta por `start`)
+    - currency/<ticker>.json
+    - finviz/<ticker>.html
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._lock = threading.Lock()
+
+    def path(self, kind: str, key: str, ext: str) -> str:
+        return os.path.join(self.folder, kind, f"{_fixture_name(key)}.{ext}")
+
+    def _write(self, path: str, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def read_bytes(self, kind: str, key: str, ext: str) -> bytes:
+        path = self.path(kind, key, ext)
+        if not os.path.exists(path):
+            raise FixtureNotFoundError(f"Sin respuesta grabada: {path}")
+        with open(path, "rb") as f:
+            return f.read()
+
+    def write_bytes(self, kind: str, key: str, ext: str, content: bytes):
+        def _write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+        self._write(self.path(kind, key, ext), _write)
+
+    def read_price(self, symbol: str, start=None) -> pd.DataFrame:
+        path = self.path("prices", symbol, "pkl")
+        if not os.path.exists(path):
+            raise FixtureNotFoundError(f"Sin precio grabado: {path}")
+
+        hist_price = pd.read_pickle(path)
+        if start is not None:
+            index = pd.DatetimeIndex(hist_price.index)
+            if index.tz is not None:
+                index = index.tz_localize(None)
+            hist_price = hist_price[index.normalize()>=pd.Timestamp(start)]
+
+        return hist_price
+
+    def write_price(self, symbol: str, hist_price: pd.DataFrame):
+        """Agrega el precio a lo ya grabado del simbolo (los dias repetidos se reemplazan)"""
+        path = self.path("prices", symbol, "pkl")
+        with self._lock:
+            if os.path.exists(path):
+                stored = pd.read_pickle(path)
+                hist_price = pd.concat([stored, hist_price])
+                hist_price = hist_price[~hist_price.index.duplicated(keep="last")].sort_index()
+            self._write(path, hist_price.to_pickle)
+
+
+class ReplayProvider(DataProvider):
+    """Sirve desde disco las respuestas grabadas por `RecordProvider`, sin red"""
+
+    def __init__(self, fixtures: FixtureStore):
+        self.fixtures = fixtures
+
+    def get_statement_page(self, url: str) -> bytes:
+        return self.fixtures.read_bytes("statements", url, "html")
+
+    def get_price_history(self, symbol: str, period: str=None, start=None) -> pd.DataFrame:
+        return self.fixtures.read_price(symbol, start=start)
+
+    def download_prices(self, symbols: list, period: str=None, start=None) -> dict:
+        prices = {}
+        for symbol in symbols:
+            try:
+                hist_price = self.fixtures.read_price(symbol, start=start)
+            except FixtureNotFoundError as e:
+                logging.warning(f"{e}")
+                continue
+            if not hist_price.empty:
+                prices[symbol] = hist_price[["Close", "Volume"]]
+
+        return prices
+
+    def get_financial_currency(self, ticker: str) -> str:
+        return json.loads(self.fixtures.read_bytes("currency", ticker, "json"))["financialCurrency"]
+
+    def get_finviz_soup(self, ticker: str) -> BeautifulSoup:
+        return BeautifulSoup(self.fixtures.read_bytes("finviz", ticker, "html"), "lxml")
+
+
+class RecordProvider(DataProvider):
+    """Consulta las fuentes reales (`live`) y graba cada respuesta en disco,
+    las descargas agrupadas de precios se graban por simbolo"""
+
+    def __init__(self, live: DataProvider, fixtures: FixtureStore):
+        self.live = live
+        self.fixtures = fixtures
+
+    def get_statement_page(self, url: str) -> bytes:
+        content = self.live.get_statement_page(url)
+        self.fixtures.write_bytes("statements", url, "html", content)
+        return content
+
+    def get_price_history(self, symbol: str, period: str=None, start=None) -> pd.DataFrame:
+        hist_price = self.live.get_price_history(symbol, period=period, start=start)
+        self.fixtures.write_price(symbol, hist_price)
+        return hist_price
+
+    def download_prices(self, symbols: list, period: str=None, start=None) -> dict:
+        prices = self.live.download_prices(symbols, period=period, start=start)
+        for symbol, hist_price in prices.items():
+            self.fixtures.write_price(symbol, hist_price)
+        return prices
+
+    def get_financial_currency(self, ticker: str) -> str:
+        currency = self.live.get_financial_currency(ticker)
+        self.fixtures.write_bytes("currency", ticker, "json", json.dumps({"financialCurrency": currency}).encode())
+        return currency
+
+    def get_finviz_soup(self, ticker: str) -> BeautifulSoup:
+        soup = self.live.get_finviz_soup(ticker)
+        self.fixtures.write_bytes("finviz", ticker, "html", str(soup).encode())
+        return soup
+
+
+_data_provider = None
+_data_provider_lock = threading.Lock()
+
+
+def get_data_provider() -> DataProvider:
+    """Proveedor compartido segun `DATA_PROVIDER_MODE` (live, record o replay)"""
+    global _data_provider
+
+    with _data_provider_lock:
+        if _data_provider is None:
+            mode = DataProviderConfig.MODE
+            if mode=="live":
+                _data_provider = LiveProvider()
+            elif mode=="record":
+                _data_provider = RecordProvider(LiveProvider(), FixtureStore(DataProviderConfig.FIXTURES_DIR))
+            elif mode=="replay":
+                _data_provider = ReplayProvider(FixtureStore(DataProviderConfig.FIXTURES_DIR))
+            else:
+                raise ValueError(f"DATA_PROVIDER_MODE no soportado: {mode}")
+            logging.info(f"Proveedor de datos: {mode}")
+
+    return _data_provider
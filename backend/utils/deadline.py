@@ -0,0 +1,25 @@
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Se lanza cuando una descarga no termina dentro del tiempo de la request"""
+
+
+class Deadline:
+    """Tiempo limite de una request de analisis, desde su creacion"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Segundos restantes (0 si ya vencio)"""
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self) -> bool:
+        return self.remaining()<=0
+
+
+def build_deadline(seconds: float):
+    """Deadline de `seconds` segundos, None si no hay limite (None o 0)"""
+    return Deadline(seconds) if seconds else None
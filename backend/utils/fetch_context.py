@@ -0,0 +1,128 @@
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from constants import AsyncFetchConfig
+from utils.deadline import Deadline, DeadlineExceeded
+
+
+# hilos para las descargas con deadline: el hilo del analisis solo espera
+# hasta el deadline y la descarga lenta termina en segundo plano
+_deadline_executor = ThreadPoolExecutor(
+    max_workers=AsyncFetchConfig.IO_WORKERS,
+    thread_name_prefix="fetch-deadline"
+)
+
+
+class FetchContext:
+    """Contexto de descarga asociado a una request de analisis.
+
+    Memoriza los resultados ya parseados de las descargas (por ejemplo la
+    tabla completa de un estado financiero en `get_financial_data`) para que, dentro de una
+    misma request, cada pagina se descargue y parsee una sola vez aunque
+    varios handlers la necesiten. Es seguro usarlo desde varios hilos: si dos
+    hilos piden la misma llave al tiempo, el segundo espera la descarga del primero.
+
+    Con `deadline`, las descargas hechas dentro de `bounded()` (competidores)
+    esperan maximo hasta el deadline y lanzan `DeadlineExceeded`; las demas
+    (ticker de interes) esperan sin limite.
+
+    Con `parent` las descargas se memorizan en el contexto padre (compartidas,
+    ej: todas las empresas de un analisis agrupado), pero el deadline, los
+    hits/misses y los competidores descartados son propios de este contexto.
+    """
+
+    def __init__(self, deadline: Deadline=None, parent: "FetchContext"=None):
+        self._memo = {} if parent is None else parent._memo
+        self._lock = threading.Lock() if parent is None else parent._lock
+        self._local = threading.local()
+        self.deadline = deadline
+        self.hits = 0
+        self.misses = 0
+        self._skipped = {}
+
+    @contextmanager
+    def bounded(self):
+        """Las descargas de este hilo dentro del bloque respetan el deadline"""
+        previous = getattr(self._local, "bounded", False)
+        self._local.bounded = True
+        try:
+            yield
+        finally:
+            self._local.bounded = previous
+
+    def _timeout(self):
+        if self.deadline is None or not getattr(self._local, "bounded", False):
+            return None
+        return self.deadline.remaining()
+
+    def _run(self, key: tuple, future: Future, loader):
+        try:
+            future.set_result(loader())
+        except Exception as e:
+            # los errores no se memorizan, el siguiente llamado lo intenta de nuevo
+            with self._lock:
+                del self._memo[key]
+            future.set_exception(e)
+
+    def get_or_fetch(self, key: tuple, loader):
+        """Retorna el valor memorizado para `key`, o lo obtiene con `loader` si no existe"""
+
+        timeout = self._timeout()
+        with self._lock:
+            future = self._memo.get(key)
+            is_owner = future is None
+            if is_owner:
+                if timeout is not None and timeout<=0:
+                    raise DeadlineExceeded(f"Deadline vencido antes de descargar {key}")
+                self.misses += 1
+                future = Future()
+                self._memo[key] = future
+            else:
+                self.hits += 1
+                logging.info(f"FetchContext hit: {key}")
+
+        if is_owner:
+            if timeout is None:
+                self._run(key, future, loader)
+            else:
+                _deadline_executor.submit(self._run, key, future, loader)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise DeadlineExceeded(f"Deadline vencido esperando {key}")
+
+    def seed(self, key: tuple, value):
+        """Guarda un valor obtenido por fuera del contexto (ej: descarga agrupada),
+        sin reemplazar uno que ya exista"""
+
+        with self._lock:
+            if key not in self._memo:
+                future = Future()
+                future.set_result(value)
+                self._memo[key] = future
+
+    def skip(self, ticker: str, stage: str, reason: str):
+        """Registra por que se descarto un competidor en una etapa (`deadline` o `error`)"""
+        with self._lock:
+            self._skipped[(ticker.upper(), stage)] = reason
+
+    def skip_reason(self, ticker: str, stage: str) -> str:
+        with self._lock:
+            return self._skipped.get((ticker.upper(), stage), "error")
+
+    def stats(self) -> dict:
+        """Conteo de hits/misses, los hits son descargas ahorradas"""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def bounded(fetch_ctx: FetchContext=None):
+    """`fetch_ctx.bounded()`, o un bloque sin efecto si no hay contexto"""
+    return nullcontext() if fetch_ctx is None else fetch_ctx.bounded()
+
+
+def skip_peer(fetch_ctx: FetchContext, ticker: str, stage: str, error: Exception):
+    """Registra en el contexto (si existe) un competidor descartado por `error`"""
+    if fetch_ctx is not None:
+        fetch_ctx.skip(ticker, stage, "deadline" if isinstance(error, DeadlineExceeded) else "error")
@@ -1,7 +1,14 @@
-import requests
+import time
 import logging
 import pandas as pd
 from constants import FetchData
+from utils.fetch_context import FetchContext
+from utils.single_flight import single_flight
+from utils.revalidate import background_refresher
+from utils.data_provider import get_data_provider
+from utils.metrics import PARSE_SECONDS, span, upstream_span, observe_upstream, statement_label
+from utils.statement_parser import extract_statement_table
+from utils.statement_cache import StatementCache, get_statement_cache, next_expected_filing
 
 
 def request_historic_financial_data(data_type: str, ticker: str, is_ttm: bool=False):
@@ -24,64 +31,122 @@ def request_historic_financial_data(data_type: str, ticker: str, is_ttm: bool=Fa
   elif data_type=="balance_sheet":
     url = FetchData.url_balance.format(ticker=ticker.lower(), suffix_url=suffix_url)
 
-  response = requests.get(url)
-  if response.status_code==200:
-    logging.info(f"Request successful to url: {url}")
+  # proveedor de datos configurado (live, record o replay)
+  with upstream_span("stockanalysis", statement_label(data_type, is_ttm), ticker):
+    return get_data_provider().get_statement_page(url)
 
-  return response.content
 
+def parse_statement_table(html_data) -> pd.DataFrame:
+  """Estado financiero completo: un periodo por fila (indexado por
+  `earning_date`, datetime) y un indicador numerico por columna"""
 
-def parse_historic_financial_data(html_data, kpis: list):
-  """Funcion para parsear o formatear la info financiera TTM"""
+  # solo se parsea la tabla del estado financiero, no toda la pagina
+  return extract_statement_table(html_data)
+
+
+def select_statement_kpis(hist_fin_complete: pd.DataFrame, kpis: list):
+  """Indicadores `kpis` del estado financiero completo, uno por columna y un
+  periodo por fila (indexado por `earning_date` con formato %Y-%m-%d)"""
 
-  hist_fin_complete = pd.read_html(html_data)[0]
-  hist_fin_complete.columns = [x[1][8:].strip() for x in hist_fin_complete.columns]
-  
   # si la rentabilidad bruta no está, ponemos las mismas ventas
-  if ("Gross Profit" in kpis)&("Gross Profit" not in hist_fin_complete.iloc[:,0].values):
-    # print(hist_fin_complete.iloc[:,0].values)
-    row_rev = hist_fin_complete[hist_fin_complete.iloc[:,0]=="Revenue"].copy()
-    row_rev.iloc[:,0] = "Gross Profit"
-    hist_fin_complete = pd.concat([hist_fin_complete, row_rev])
+  if ("Gross Profit" in kpis)&("Gross Profit" not in hist_fin_complete.columns):
+    hist_fin_complete = hist_fin_complete.assign(**{"Gross Profit": hist_fin_complete["Revenue"]})
     logging.info("No se encontro el kpi Gross Profit... ajustado al Revenue")
 
-  if "Inventory" in kpis:
-    # si no encontramos Inventory en la tabla (Ej: empresas de IT)
-    if hist_fin_complete.iloc[:,0].isin(["Inventory"]).sum()==0:
-      kpis = [x for x in kpis if "Inventory"!=x]
-      logging.info("'Inventory' no se encuentra en la tabla extraida, removido de kpis")
+  # kpis que no estan en la tabla (Ej: Inventory en empresas de IT, activos y
+  # pasivos corrientes en bancos), los handlers usan sus calculos alternativos
+  missing_kpis = [x for x in kpis if x not in hist_fin_complete.columns]
+  if missing_kpis:
+    kpis = [x for x in kpis if x not in missing_kpis]
+    logging.info(f"{missing_kpis} no se encuentran en la tabla extraida, removidos de kpis")
 
   # a partir de la tabla completa, nos quedamos con los indicadores
   # que nos interesan, por ejemplo: ventas total, utilidad bruta, etc..
-  hist_fin = hist_fin_complete[hist_fin_complete.iloc[:,0].isin(kpis)].copy().T
-  hist_fin.columns = hist_fin.iloc[0, :]
-  hist_fin = hist_fin.iloc[1:,:]
-  hist_fin = hist_fin.reset_index()
-  hist_fin = hist_fin.rename(columns={"index": "period"})
-  hist_fin = hist_fin[hist_fin[kpis[0]]!="Upgrade"]
-  hist_fin["earning_date"] = pd.to_datetime(
-    hist_fin["period"], format="%b %d, %Y"
-  ).dt.strftime("%Y-%m-%d")
-  hist_fin = hist_fin.set_index(["earning_date"])
-  hist_fin = hist_fin.drop(columns=["period"])
-
-  # casteo de los indicadores porque vienen tipo object
-  for x in kpis:
-    try:
-      if (hist_fin[x]=="-").any():
-        logging.warning(f"Caracteres especiales encontrados en kpi: {x}. Cantidad de registros con '-': {(hist_fin[x]=='-').sum()}")
-        hist_fin = hist_fin[hist_fin[x]!="-"]
-        logging.warning(f"'-> Cantidad de registros despues de remover '-': {hist_fin.shape}")
-      hist_fin[x] = hist_fin[x].astype(float)
-    except Exception as e:
-      logging.warning(f"No se proceso el kpi: {x}. Exception error: {e}")
+  hist_fin = hist_fin_complete[kpis]
+
+  # periodos sin valor en algun indicador ("-" en la pagina)
+  missing = hist_fin.isnull().any(axis=1)
+  if missing.any():
+    logging.warning(f"Periodos sin valor en los kpis: {int(missing.sum())}, removidos")
+    hist_fin = hist_fin[~missing]
 
-  hist_fin.columns.name=None
+  hist_fin = hist_fin.set_axis(hist_fin.index.strftime("%Y-%m-%d").rename("earning_date"), axis=0)
 
   return hist_fin_complete, hist_fin
 
 
-def get_financial_data(ticker: str, data_type: str, kpis: list, is_ttm: bool=False):
+def parse_historic_financial_data(html_data, kpis: list):
+  """Funcion para parsear o formatear la info financiera TTM"""
+  return select_statement_kpis(parse_statement_table(html_data), kpis)
+
+
+def load_financial_data(ticker: str, data_type: str, is_ttm: bool=False, refresh: bool=False):
+  """Descarga y parsea la tabla completa de un estado financiero usando el
+  cache persistente. Primero se busca la tabla ya parseada, luego el html
+  crudo y solo si ninguno esta vigente se hace la request a stockanalysis.
+
+  Una tabla vencida dentro del presupuesto del cache se retorna de inmediato
+  y se refresca en segundo plano (`refresh=True` ignora lo guardado)."""
+
+  cache = get_statement_cache()
+  if cache is None:
+    response_data = request_historic_financial_data(data_type=data_type, ticker=ticker, is_ttm=is_ttm)
+    with span(PARSE_SECONDS, data_type=statement_label(data_type, is_ttm)):
+      return parse_statement_table(response_data)
+
+  table_key = StatementCache.make_key("statement", ticker, data_type, is_ttm)
+  html_key = StatementCache.make_key("html", ticker, data_type, is_ttm)
+  start = time.perf_counter()
+  response_data = None
+  try:
+    entry = None if refresh else cache.get_entry(table_key)
+    if entry is not None:
+      cached, expires_at = entry
+      if expires_at>time.time():
+        logging.info(f"StatementCache hit: {table_key}")
+        observe_upstream("stockanalysis", statement_label(data_type, is_ttm), ticker, "hit", time.perf_counter()-start)
+      else:
+        logging.info(f"StatementCache vencido, refrescando en segundo plano: {table_key}")
+        observe_upstream("stockanalysis", statement_label(data_type, is_ttm), ticker, "stale", time.perf_counter()-start)
+        background_refresher.schedule(
+          ("statement", table_key),
+          lambda: load_financial_data(ticker=ticker, data_type=data_type, is_ttm=is_ttm, refresh=True)
+        )
+      return cached
+    if not refresh:
+      response_data = cache.get(html_key)
+  except Exception as e:
+    logging.warning(f"No se pudo leer el StatementCache - {e}")
+
+  is_new_html = response_data is None
+  if is_new_html:
+    response_data = request_historic_financial_data(data_type=data_type, ticker=ticker, is_ttm=is_ttm)
+  else:
+    observe_upstream("stockanalysis", statement_label(data_type, is_ttm), ticker, "hit", time.perf_counter()-start)
+
+  with span(PARSE_SECONDS, data_type=statement_label(data_type, is_ttm)):
+    hist_fin_complete = parse_statement_table(response_data)
+
+  # los estados financieros solo cambian cuando la empresa reporta
+  if hist_fin_complete.shape[0]>0:
+    try:
+      expires_at = next_expected_filing(hist_fin_complete.index, is_ttm)
+      if is_new_html:
+        cache.set(html_key, response_data, ticker, data_type, is_ttm, expires_at)
+      cache.set(table_key, hist_fin_complete, ticker, data_type, is_ttm, expires_at)
+    except Exception as e:
+      logging.warning(f"No se pudo guardar en el StatementCache - {e}")
+
+  return hist_fin_complete
+
+
+def get_financial_data(
+    ticker: str, 
+    data_type: str, 
+    kpis: list, 
+    is_ttm: bool=False, 
+    fetch_ctx: FetchContext=None
+):
   """Esta funcion extrae los datos financeros de estado de resultados
   y flujo de caja para un ticker dado.
   
@@ -89,9 +154,23 @@ def get_financial_data(ticker: str, data_type: str, kpis: list, is_ttm: bool=Fal
   ---------
   ticker (str): ticker de la empresa que se desea analizar
   data_type (str): tipo de datos que se desea extraer, puede ser income o cash_flow
+  fetch_ctx (FetchContext): contexto de la request, si se entrega, la pagina
+    se descarga y parsea una sola vez por request, sin importar los `kpis`
   """
-  # extraer de la pagina stockanalysis la tabla ttm historico
-  response_data = request_historic_financial_data(data_type=data_type, ticker=ticker, is_ttm=is_ttm)
-  data_complete, data = parse_historic_financial_data(html_data=response_data, kpis=kpis)
-  
-  return data_complete, data
+  key = ("statement", ticker.upper(), data_type, is_ttm)
+
+  def _load():
+    # las requests concurrentes por la misma pagina esperan una sola descarga
+    return single_flight.do(
+      key,
+      lambda: load_financial_data(ticker=ticker, data_type=data_type, is_ttm=is_ttm)
+    )
+
+  if fetch_ctx is None:
+    hist_fin_complete = _load()
+  else:
+    hist_fin_complete = fetch_ctx.get_or_fetch(key, _load)
+
+  # los kpis se seleccionan sobre una copia para que ningun handler
+  # modifique la tabla memorizada o compartida
+  return select_statement_kpis(hist_fin_complete.copy(), kpis)
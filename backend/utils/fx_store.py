@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+import threading
+import pandas as pd
+from datetime import date, timedelta
+from collections import OrderedDict
+from constants import FxStoreConfig
+from utils.data_provider import get_data_provider
+from utils.metrics import upstream_span, observe_upstream
+
+
+def download_exchange_rate(currency: str, start: date=None):
+    """Descarga desde yfinance la tasa de cambio USD->moneda.
+    Si no se entrega `start` se traen los ultimos 5 años."""
+
+    with upstream_span("yfinance", "fx", currency):
+        hist_price = get_data_provider().get_price_history(f"{currency}=X", period="5Y", start=start)
+
+    return exchange_rate_from_price(hist_price)
+
+
+def exchange_rate_from_price(hist_price: pd.DataFrame):
+    """Formato de tasa de cambio (columnas `period` %Y-%m-%d y `exchange`)
+    a partir del precio historico del par de monedas"""
+
+    if hist_price.empty:
+        # sin cotizaciones en el rango (ej: fin de semana o festivo), yfinance
+        # puede retornar un indice que no es de fechas
+        return pd.DataFrame({"period": pd.Series(dtype=object), "exchange": pd.Series(dtype=float)})
+
+    exchange_rate = hist_price[["Close"]].reset_index()
+    exchange_rate.columns = ["period", "exchange"]
+    exchange_rate["period"] = exchange_rate["period"].dt.strftime("%Y-%m-%d")
+    exchange_rate["exchange"] = exchange_rate["exchange"].astype(float)
+    exchange_rate = exchange_rate.sort_values(["period"])
+
+    return exchange_rate
+
+
+class FxRateStore:
+    """Series de tasas de cambio compartidas por todo el proceso, por moneda.
+
+    Se mantienen en memoria (LRU con maximo `max_currencies` monedas) y
+    opcionalmente en disco. Cada serie se actualiza maximo una vez al dia y
+    solo descargando los dias faltantes, por lo que las conversiones repetidas
+    no hacen llamados a yfinance.
+    """
+
+    def __init__(self, max_currencies: int, disk_dir: str=None):
+        self.max_currencies = max_currencies
+        self.disk_dir = disk_dir or None
+        self._series = OrderedDict()
+        self._refreshed_on = {}
+        self._lock = threading.Lock()
+        self._currency_locks = {}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _currency_lock(self, currency: str) -> threading.Lock:
+        with self._lock:
+            return self._currency_locks.setdefault(currency, threading.Lock())
+
+    def _disk_path(self, currency: str) -> str:
+        return os.path.join(self.disk_dir, f"{currency}.pkl")
+
+    def _load(self, currency: str):
+        with self._lock:
+            if currency in self._series:
+                self._series.move_to_end(currency)
+                return self._series[currency]
+
+        if self.disk_dir and os.path.exists(self._disk_path(currency)):
+            try:
+                return pd.read_pickle(self._disk_path(currency))
+            except Exception as e:
+                logging.warning(f"No se pudo leer la tasa de cambio {currency} desde disco - {e}")
+
+        return None
+
+    def _save(self, currency: str, exchange_rate: pd.DataFrame):
+        with self._lock:
+            self._series[currency] = exchange_rate
+            self._series.move_to_end(currency)
+            self._refreshed_on[currency] = date.today()
+            while len(self._series)>self.max_currencies:
+                evicted, _ = self._series.popitem(last=False)
+                self._refreshed_on.pop(evicted, None)
+
+        if self.disk_dir:
+            try:
+                exchange_rate.to_pickle(self._disk_path(currency))
+            except Exception as e:
+                logging.warning(f"No se pudo guardar la tasa de cambio {currency} en disco - {e}")
+
+    def put(self, currency: str, exchange_rate: pd.DataFrame):
+        """Guarda una serie descargada por fuera del store (ej: descarga agrupada)"""
+        with self._currency_lock(currency):
+            self._save(currency, exchange_rate.reset_index(drop=True))
+
+    def get(self, currency: str) -> pd.DataFrame:
+        """Tasa de cambio historica (columnas `period`, `exchange`) de los ultimos 5 años"""
+
+        with self._currency_lock(currency):
+            start = time.perf_counter()
+            exchange_rate = self._load(currency)
+            today = date.today()
+
+            if exchange_rate is None:
+                logging.info(f"Descargando la tasa de cambio {currency} (5 años)")
+                exchange_rate = download_exchange_rate(currency)
+            elif self._refreshed_on.get(currency)!=today:
+                # solo se descargan los dias faltantes, incluyendo el ultimo
+                # guardado por si cambio su cierre
+                last_period = date.fromisoformat(exchange_rate["period"].iloc[-1])
+                logging.info(f"Actualizando la tasa de cambio {currency} desde {last_period}")
+                tail = download_exchange_rate(currency, start=last_period)
+                if tail.empty:
+                    logging.info(f"Sin cotizaciones nuevas de {currency} desde {last_period}")
+                else:
+                    exchange_rate = (
+                        pd.concat([exchange_rate, tail])
+                        .drop_duplicates(subset=["period"], keep="last")
+                        .sort_values(["period"])
+                    )
+                    min_period = (today - timedelta(days=5*365)).strftime("%Y-%m-%d")
+                    exchange_rate = exchange_rate[exchange_rate["period"]>=min_period].reset_index(drop=True)
+            else:
+                observe_upstream("yfinance", "fx", currency, "hit", time.perf_counter()-start)
+                return exchange_rate.copy()
+
+            self._save(currency, exchange_rate)
+
+        return exchange_rate.copy()
+
+
+fx_store = FxRateStore(
+    max_currencies=FxStoreConfig.MAX_CURRENCIES,
+    disk_dir=FxStoreConfig.DISK_DIR
+)
@@ -0,0 +1,132 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from constants import HedgeConfig
+from utils.metrics import HEDGE_SENT, HEDGE_WON
+
+
+# hilos de las descargas duplicables: el hilo que pide la descarga solo espera
+# la primera respuesta, la mas lenta termina en segundo plano (no se cancela)
+_hedge_executor = ThreadPoolExecutor(max_workers=HedgeConfig.WORKERS, thread_name_prefix="hedge")
+
+
+class Hedger:
+    """Descargas duplicadas ("hedged requests") de un tipo de recurso.
+
+    Si una descarga no responde en el percentil `PERCENTILE` de las latencias
+    recientes del mismo tipo se lanza una copia y se retorna la primera
+    respuesta exitosa. Las copias consumen un presupuesto que crece
+    `BUDGET_RATIO` por descarga (maximo `MAX_BURST`), asi la carga extra hacia
+    la fuente nunca supera esa fraccion. Mientras no haya `MIN_SAMPLES`
+    latencias la descarga se hace directo, sin copias.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._latencies = deque(maxlen=HedgeConfig.WINDOW)
+        self._budget = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+
+    def hedge_delay(self):
+        """Segundos a esperar antes de lanzar la copia, None si aun no hay suficientes latencias"""
+
+        with self._lock:
+            if len(self._latencies)<HedgeConfig.MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+
+        position = min(int(len(latencies)*HedgeConfig.PERCENTILE/100), len(latencies) - 1)
+
+        return max(latencies[position], HedgeConfig.MIN_DELAY_SECONDS)
+
+    def _attempt(self, fetch):
+        # solo las descargas exitosas cuentan para el percentil (un 404 es rapido)
+        start = time.perf_counter()
+        result = fetch()
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+
+        return result
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._budget<1:
+                return False
+            self._budget -= 1
+            self.hedged += 1
+
+        return True
+
+    def call(self, fetch):
+        """Ejecuta `fetch()` (sin argumentos), duplicandola si tarda mas de lo normal"""
+
+        delay = self.hedge_delay()
+        with self._lock:
+            self.requests += 1
+            self._budget = min(HedgeConfig.MAX_BURST, self._budget + HedgeConfig.BUDGET_RATIO)
+
+        if delay is None:
+            return self._attempt(fetch)
+
+        primary = _hedge_executor.submit(self._attempt, fetch)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._spend():
+            return primary.result()
+
+        logging.info(f"Descarga {self.kind} sin respuesta en {delay:.2f} s, lanzando copia")
+        HEDGE_SENT.labels(kind=self.kind).inc()
+        hedge = _hedge_executor.submit(self._attempt, fetch)
+
+        # primera respuesta exitosa; si las dos fallan se lanza el ultimo error
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.won += 1
+                        HEDGE_WON.labels(kind=self.kind).inc()
+                    return future.result()
+                error = future.exception()
+
+        raise error
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "won": self.won,
+                "delay_seconds": None if delay is None else round(delay, 3),
+            }
+
+
+_hedgers = {}
+_hedgers_lock = threading.Lock()
+
+
+def hedged(kind: str, fetch):
+    """`fetch()` con copias ante respuestas lentas (si estan habilitadas),
+    `kind` agrupa las latencias (ej: `statement`, `history`)"""
+
+    if not HedgeConfig.ENABLED:
+        return fetch()
+
+    with _hedgers_lock:
+        if kind not in _hedgers:
+            _hedgers[kind] = Hedger(kind)
+
+    return _hedgers[kind].call(fetch)
+
+
+def hedge_stats() -> dict:
+    with _hedgers_lock:
+        return {kind: hedger.stats() for kind, hedger in _hedgers.items()}
@@ -0,0 +1,148 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import MaxRetryError
+from constants import HttpClientConfig, RateLimitConfig
+from utils.rate_limiter import get_host_limiter
+
+
+def was_throttled(response: requests.Response) -> bool:
+    """La respuesta o alguno de los reintentos de urllib3 fue un 429/503"""
+
+    if response.status_code in RateLimitConfig.THROTTLE_STATUS:
+        return True
+
+    retries = getattr(response.raw, "retries", None)
+    history = getattr(retries, "history", None) or ()
+
+    return any(x.status in RateLimitConfig.THROTTLE_STATUS for x in history)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Adapter que pasa cada request por el limitador de su host (token bucket
+    + concurrencia adaptativa), comun para todas las descargas que usan la
+    sesion compartida: paginas de stockanalysis y de finviz.
+
+    Los reintentos de `retry` se hacen aqui y no dentro de urllib3, asi cada
+    intento toma su propio token y cupo, y un 429/503 baja los limites del
+    host antes del siguiente intento.
+    """
+
+    def __init__(self, retry: Retry=None, **kwargs):
+        self.retry = Retry(0, read=False) if retry is None else retry
+        super().__init__(max_retries=0, **kwargs)
+
+    def _send_limited(self, request, **kwargs):
+        limiter = get_host_limiter(request.url)
+        if limiter is None:
+            return super().send(request, **kwargs)
+
+        limiter.acquire()
+        outcome = "error"
+        try:
+            response = super().send(request, **kwargs)
+            outcome = "throttled" if was_throttled(response) else "ok"
+            return response
+        finally:
+            limiter.release(outcome)
+
+    def send(self, request, **kwargs):
+        retry = self.retry
+        while True:
+            try:
+                response = self._send_limited(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retry._is_method_retryable(request.method):
+                    raise
+                try:
+                    retry = retry.increment(method=request.method, url=request.url, error=e)
+                except MaxRetryError:
+                    raise e
+                logging.warning(f"Error de conexion con {request.url}, reintento {len(retry.history)} - {e}")
+                retry.sleep()
+                continue
+
+            has_retry_after = "Retry-After" in response.headers
+            if not retry.is_retry(request.method, response.status_code, has_retry_after):
+                return response
+            try:
+                retry = retry.increment(method=request.method, url=request.url, response=response.raw)
+            except MaxRetryError:
+                # sin reintentos disponibles se retorna la ultima respuesta
+                return response
+
+            logging.warning(f"Respuesta {response.status_code} de {request.url}, reintento {len(retry.history)}")
+            # la conexion vuelve al pool mientras se espera el backoff (o el Retry-After)
+            response.raw.drain_conn()
+            retry.sleep(response.raw)
+
+
+def _build_retry() -> Retry:
+    """Reintentos ante errores de conexion y 429/5xx con backoff exponencial,
+    con jitter si la version de urllib3 lo soporta (`backoff_jitter`, urllib3>=2)"""
+
+    kwargs = dict(
+        total=HttpClientConfig.RETRIES,
+        backoff_factor=HttpClientConfig.BACKOFF_FACTOR,
+        status_forcelist=HttpClientConfig.RETRY_STATUS,
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=HttpClientConfig.BACKOFF_JITTER, **kwargs)
+    except TypeError:
+        logging.info("urllib3 sin soporte de backoff_jitter, reintentos sin jitter")
+        return Retry(**kwargs)
+
+
+def _build_session() -> requests.Session:
+    """Sesion HTTP compartida: conexiones keep-alive reutilizadas (evita repetir
+    el handshake TCP/TLS), limite de conexiones por host y reintentos con
+    backoff exponencial + jitter ante 429/5xx. Cada host pasa por su limitador
+    de tasa y concurrencia (ver `RateLimitedAdapter`)."""
+
+    adapter = RateLimitedAdapter(
+        retry=_build_retry(),
+        pool_connections=HttpClientConfig.POOL_HOSTS,
+        pool_maxsize=HttpClientConfig.POOL_MAXSIZE_PER_HOST,
+        pool_block=True,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": HttpClientConfig.USER_AGENT})
+
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Sesion HTTP del proceso, compartida por todas las descargas"""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+
+    return _session
+
+
+def http_get(url: str) -> requests.Response:
+    """GET con la sesion compartida, timeouts de conexion/lectura explicitos.
+    Lanza `requests.HTTPError` si la respuesta final no es exitosa."""
+
+    response = get_session().get(
+        url,
+        timeout=(HttpClientConfig.CONNECT_TIMEOUT, HttpClientConfig.READ_TIMEOUT)
+    )
+    response.raise_for_status()
+    logging.info(f"Request successful to url: {url}")
+
+    return response
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from constants import JobConfig
+
+
+class JobStore(ABC):
+    """Interfaz del store de trabajos de analisis.
+
+    Un trabajo es un diccionario serializable a JSON con las llaves `job_id`,
+    `status` (queued, running, done, error), `stages` (etapas terminadas),
+    `request`, `result`, `error`, `created_at` y `updated_at`.
+    """
+
+    @abstractmethod
+    def create(self, job: dict):
+        """Guarda un trabajo nuevo"""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        """Actualiza los campos de un trabajo y su `updated_at`"""
+
+    @abstractmethod
+    def get(self, job_id: str):
+        """Retorna el trabajo o None si no existe (o ya expiro)"""
+
+    @abstractmethod
+    def purge(self, older_than: float):
+        """Elimina los trabajos actualizados antes de `older_than` (timestamp)"""
+
+
+class InMemoryJobStore(JobStore):
+    """Trabajos en memoria del proceso, se pierden al reiniciar el worker"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job, stages=list(job["stages"]))
+
+    def purge(self, older_than: float):
+        with self._lock:
+            for job_id in [k for k, job in self._jobs.items() if job["updated_at"]<older_than]:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore(JobStore):
+    """Trabajos persistidos en SQLite, cada campo del trabajo guardado como JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    payload TEXT,
+                    updated_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_updated ON jobs (updated_at)")
+
+    def _connection(self):
+        # una conexion por hilo, sqlite no permite compartirlas
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job: dict):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)",
+                (job["job_id"], json.dumps(job), job["updated_at"])
+            )
+
+    def update(self, job_id: str, **fields):
+        with self._connection() as conn:
+            # la lectura y escritura van en la misma transaccion
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT payload FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if row is None:
+                return
+            job = json.loads(row[0])
+            job.update(fields, updated_at=time.time())
+            conn.execute(
+                "UPDATE jobs SET payload=?, updated_at=? WHERE job_id=?",
+                (json.dumps(job), job["updated_at"], job_id)
+            )
+
+    def get(self, job_id: str):
+        row = self._connection().execute("SELECT payload FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def purge(self, older_than: float):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM jobs WHERE updated_at<?", (older_than,))
+
+
+def build_job_store() -> JobStore:
+    """Store de trabajos segun la configuracion (`JOB_STORE`: memory o sqlite)"""
+
+    if JobConfig.STORE=="sqlite":
+        return SQLiteJobStore(path=JobConfig.SQLITE_PATH)
+    if JobConfig.STORE=="memory":
+        return InMemoryJobStore()
+
+    raise ValueError(f"JOB_STORE no soportado: {JobConfig.STORE}")
@@ -0,0 +1,111 @@
+import time
+import uuid
+import asyncio
+import logging
+from fastapi.encoders import jsonable_encoder
+from constants import JobConfig
+from utils.job_store import JobStore
+from utils.concurrency import QueueFullError
+
+
+# etapas de `execute_process` reportadas en el progreso de un trabajo
+JOB_STAGES = ["income", "balance", "cash_flow", "price_historic", "price_competitors"]
+
+
+class JobManager:
+    """Ejecuta analisis en segundo plano con un pool de workers del proceso.
+
+    `submit` deja el trabajo en cola y retorna su id de inmediato; `workers`
+    tareas del event loop toman los trabajos de la cola y ejecutan `runner`,
+    por lo que el throughput lo define el tamaño del pool y no la cantidad de
+    conexiones abiertas. El estado, el progreso por etapa y el resultado
+    quedan en `store`.
+
+    Arguments
+    ---------
+    store (JobStore): donde se guardan los trabajos
+    workers (int): trabajos que se ejecutan al tiempo
+    runner: corrutina `runner(request, progress)` que ejecuta el analisis y
+        llama `progress(stage, section)` al terminar cada etapa
+    max_queue (int): maximo de trabajos en espera
+    """
+
+    def __init__(self, store: JobStore, workers: int, runner, max_queue: int):
+        self.store = store
+        self.workers = workers
+        self.runner = runner
+        self.max_queue = max_queue
+        self._queue = None
+        self._tasks = []
+
+    def _start(self):
+        # los workers se crean con el primer trabajo, dentro del event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            logging.info(f"JobManager iniciado con {self.workers} workers")
+
+    def submit(self, request: dict) -> dict:
+        """Encola un analisis y retorna el trabajo creado"""
+
+        self._start()
+        now = time.time()
+        self.store.purge(older_than=now - JobConfig.TTL_HOURS*3600)
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "stages": [],
+            "request": request,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        try:
+            self._queue.put_nowait(job["job_id"])
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Cola de trabajos llena ({self._queue.qsize()} en espera)")
+
+        self.store.create(job)
+        logging.info(f"Trabajo {job['job_id']} en cola para {request.get('ticker')}")
+
+        return job
+
+    def get(self, job_id: str):
+        return self.store.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None:
+            return
+
+        self.store.update(job_id, status="running")
+        stages = []
+
+        def progress(stage: str, section=None):
+            stages.append(stage)
+            self.store.update(job_id, stages=list(stages))
+
+        try:
+            result = await self.runner(job["request"], progress)
+            self.store.update(job_id, status="done", result=jsonable_encoder(result))
+            logging.info(f"Trabajo {job_id} terminado")
+        except Exception as e:
+            logging.warning(f"Trabajo {job_id} con error - {e}")
+            self.store.update(job_id, status="error", error=str(e))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": 0 if self._queue is None else self._queue.qsize(),
+        }
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from constants import MetricsConfig
+
+
+STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds",
+    "Duracion de cada etapa de execute_process",
+    ["stage", "ticker"],
+    buckets=MetricsConfig.BUCKETS
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "Duracion de cada consulta a una fuente externa: descarga (cache=miss) o lectura del cache local (cache=hit, o stale si esta vencida y se refresca en segundo plano)",
+    ["source", "data_type", "ticker", "cache"],
+    buckets=MetricsConfig.BUCKETS
+)
+PARSE_SECONDS = Histogram(
+    "statement_parse_seconds",
+    "Duracion del parseo del html de un estado financiero",
+    ["data_type"],
+    buckets=MetricsConfig.BUCKETS
+)
+SINGLE_FLIGHT_COALESCED = Counter(
+    "single_flight_coalesced",
+    "Descargas que esperaron una descarga en curso del mismo recurso en vez de repetirla",
+    ["kind"]
+)
+HOST_CONCURRENCY_LIMIT = Gauge(
+    "http_host_concurrency_limit",
+    "Requests en curso permitidas hacia el host (AIMD)",
+    ["host"]
+)
+HOST_RATE_LIMIT = Gauge(
+    "http_host_rate_limit",
+    "Requests por segundo permitidas hacia el host (token bucket)",
+    ["host"]
+)
+HOST_IN_FLIGHT = Gauge(
+    "http_host_in_flight",
+    "Requests en curso hacia el host",
+    ["host"]
+)
+HOST_THROTTLED = Counter(
+    "http_host_throttled",
+    "Respuestas 429/503 del host",
+    ["host"]
+)
+HEDGE_SENT = Counter(
+    "hedge_sent",
+    "Copias lanzadas de descargas lentas",
+    ["kind"]
+)
+HEDGE_WON = Counter(
+    "hedge_won",
+    "Copias que respondieron antes que la descarga original",
+    ["kind"]
+)
+
+
+def ticker_label(ticker: str) -> str:
+    return ticker.upper() if MetricsConfig.TICKER_LABEL else "*"
+
+
+def statement_label(data_type: str, is_ttm: bool) -> str:
+    return f"{data_type}_ttm" if is_ttm else data_type
+
+
+@contextmanager
+def span(histogram: Histogram, **labels):
+    """Mide la duracion del bloque y la registra en `histogram`. Retorna las
+    etiquetas para que el bloque pueda cambiarlas (ej: `cache`) antes de registrar"""
+
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def stage_span(stage: str, ticker: str):
+    return span(STAGE_SECONDS, stage=stage, ticker=ticker_label(ticker))
+
+
+def upstream_span(source: str, data_type: str, ticker: str, cache: str="miss"):
+    return span(UPSTREAM_SECONDS, source=source, data_type=data_type, ticker=ticker_label(ticker), cache=cache)
+
+
+def observe_upstream(source: str, data_type: str, ticker: str, cache: str, seconds: float):
+    UPSTREAM_SECONDS.labels(
+        source=source, data_type=data_type, ticker=ticker_label(ticker), cache=cache
+    ).observe(seconds)
+
+
+def render_metrics():
+    """Metricas del proceso en formato de texto de Prometheus: (contenido, content type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
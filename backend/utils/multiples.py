@@ -1,41 +1,148 @@
 import logging
-import yfinance as yf
 import pandas as pd
-from datetime import datetime
 from constants import IncomeKpis, CashFlowKpis
 from utils.fetch_data import get_financial_data
+from utils.fetch_context import FetchContext
+from utils.data_provider import get_data_provider
+from utils.metrics import upstream_span
+from utils.single_flight import single_flight
+from utils.fx_store import fx_store, exchange_rate_from_price
+from utils.price_store import get_price_store, download_price, get_price_matrix, price_from_matrix
 
 
-def get_historic_price(tick_yf: yf.Ticker):
-    """Funcion que trae el precio historico de los ultimos 5 años una accion dada"""
+def get_historic_price(ticker: str, fetch_ctx: FetchContext=None):
+    """Funcion que trae el precio historico de los ultimos 5 años una accion dada,
+    indexado por `period` (datetime64). Se sirve desde el store local de precios,
+    que solo descarga los dias faltantes."""
 
-    hist_price = tick_yf.history(period="5Y")
-    hist_price.index = [x.strftime("%Y-%m-%d") for x in hist_price.index]
-    hist_price = hist_price[["Close", "Volume"]]
+    key = ("price", ticker.upper())
 
-    logging.info(f"Intervalo de tiempo extraido: {hist_price.index.min()}; {hist_price.index.max()}")
-    
-    hist_price = hist_price.reset_index()
-    hist_price = hist_price.rename(columns={"index": "period"})
+    def _download():
+        price_store = get_price_store()
+        if price_store is None:
+            hist_price = download_price(ticker)
+        else:
+            hist_price = price_store.get(ticker)
 
-    return hist_price
+        logging.info(f"Intervalo de tiempo extraido: {hist_price.index.min()}; {hist_price.index.max()}")
 
+        return hist_price
 
-def get_multiples(ticker: str):
-    """Funcion para calcular los multiplos de un ticker dado"""
+    def _load():
+        return single_flight.do(key, _download)
+
+    if fetch_ctx is None:
+        return _load().copy()
+
+    return fetch_ctx.get_or_fetch(key, _load).copy()
+
+
+def get_financial_currency(ticker: str, fetch_ctx: FetchContext=None):
+    """Moneda en la que la empresa reporta sus estados financieros"""
+
+    key = ("currency", ticker.upper())
+
+    def _download():
+        with upstream_span("yfinance", "info", ticker):
+            return get_data_provider().get_financial_currency(ticker)
+
+    def _load():
+        return single_flight.do(key, _download)
+
+    if fetch_ctx is None:
+        return _load()
+
+    return fetch_ctx.get_or_fetch(key, _load)
+
+
+def get_exchange_rate(currency: str, fetch_ctx: FetchContext=None):
+    """Tasa de cambio historica (5 años) de USD a la moneda dada,
+    servida desde el store de tasas de cambio compartido por el proceso"""
+
+    key = ("fx", currency)
+
+    def _load():
+        return single_flight.do(key, lambda: fx_store.get(currency))
+
+    if fetch_ctx is None:
+        return _load().copy()
+
+    return fetch_ctx.get_or_fetch(key, _load).copy()
+
+
+def get_historic_prices_batch(
+    tickers: list,
+    currencies: list=(),
+    fetch_ctx: FetchContext=None
+):
+    """Trae en una sola descarga agrupada el precio historico de varios tickers
+    (ej: ticker de interes + competidores) y de los pares de monedas necesarios.
+    Si se entrega `fetch_ctx`, cada serie queda disponible para `get_historic_price`
+    y `get_exchange_rate` sin nuevas descargas.
+
+    Return
+    ------
+    price_matrix (pd.DataFrame): precios alineados por `period`, columnas (campo, simbolo)
+    """
+    currencies = [x for x in dict.fromkeys(currencies) if x!="USD"]
+    symbols = [*tickers, *[f"{currency}=X" for currency in currencies]]
+    price_matrix = get_price_matrix(symbols)
+    logging.info(f"Matriz de precios - price_matrix.shape: {price_matrix.shape}")
 
-    tick = yf.Ticker(ticker)
+    available = set(price_matrix.columns.get_level_values(1))
+    for ticker in tickers:
+        if fetch_ctx is not None and ticker in available:
+            fetch_ctx.seed(("price", ticker.upper()), price_from_matrix(price_matrix, ticker))
+
+    for currency in currencies:
+        if f"{currency}=X" in available:
+            exchange_rate = exchange_rate_from_price(price_from_matrix(price_matrix, f"{currency}=X"))
+            fx_store.put(currency, exchange_rate)
+            if fetch_ctx is not None:
+                fetch_ctx.seed(("fx", currency), exchange_rate)
+
+    return price_matrix
+
+
+def align_earnings_to_prices(hist_price: pd.DataFrame, historic_ttm: pd.DataFrame):
+    """Asigna a cada dia del precio historico los ultimos earnings ttm reportados
+    hasta ese dia (as-of join sobre fechas datetime64 ordenadas), sin replicar
+    los earnings de manera diaria. Los dias anteriores al primer earning quedan en NaN.
+
+    Arguments
+    ---------
+    hist_price (pd.DataFrame): precio historico con la columna `period` (datetime64 o %Y-%m-%d)
+    historic_ttm (pd.DataFrame): earnings ttm indexados por `earning_date` (%Y-%m-%d)
+    """
+    logging.info("Cruzando cada dia del precio con los ultimos earnings reportados")
+    earnings = historic_ttm.reset_index()
+    earnings["_date"] = pd.to_datetime(earnings["earning_date"], format="%Y-%m-%d")
+    earnings = earnings.sort_values("_date")
+
+    prices = hist_price.copy()
+    prices["_date"] = pd.to_datetime(prices["period"])
+    prices = prices.sort_values("_date", kind="stable")
+
+    hist_price_kpis = pd.merge_asof(prices, earnings, on="_date", direction="backward")
+    hist_price_kpis = hist_price_kpis.drop(columns=["_date"])
+
+    return hist_price_kpis
+
+
+def get_multiples(ticker: str, fetch_ctx: FetchContext=None):
+    """Funcion para calcular los multiplos de un ticker dado"""
 
     # precio historico de la accion en analisis
     logging.info(f"Obteniendo precio historico para el ticker: {ticker}")
-    hist_price_interes = get_historic_price(tick)
+    hist_price_interes = get_historic_price(ticker, fetch_ctx=fetch_ctx).reset_index()
     
     logging.info("Obteniendo los indicadores de los earnings ttm")
     _, historic_income_ttm_interes = get_financial_data(
         ticker=ticker, 
         data_type="income", 
         kpis=IncomeKpis.TTM, 
-        is_ttm=True
+        is_ttm=True,
+        fetch_ctx=fetch_ctx
     )
     logging.info(f"Estado de resultados historic_income_ttm_interes.shape: {historic_income_ttm_interes.shape}")
 
@@ -43,7 +150,8 @@ def get_multiples(ticker: str):
         ticker=ticker, 
         data_type="cash_flow", 
         kpis=CashFlowKpis.TTM, 
-        is_ttm=True
+        is_ttm=True,
+        fetch_ctx=fetch_ctx
     )
     logging.info(f"Flujo de caja historic_cash_ttm_interes.shape: {historic_cash_ttm_interes.shape}")
 
@@ -56,52 +164,17 @@ def get_multiples(ticker: str):
     historic_ttm_interes = historic_ttm_interes.sort_values(["earning_date"])
     logging.info(f"historic_ttm_interes.shape: {historic_ttm_interes.shape}")
 
-    logging.info("Replicando los earnings de manera diaria para cruzar con el precio historico")
-    historic_ttm_interes = historic_ttm_interes.reset_index()
-    hist_ttm_replicated = []
-
-    for i in range(historic_ttm_interes.shape[0]):
-
-        row_i = historic_ttm_interes.iloc[i]
-        try:
-            row_iplus1 = historic_ttm_interes.iloc[i+1]
-            ends = row_iplus1["earning_date"]
-            inclusive = "left"
-        except Exception as e:
-            ends = datetime.now().strftime("%Y-%m-%d")
-            inclusive = "both"
-
-        dts = pd.date_range(
-            row_i["earning_date"],
-            ends,
-            inclusive=inclusive
-        )
-        dts = dts.strftime("%Y-%m-%d")
-        replicated_i = pd.DataFrame(dts, columns=["period"])
-        for var, val in row_i.items():
-            replicated_i[var] = val
-
-        hist_ttm_replicated.append(replicated_i)
-
-    hist_ttm_replicated = pd.concat(hist_ttm_replicated)
-    logging.info(f"Earnings replicados, hist_ttm_replicated.shape: {hist_ttm_replicated.shape}")
-
     # se revisa la moneda de los earnings para calcular los multiplos usando el precio
     # y los earnings en la misma moneda. Por ejemplo BABA, tiene los earnings en Yuanes
     # y el precio en USD, por lo que pasamos el precio a Yuanes
-    earnings_currency = tick.info["financialCurrency"]
+    earnings_currency = get_financial_currency(ticker, fetch_ctx=fetch_ctx)
     logging.info(f"Revisando la moneda de los earnings - earnings_currency: {earnings_currency}")
 
     if earnings_currency!="USD":
         logging.info("Ajustando el precio a la moneda de los earnings...")
         
-        tick_currency = yf.Ticker(f"{earnings_currency}=X")
-        exchange_rate = tick_currency.history(period="5Y")[["Close"]]
-        exchange_rate = exchange_rate.reset_index()
-        exchange_rate.columns = ["period", "exchange"]
-        exchange_rate["period"] = exchange_rate["period"].dt.strftime("%Y-%m-%d")
-        exchange_rate["exchange"] = exchange_rate["exchange"].astype(float)
-        exchange_rate = exchange_rate.sort_values(["period"])
+        exchange_rate = get_exchange_rate(earnings_currency, fetch_ctx=fetch_ctx)
+        exchange_rate["period"] = pd.to_datetime(exchange_rate["period"], format="%Y-%m-%d")
 
         # cruce con el precio de la accion para dejar el precio en moneda local
         # o la misma moneda de los estados financieros, ya que el precio
@@ -113,11 +186,7 @@ def get_multiples(ticker: str):
         hist_price_adj["close_adj_currency"] = hist_price_adj["Close"].copy()
 
     logging.info(f"Cruce del precio y los earnings - hist_price_adj.shape: {hist_price_adj.shape}")
-    hist_price_kpis = hist_price_adj.merge(
-        hist_ttm_replicated,
-        on=["period"],
-        how="left"
-    )
+    hist_price_kpis = align_earnings_to_prices(hist_price_adj, historic_ttm_interes)
     logging.info(f"Dimension resultante del cruce - hist_price_kpis.shape: {hist_price_kpis.shape}")
 
     # calculo de ratios
@@ -144,4 +213,7 @@ def get_multiples(ticker: str):
     )
     logging.info("P/FCF ratio calculado!")
 
+    # el response mantiene las fechas como texto
+    hist_price_kpis["period"] = hist_price_kpis["period"].dt.strftime("%Y-%m-%d")
+
     return hist_price_kpis
\ No newline at end of file
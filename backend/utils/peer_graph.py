@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from constants import PeerGraphConfig
+
+
+class PeerGraph:
+    """Grafo persistente (SQLite) de competidores segun finviz: para cada ticker
+    la lista ordenada completa de sus competidores, su sector y su industria.
+
+    Las entradas vencen despues de `ttl_seconds`; una entrada vencida se puede
+    seguir usando (`get(..., allow_stale=True)`) si finviz no responde.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS peer_graph (
+                    ticker TEXT PRIMARY KEY,
+                    peers TEXT,
+                    sector TEXT,
+                    industry TEXT,
+                    fetched_at REAL
+                )
+            """)
+
+    def _connection(self):
+        # una conexion por hilo, sqlite no permite compartirlas
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, ticker: str, allow_stale: bool=False):
+        """Retorna {"peers", "sector", "industry", "fetched_at"} o None si no
+        existe (o ya vencio y no se acepta una entrada vencida)"""
+
+        row = self._connection().execute(
+            "SELECT peers, sector, industry, fetched_at FROM peer_graph WHERE ticker=?",
+            (ticker.upper(),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        peers, sector, industry, fetched_at = row
+        if not allow_stale and time.time()-fetched_at>self.ttl_seconds:
+            return None
+
+        return {"peers": json.loads(peers), "sector": sector, "industry": industry, "fetched_at": fetched_at}
+
+    def put(self, ticker: str, peers: list, sector: str=None, industry: str=None):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO peer_graph VALUES (?, ?, ?, ?, ?)",
+                (ticker.upper(), json.dumps(peers), sector, industry, time.time())
+            )
+
+
+_peer_graph = None
+_peer_graph_lock = threading.Lock()
+
+
+def get_peer_graph():
+    """Instancia compartida del grafo, None si esta deshabilitado"""
+    global _peer_graph
+
+    if not PeerGraphConfig.PATH:
+        return None
+
+    with _peer_graph_lock:
+        if _peer_graph is None:
+            _peer_graph = PeerGraph(path=PeerGraphConfig.PATH, ttl_seconds=PeerGraphConfig.TTL_DAYS*86400)
+
+    return _peer_graph
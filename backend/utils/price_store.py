@@ -0,0 +1,249 @@
+import os
+import time
+import logging
+import threading
+import pandas as pd
+from datetime import date
+from constants import PriceStoreConfig, StaleCacheConfig
+from utils.data_provider import get_data_provider
+from utils.metrics import upstream_span, observe_upstream
+from utils.revalidate import background_refresher, price_is_fresh
+
+
+def download_price(ticker: str, start: date=None) -> pd.DataFrame:
+    """Descarga desde yfinance el precio diario (Close, Volume) de un ticker,
+    indexado por fecha (datetime64, sin zona horaria). Si no se entrega
+    `start` se traen los ultimos años configurados."""
+
+    with upstream_span("yfinance", "history", ticker):
+        hist_price = get_data_provider().get_price_history(ticker, period=f"{PriceStoreConfig.YEARS}Y", start=start)
+
+    return normalize_price(hist_price)
+
+
+def download_prices_batch(symbols: list, start: date=None) -> dict:
+    """Descarga en un solo llamado de yfinance el precio diario de varios simbolos
+    (tickers y pares de monedas como `CNY=X`). Retorna {simbolo: precio normalizado},
+    los simbolos sin datos no se incluyen."""
+
+    if len(symbols)==0:
+        return {}
+
+    logging.info(f"Descarga agrupada de precios para: {symbols}")
+    # descarga agrupada, sin un ticker unico para la etiqueta
+    with upstream_span("yfinance", "history_batch", "*"):
+        prices = get_data_provider().download_prices(
+            list(symbols),
+            period=f"{PriceStoreConfig.YEARS}y",
+            start=start
+        )
+
+    return {symbol: normalize_price(hist_price) for symbol, hist_price in prices.items()}
+
+
+def normalize_price(hist_price: pd.DataFrame) -> pd.DataFrame:
+    """Deja el precio de yfinance con indice datetime64 `period` (fecha local del mercado)"""
+
+    hist_price = hist_price[["Close", "Volume"]].copy()
+    index = pd.DatetimeIndex(hist_price.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist_price.index = index.normalize().rename("period")
+    hist_price.columns.name = None
+
+    return hist_price[~hist_price.index.duplicated(keep="last")].sort_index()
+
+
+def to_price_matrix(prices: dict) -> pd.DataFrame:
+    """Matriz de precios alineada por fecha: indice `period` y columnas (campo, simbolo)"""
+
+    if len(prices)==0:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=[None, None]))
+
+    matrix = pd.concat(prices, axis=1).sort_index()
+    matrix.columns = matrix.columns.swaplevel(0, 1)
+
+    return matrix.sort_index(axis=1)
+
+
+def price_from_matrix(matrix: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """Precio (Close, Volume) de un simbolo a partir de la matriz de precios"""
+
+    hist_price = matrix.xs(symbol, axis=1, level=1).dropna(subset=["Close"])
+    # filas parciales de la descarga agrupada: precio sin volumen
+    hist_price = hist_price.assign(Volume=hist_price["Volume"].fillna(0).astype("int64"))
+    hist_price.columns.name = None
+
+    return hist_price
+
+
+class PriceStore:
+    """Store local del precio historico diario, un archivo Parquet por simbolo.
+
+    La primera vez se descargan los ultimos años completos; despues solo se
+    descargan los dias que faltan desde la ultima fecha guardada y se agregan
+    al archivo. Si el cierre del ultimo dia guardado cambio (yfinance ajusta el
+    historico por dividendos y splits) se vuelve a descargar la serie completa.
+    Las descargas de varios simbolos se agrupan en un solo llamado a yfinance.
+
+    Un precio vencido (ver `price_is_fresh`) con menos de `PRICE_STALE_HOURS`
+    se retorna de inmediato y se actualiza en segundo plano.
+    """
+
+    def __init__(self, folder: str, years: int):
+        self.folder = folder
+        self.years = years
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+        os.makedirs(folder, exist_ok=True)
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.folder, f"{symbol.upper()}.parquet")
+
+    def _read(self, symbol: str):
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            refreshed_at = os.path.getmtime(path)
+            return pd.read_parquet(path), refreshed_at
+        except Exception as e:
+            logging.warning(f"No se pudo leer el precio de {symbol} desde {path} - {e}")
+            return None, None
+
+    def _write(self, symbol: str, hist_price: pd.DataFrame):
+        path = self._path(symbol)
+        tmp_path = f"{path}.tmp"
+        hist_price.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _overlap_period(stored: pd.DataFrame):
+        return stored.index[-2] if len(stored)>1 else stored.index[-1]
+
+    @staticmethod
+    def _append_tail(stored: pd.DataFrame, tail: pd.DataFrame):
+        """Agrega los dias nuevos, None si yfinance ajusto el historico. Se
+        compara el penultimo dia guardado: el ultimo puede ser un precio
+        intradia que cambio al cierre"""
+
+        check_period = PriceStore._overlap_period(stored)
+        overlap_old = stored["Close"].get(check_period)
+        overlap_new = tail["Close"].get(check_period)
+        if overlap_new is not None and abs(overlap_new - overlap_old) > 1e-6 * max(abs(overlap_old), 1):
+            return None
+
+        hist_price = pd.concat([stored, tail])
+
+        return hist_price[~hist_price.index.duplicated(keep="last")].sort_index()
+
+    def get(self, symbol: str) -> pd.DataFrame:
+        """Precio historico diario (Close, Volume) indexado por `period` (datetime64)"""
+        hist_price = self.get_many([symbol]).get(symbol)
+        if hist_price is None:
+            raise ValueError(f"yfinance no retorno precio historico para: {symbol}")
+
+        return hist_price
+
+    def get_many(self, symbols: list, allow_stale: bool=True) -> dict:
+        """Precio historico de varios simbolos: los vigentes se leen del store, los
+        que no existen se descargan juntos y los desactualizados se completan con
+        una sola descarga agrupada desde la fecha mas antigua que les falta
+        (o en segundo plano si `allow_stale` y estan dentro del presupuesto)."""
+
+        symbols = list(dict.fromkeys(symbols))
+        # se bloquea en orden para evitar deadlocks entre requests concurrentes
+        locks = [self._symbol_lock(s) for s in sorted(symbols)]
+        for lock in locks:
+            lock.acquire()
+
+        try:
+            today = date.today()
+            prices, stale, missing, revalidate = {}, {}, [], []
+            for symbol in symbols:
+                start = time.perf_counter()
+                stored, refreshed_at = self._read(symbol)
+                if stored is None or stored.empty:
+                    missing.append(symbol)
+                elif price_is_fresh(refreshed_at):
+                    prices[symbol] = stored
+                    observe_upstream("yfinance", "history", symbol, "hit", time.perf_counter()-start)
+                elif allow_stale and StaleCacheConfig.ENABLED and time.time()-refreshed_at<StaleCacheConfig.PRICE_STALE_HOURS*3600:
+                    prices[symbol] = stored
+                    revalidate.append(symbol)
+                    observe_upstream("yfinance", "history", symbol, "stale", time.perf_counter()-start)
+                else:
+                    stale[symbol] = stored
+
+            if stale:
+                start = min(self._overlap_period(stored) for stored in stale.values()).date()
+                logging.info(f"Actualizando precio historico de {list(stale)} desde {start}")
+                tails = download_prices_batch(list(stale), start=start)
+                for symbol, stored in stale.items():
+                    hist_price = stored
+                    if symbol in tails:
+                        hist_price = self._append_tail(stored, tails[symbol])
+                    if hist_price is None:
+                        logging.info(f"Precio historico de {symbol} ajustado por yfinance, descargando completo")
+                        missing.append(symbol)
+                    else:
+                        prices[symbol] = hist_price
+                        self._write(symbol, hist_price)
+
+            if missing:
+                logging.info(f"Descargando precio historico completo para: {missing}")
+                for symbol, hist_price in download_prices_batch(missing).items():
+                    prices[symbol] = hist_price
+                    self._write(symbol, hist_price)
+        finally:
+            for lock in locks:
+                lock.release()
+
+        if revalidate:
+            background_refresher.schedule(
+                ("price", *sorted(revalidate)),
+                lambda: self.get_many(revalidate, allow_stale=False)
+            )
+
+        min_period = pd.Timestamp(today) - pd.DateOffset(years=self.years)
+
+        return {
+            symbol: hist_price[hist_price.index>=min_period].copy()
+            for symbol, hist_price in prices.items()
+        }
+
+
+_price_store = None
+_price_store_lock = threading.Lock()
+
+
+def get_price_store():
+    """Instancia compartida del store, None si esta deshabilitado"""
+    global _price_store
+
+    if not PriceStoreConfig.DIR:
+        return None
+
+    with _price_store_lock:
+        if _price_store is None:
+            _price_store = PriceStore(folder=PriceStoreConfig.DIR, years=PriceStoreConfig.YEARS)
+
+    return _price_store
+
+
+def get_price_matrix(symbols: list) -> pd.DataFrame:
+    """Precio historico de varios simbolos (tickers y pares de monedas) en una
+    matriz alineada por fecha, con una sola descarga agrupada por estado
+    del store (nuevos / desactualizados)."""
+
+    price_store = get_price_store()
+    if price_store is None:
+        prices = download_prices_batch(list(dict.fromkeys(symbols)))
+    else:
+        prices = price_store.get_many(symbols)
+
+    return to_price_matrix(prices)
@@ -0,0 +1,160 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from constants import RateLimitConfig
+from utils.metrics import HOST_CONCURRENCY_LIMIT, HOST_RATE_LIMIT, HOST_IN_FLIGHT, HOST_THROTTLED
+
+
+class HostLimiter:
+    """Limite de descargas hacia un host, compartido por todo el proceso.
+
+    - Token bucket: maximo `rate` requests por segundo (rafagas de hasta `burst`).
+    - Concurrencia adaptativa (AIMD): maximo `limit` requests en curso. Cada
+      ventana de `limit` respuestas exitosas recupera la tasa hacia `max_rate`
+      y, si la concurrencia se esta usando completa, le suma 1. Un 429/503
+      multiplica ambas por `decrease_factor`, maximo una vez por `cooldown`
+      segundos (una rafaga de rechazos no las lleva al minimo de golpe) y sin
+      aumentos durante ese tiempo.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        max_rate: float,
+        burst: int,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        decrease_factor: float,
+        cooldown: float
+    ):
+        self.host = host
+        self.max_rate = max_rate
+        self.min_rate = max_rate*0.1
+        self.rate = max_rate
+        self.burst = burst
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self._successes = 0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._update_metrics()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill)*self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Espera un cupo de concurrencia y un token"""
+
+        with self._cond:
+            while self.in_flight>=int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+            while True:
+                self._refill(time.monotonic())
+                if self.tokens>=1:
+                    self.tokens -= 1
+                    break
+                self._cond.wait((1 - self.tokens)/self.rate)
+
+            self._update_metrics()
+
+    def release(self, outcome: str):
+        """Libera el cupo segun el resultado: `ok`, `throttled` (429/503) o `error`
+        (error de conexion, no cambia los limites)"""
+
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            now = time.monotonic()
+
+            if outcome=="throttled":
+                self.throttled += 1
+                HOST_THROTTLED.labels(host=self.host).inc()
+                self._successes = 0
+                if now - self._last_decrease>=self.cooldown:
+                    self._last_decrease = now
+                    self.limit = max(self.min_limit, self.limit*self.decrease_factor)
+                    self.rate = max(self.min_rate, self.rate*self.decrease_factor)
+                    logging.warning(
+                        f"Rate limit en {self.host}, bajando a concurrencia {int(self.limit)} "
+                        f"y {self.rate:.2f} requests/s"
+                    )
+                # se vacia el bucket para pausar las siguientes requests
+                self._refill(now)
+                self.tokens = min(self.tokens, 0)
+            elif outcome=="ok" and now - self._last_decrease>=self.cooldown:
+                # sin aumentos durante la ventana posterior a una reduccion
+                self._successes += 1
+                if self._successes>=self.limit:
+                    self._successes = 0
+                    # la concurrencia solo sube si se esta usando completa
+                    if self.in_flight + 1>=int(self.limit):
+                        self.limit = min(self.max_limit, self.limit + 1)
+                    self.rate = min(self.max_rate, self.rate + self.max_rate*0.1)
+
+            self._update_metrics()
+            self._cond.notify_all()
+
+    def _update_metrics(self):
+        HOST_CONCURRENCY_LIMIT.labels(host=self.host).set(int(self.limit))
+        HOST_RATE_LIMIT.labels(host=self.host).set(self.rate)
+        HOST_IN_FLIGHT.labels(host=self.host).set(self.in_flight)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": int(self.limit),
+            "rate": round(self.rate, 2),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "throttled": self.throttled,
+        }
+
+
+def host_key(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_host_limiter(url: str):
+    """Limitador compartido del host de `url`, None si estan deshabilitados"""
+
+    if not RateLimitConfig.ENABLED:
+        return None
+
+    host = host_key(url)
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(
+                host=host,
+                max_rate=RateLimitConfig.HOST_RPS.get(host, RateLimitConfig.RPS),
+                burst=RateLimitConfig.BURST,
+                initial_limit=RateLimitConfig.INITIAL_CONCURRENCY,
+                min_limit=RateLimitConfig.MIN_CONCURRENCY,
+                max_limit=RateLimitConfig.MAX_CONCURRENCY,
+                decrease_factor=RateLimitConfig.DECREASE_FACTOR,
+                cooldown=RateLimitConfig.COOLDOWN_SECONDS
+            )
+
+    return _limiters[host]
+
+
+def rate_limit_stats() -> dict:
+    with _limiters_lock:
+        return {host: limiter.stats() for host, limiter in _limiters.items()}
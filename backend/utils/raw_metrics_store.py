@@ -0,0 +1,70 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+from constants import RawMetricsConfig
+
+
+def peers_key(peers_cfg: dict) -> tuple:
+    """Identifica el conjunto de competidores de una request, sin sus pesos:
+    los encontrados en finviz (por cantidad) o la lista personalizada"""
+
+    custom = peers_cfg["custom"]
+    if custom is None:
+        return ("finviz", peers_cfg["n_competitors"])
+
+    return ("custom", *[str(x).upper() for x in custom])
+
+
+class RawMetricsStore:
+    """Indicadores de un analisis que no dependen de los pesos de la request
+    (crecimiento, margenes, ratios del balance, multiplos y sus ranks), por
+    ticker y conjunto de competidores.
+
+    Permite recalcular los scores con otros pesos sin descargar ni parsear de
+    nuevo. Se guardan en memoria (LRU con maximo `max_entries`) y expiran
+    despues de `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(ticker: str, peers_cfg: dict) -> tuple:
+        return (ticker.upper(), peers_key(peers_cfg))
+
+    def put(self, ticker: str, peers_cfg: dict, raw_metrics: dict):
+        key = self.make_key(ticker, peers_cfg)
+        with self._lock:
+            self._entries[key] = (time.time(), raw_metrics)
+            self._entries.move_to_end(key)
+            while len(self._entries)>self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, ticker: str, peers_cfg: dict):
+        """Retorna `(raw_metrics, created_at)`, o None si no existe o ya expiro"""
+
+        key = self.make_key(ticker, peers_cfg)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            created_at, raw_metrics = entry
+            if time.time()-created_at>self.ttl_seconds:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+        # copia para que el scoring no modifique el artefacto guardado
+        return copy.deepcopy(raw_metrics), created_at
+
+
+raw_metrics_store = RawMetricsStore(
+    max_entries=RawMetricsConfig.MAX_ENTRIES,
+    ttl_seconds=RawMetricsConfig.TTL_HOURS*3600
+)
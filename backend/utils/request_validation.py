@@ -0,0 +1,43 @@
+from numbers import Number
+
+
+def validate_peers_cfg(peers_cfg):
+    """Valida la configuracion de competidores de una request, lanza `ValueError`:
+
+    - `{"custom": None, "n_competitors": 5}`: competidores de finviz
+    - `{"custom": ["MSFT", ...]}`: lista personalizada
+    - `{"custom": {"MSFT": {"weight": 0.5}, ...}}`: competidores con pesos
+    """
+    if not isinstance(peers_cfg, dict) or "custom" not in peers_cfg:
+        raise ValueError("`peers` debe ser un diccionario con la llave `custom`")
+
+    custom = peers_cfg["custom"]
+    if custom is None:
+        n_competitors = peers_cfg.get("n_competitors")
+        if isinstance(n_competitors, bool) or not isinstance(n_competitors, int) or n_competitors<1:
+            raise ValueError("`peers.n_competitors` debe ser un entero positivo si `peers.custom` es null")
+    elif isinstance(custom, list):
+        if not all(isinstance(x, str) and x for x in custom):
+            raise ValueError("`peers.custom` debe ser una lista de tickers")
+    elif isinstance(custom, dict):
+        for peer, cfg in custom.items():
+            weight = cfg.get("weight") if isinstance(cfg, dict) else None
+            if isinstance(weight, bool) or not isinstance(weight, Number):
+                raise ValueError(f"`peers.custom.{peer}` debe tener un `weight` numerico")
+    else:
+        raise ValueError("`peers.custom` debe ser null, una lista o un diccionario")
+
+
+def validate_company_request(request):
+    """Valida el body de un analisis (/api/analyze_company/), lanza `ValueError`"""
+
+    if not isinstance(request, dict):
+        raise ValueError("La request debe ser un diccionario")
+
+    ticker = request.get("ticker")
+    if not isinstance(ticker, str) or not ticker:
+        raise ValueError("`ticker` debe ser un texto no vacio")
+    if not isinstance(request.get("financial_weights"), dict):
+        raise ValueError("`financial_weights` debe ser un diccionario")
+
+    validate_peers_cfg(request.get("peers"))
@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from zoneinfo import ZoneInfo
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from constants import StaleCacheConfig
+
+
+MARKET_TZ = ZoneInfo(StaleCacheConfig.MARKET_TZ)
+
+
+def _market_time(day: date, hour_minute: tuple) -> datetime:
+    return datetime(day.year, day.month, day.day, *hour_minute, tzinfo=MARKET_TZ)
+
+
+def is_market_open(now: datetime=None) -> bool:
+    """Mercado de EEUU abierto (dias habiles, sin considerar festivos)"""
+
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if now.weekday()>=5:
+        return False
+
+    return _market_time(now.date(), StaleCacheConfig.MARKET_OPEN)<=now<_market_time(now.date(), StaleCacheConfig.MARKET_CLOSE)
+
+
+def last_market_close(now: datetime=None) -> datetime:
+    """Ultimo cierre del mercado anterior a `now`"""
+
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    day = now.date()
+    while day.weekday()>=5 or _market_time(day, StaleCacheConfig.MARKET_CLOSE)>now:
+        day -= timedelta(days=1)
+
+    return _market_time(day, StaleCacheConfig.MARKET_CLOSE)
+
+
+def price_is_fresh(refreshed_at: float, now: datetime=None) -> bool:
+    """Un precio refrescado en `refreshed_at` (timestamp) esta vigente si, con el
+    mercado abierto, tiene menos de `PRICE_FRESH_MINUTES` y, con el mercado
+    cerrado, se refresco despues del ultimo cierre. Sin stale-while-revalidate
+    se mantiene la regla de un refresco al dia."""
+
+    if not StaleCacheConfig.ENABLED:
+        return date.fromtimestamp(refreshed_at)==date.today()
+
+    now = now or datetime.now(MARKET_TZ)
+    if is_market_open(now):
+        return now.timestamp() - refreshed_at<StaleCacheConfig.PRICE_FRESH_MINUTES*60
+
+    return refreshed_at>=last_market_close(now).timestamp()
+
+
+class BackgroundRefresher:
+    """Refrescos en segundo plano de los datos servidos vencidos.
+
+    Cada refresco se identifica con una llave: mientras uno esta pendiente, los
+    siguientes con la misma llave se ignoran. Los errores solo se registran en
+    el log (los datos vencidos se siguen sirviendo hasta agotar su presupuesto).
+    """
+
+    def __init__(self, workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="revalidate")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+
+    def schedule(self, key: tuple, refresh) -> bool:
+        """Programa `refresh()` si no hay un refresco pendiente para `key`"""
+
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self.scheduled += 1
+
+        logging.info(f"Refresco en segundo plano programado: {key}")
+        self._executor.submit(self._run, key, refresh)
+
+        return True
+
+    def _run(self, key: tuple, refresh):
+        start = time.time()
+        try:
+            refresh()
+            with self._lock:
+                self.completed += 1
+            logging.info(f"Refresco en segundo plano terminado en {time.time()-start:.1f} s: {key}")
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logging.warning(f"Fallo el refresco en segundo plano {key} - {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+background_refresher = BackgroundRefresher(workers=StaleCacheConfig.REFRESH_WORKERS)
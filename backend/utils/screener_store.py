@@ -0,0 +1,167 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from constants import Multiples, ScreenerConfig
+
+
+# columnas del screener, las unicas que se pueden filtrar y ordenar
+SCREEN_FIELDS = [
+    "score_financial",
+    "score_income",
+    "score_stmt_growth",
+    "score_margins_peers",
+    "score_balance",
+    "score_cash_flow",
+    "score_price_historic",
+    "score_price_competitors",
+    "months_operation",
+    "current_ratio",
+    "quick_ratio",
+    "debt_ratio",
+    *Multiples.KPIS,
+]
+
+SCREEN_OPERATORS = {">": ">", ">=": ">=", "<": "<", "<=": "<=", "=": "=", "!=": "!="}
+
+
+def _number(value):
+    """Valor numerico para SQLite, None si no existe o es NaN"""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def screen_row_from_response(ticker: str, response: dict) -> dict:
+    """Fila del screener a partir de la respuesta (serializada) de `execute_process`"""
+
+    financials = response["financials"]
+    row = {
+        "ticker": ticker.upper(),
+        "score_financial": financials["score_final"],
+        "score_income": financials["income"]["score_final"],
+        "score_stmt_growth": financials["income"]["score_stmt_growth"],
+        "score_margins_peers": financials["income"]["score_margins_peers"],
+        "score_balance": financials["balance"]["score_final"],
+        "score_cash_flow": financials["cash_flow"]["score_final"],
+        "score_price_historic": response["price_historic"]["score_final"],
+        "score_price_competitors": response["price_competitors"]["score_final"].get(ticker),
+    }
+    for kpi in ["months_operation", "current_ratio", "quick_ratio", "debt_ratio"]:
+        row[kpi] = financials["balance"][kpi]["value"]
+    for multiplo, detail in response["price_historic"]["detail_multiples"].items():
+        row[multiplo] = detail["current_value"]
+
+    row = {k: v if k=="ticker" else _number(v) for k, v in row.items()}
+    row["peers"] = list(response["peers"])
+
+    return row
+
+
+class ScreenerStore:
+    """Scores y ratios precalculados de un universo de tickers, en SQLite con
+    indices por columna, para consultas de filtro/orden sin descargas"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        columns = ", ".join(f"{field} REAL" for field in SCREEN_FIELDS)
+        with self._connection() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS screen (
+                    ticker TEXT PRIMARY KEY,
+                    {columns},
+                    peers TEXT,
+                    updated_at REAL
+                )
+            """)
+            for field in SCREEN_FIELDS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_screen_{field} ON screen ({field})")
+
+    def _connection(self):
+        # una conexion por hilo, sqlite no permite compartirlas
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, row: dict):
+        fields = ["ticker", *SCREEN_FIELDS, "peers", "updated_at"]
+        values = [row["ticker"], *[row.get(x) for x in SCREEN_FIELDS], json.dumps(row["peers"]), time.time()]
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO screen ({', '.join(fields)}) VALUES ({', '.join('?'*len(fields))})",
+                values
+            )
+
+    def query(self, filters: list=None, sort: str="score_financial", order: str="desc", limit: int=50) -> list:
+        """Filas que cumplen todos los filtros, ordenadas y limitadas.
+
+        Arguments
+        ---------
+        filters (list): [{"field": ..., "op": ">", "value": 7}, ...], `field` de `SCREEN_FIELDS`
+        sort (str): columna de `SCREEN_FIELDS` para ordenar
+        order (str): asc o desc
+        limit (int): maximo de filas, acotado por `ScreenerConfig.MAX_LIMIT`
+        """
+        if filters is not None and not isinstance(filters, list):
+            raise ValueError("`filters` debe ser una lista")
+
+        where, params = [], []
+        for condition in filters or []:
+            if not isinstance(condition, dict):
+                raise ValueError(f"Cada filtro debe ser un diccionario con field, op y value: {condition}")
+            field, op = condition.get("field"), condition.get("op")
+            if field not in SCREEN_FIELDS:
+                raise ValueError(f"Campo no soportado: {field}")
+            if op not in SCREEN_OPERATORS:
+                raise ValueError(f"Operador no soportado: {op}")
+            where.append(f"{field} {SCREEN_OPERATORS[op]} ?")
+            params.append(float(condition["value"]))
+
+        if sort not in SCREEN_FIELDS:
+            raise ValueError(f"Campo no soportado para ordenar: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Orden no soportado: {order}")
+
+        sql = "SELECT * FROM screen"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {sort} IS NULL, {sort} {order.upper()}, ticker LIMIT ?"
+        params.append(max(0, min(int(limit), ScreenerConfig.MAX_LIMIT)))
+
+        rows = self._connection().execute(sql, params).fetchall()
+
+        return [{**dict(row), "peers": json.loads(row["peers"])} for row in rows]
+
+    def stats(self) -> dict:
+        count, last_update = self._connection().execute(
+            "SELECT COUNT(*), MAX(updated_at) FROM screen"
+        ).fetchone()
+        return {"tickers": count, "updated_at": last_update}
+
+
+_screener_store = None
+_screener_store_lock = threading.Lock()
+
+
+def get_screener_store():
+    """Instancia compartida del store del screener"""
+    global _screener_store
+
+    with _screener_store_lock:
+        if _screener_store is None:
+            _screener_store = ScreenerStore(path=ScreenerConfig.PATH)
+
+    return _screener_store
@@ -0,0 +1,62 @@
+import logging
+import threading
+from concurrent.futures import Future
+from utils.metrics import SINGLE_FLIGHT_COALESCED
+
+
+class SingleFlight:
+    """Une las descargas concurrentes de un mismo recurso en todo el proceso.
+
+    A diferencia de `FetchContext` (memoria de una sola request), no guarda
+    resultados: mientras una descarga esta en curso, los demas llamados con la
+    misma llave (de cualquier request o hilo) esperan su resultado en vez de
+    repetirla. Al terminar la llave se libera, y un error se entrega a todos
+    los que esperaban sin quedar guardado.
+
+    El valor retornado es el mismo objeto para todos, quien lo use debe
+    copiarlo antes de modificarlo.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: tuple, loader):
+        """Ejecuta `loader` o espera el resultado de la ejecucion en curso para `key`"""
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                self.executed += 1
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not is_owner:
+            logging.info(f"SingleFlight: esperando descarga en curso {key}")
+            SINGLE_FLIGHT_COALESCED.labels(kind=key[0]).inc()
+            return future.result()
+
+        try:
+            future.set_result(loader())
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return future.result()
+
+    def stats(self) -> dict:
+        """Descargas ejecutadas y unidas a una en curso (descargas ahorradas)"""
+        with self._lock:
+            in_flight = len(self._in_flight)
+
+        return {"in_flight": in_flight, "executed": self.executed, "coalesced": self.coalesced}
+
+
+single_flight = SingleFlight()
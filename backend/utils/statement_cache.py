@@ -0,0 +1,163 @@
+import os
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+import pandas as pd
+from datetime import datetime, timedelta
+from constants import StatementCacheConfig, StaleCacheConfig
+
+
+class StatementCache:
+    """Cache persistente (SQLite) para el html crudo y las tablas parseadas
+    de los estados financieros de stockanalysis.
+
+    Cada entrada tiene una fecha de expiracion (la fecha esperada del siguiente
+    reporte de la empresa) y el tamaño total del cache se limita eliminando
+    las entradas usadas hace mas tiempo (LRU). Las entradas vencidas se
+    conservan `stale_seconds` mas, para servirlas mientras se refrescan.
+    """
+
+    def __init__(self, path: str, max_bytes: int, stale_seconds: float=0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS statements (
+                    key TEXT PRIMARY KEY,
+                    ticker TEXT,
+                    data_type TEXT,
+                    is_ttm INTEGER,
+                    payload BLOB,
+                    size INTEGER,
+                    expires_at REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_statements_access ON statements (last_access)")
+
+    def _connection(self):
+        # una conexion por hilo, sqlite no permite compartirlas
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(kind: str, ticker: str, data_type: str, is_ttm: bool, kpis: list=None) -> str:
+        key = f"{kind}|{ticker.upper()}|{data_type}|{int(is_ttm)}"
+        if kpis is not None:
+            key += "|" + ",".join(kpis)
+        return key
+
+    def get(self, key: str):
+        """Retorna el valor guardado o None si no existe o ya expiro"""
+
+        entry = self.get_entry(key, allow_stale=False)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key: str, allow_stale: bool=True):
+        """Retorna `(valor, expires_at)` o None si no existe o ya expiro. Con
+        `allow_stale` tambien retorna las entradas vencidas hace menos de
+        `stale_seconds`"""
+
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM statements WHERE key=?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, expires_at = row
+            if expires_at + self.stale_seconds<=now:
+                conn.execute("DELETE FROM statements WHERE key=?", (key,))
+                logging.info(f"StatementCache expirado: {key}")
+                return None
+            if expires_at<=now and not allow_stale:
+                return None
+
+            conn.execute("UPDATE statements SET last_access=? WHERE key=?", (now, key))
+
+        return pickle.loads(payload), expires_at
+
+    def set(self, key: str, value, ticker: str, data_type: str, is_ttm: bool, expires_at: float):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO statements VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, ticker.upper(), data_type, int(is_ttm), payload, len(payload), expires_at, time.time())
+            )
+        self._evict()
+
+    def _evict(self):
+        """Elimina las entradas usadas hace mas tiempo hasta respetar el tamaño maximo"""
+
+        with self._connection() as conn:
+            conn.execute("DELETE FROM statements WHERE expires_at<=?", (time.time() - self.stale_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM statements").fetchone()[0]
+            if total<=self.max_bytes:
+                return
+
+            rows = conn.execute("SELECT key, size FROM statements ORDER BY last_access").fetchall()
+            evicted = []
+            for key, size in rows:
+                if total<=self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM statements WHERE key=?", evicted)
+
+        logging.info(f"StatementCache: {len(evicted)} entradas eliminadas por tamaño (LRU)")
+
+
+def next_expected_filing(earning_dates, is_ttm: bool) -> float:
+    """Fecha (timestamp) en la que se espera el siguiente reporte de la empresa,
+    a partir del ultimo `earning_date` de la tabla parseada"""
+
+    freq = "ttm" if is_ttm else "annual"
+    last_period = pd.to_datetime(pd.Index(earning_dates)).max()
+    expected = (
+        last_period
+        + timedelta(days=StatementCacheConfig.PERIOD_DAYS[freq])
+        + timedelta(days=StatementCacheConfig.FILING_LAG_DAYS[freq])
+    ).to_pydatetime()
+
+    # la empresa esta atrasada con el reporte: revisamos pronto de nuevo
+    retry = datetime.now() + timedelta(hours=StatementCacheConfig.RETRY_TTL_HOURS)
+    if pd.isnull(last_period) or expected<retry:
+        expected = retry
+
+    return expected.timestamp()
+
+
+_statement_cache = None
+_statement_cache_lock = threading.Lock()
+
+
+def get_statement_cache():
+    """Instancia compartida del cache, None si esta deshabilitado"""
+    global _statement_cache
+
+    if not StatementCacheConfig.ENABLED:
+        return None
+
+    with _statement_cache_lock:
+        if _statement_cache is None:
+            _statement_cache = StatementCache(
+                path=StatementCacheConfig.PATH,
+                max_bytes=StatementCacheConfig.MAX_BYTES,
+                stale_seconds=StaleCacheConfig.STATEMENT_STALE_DAYS*86400 if StaleCacheConfig.ENABLED else 0
+            )
+
+    return _statement_cache
@@ -0,0 +1,147 @@
+import re
+import logging
+import pandas as pd
+from io import BytesIO
+from lxml.html import HTMLParser, fromstring
+
+
+_RE_TABLE = re.compile(rb"<table\b.*?</table\s*>", re.IGNORECASE | re.DOTALL)
+_RE_TABLE_OPEN = re.compile(rb"<table\b", re.IGNORECASE)
+_RE_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+# mismo criterio de espacios de pd.read_html
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+# fecha de cierre del periodo en el encabezado (ej: "Dec '23 Dec 31, 2023")
+_RE_PERIOD_DATE = re.compile(r"[A-Z][a-z]{2} \d{1,2}, \d{4}")
+# periodos bloqueados de stockanalysis (requieren una cuenta paga)
+LOCKED_CELL = "Upgrade"
+
+
+def _find_first_table(html_data: bytes):
+    """Fragmento html de la primera tabla de la pagina, None si no se puede
+    aislar de forma segura (tablas anidadas u ocultas)"""
+
+    match = _RE_TABLE.search(html_data)
+    if match is None:
+        return None
+
+    fragment = match.group(0)
+    opening_tag = fragment[:fragment.index(b">") + 1]
+    if len(_RE_TABLE_OPEN.findall(fragment))>1 or b"display:none" in opening_tag.replace(b" ", b""):
+        return None
+
+    return fragment
+
+
+def _cell_texts(row) -> list:
+    return [
+        _RE_WHITESPACE.sub(" ", cell.text_content().strip())
+        for cell in row.xpath("./td|./th")
+    ]
+
+
+def _table_rows(table):
+    """Filas de texto del encabezado y del cuerpo de la tabla, None si la tabla
+    tiene una estructura que requiere el parser completo (colspan/rowspan, sin thead)"""
+
+    # mismo tratamiento de elementos ocultos y saltos de linea de pd.read_html
+    for br in table.xpath(".//br"):
+        br.tail = "\n" + (br.tail or "")
+    for elem in table.xpath(".//style"):
+        elem.drop_tree()
+    for elem in table.xpath(".//*[@style]"):
+        if "display:none" in elem.attrib.get("style", "").replace(" ", ""):
+            elem.drop_tree()
+
+    if table.xpath(".//*[@colspan or @rowspan]") or table.xpath(".//tfoot"):
+        return None
+
+    head_rows = table.xpath("./thead/tr")
+    body_rows = table.xpath("./tbody//tr") + table.xpath("./tr")
+    if not head_rows:
+        return None
+
+    head = [_cell_texts(tr) for tr in head_rows]
+    body = [_cell_texts(tr) for tr in body_rows]
+
+    return head, body
+
+
+def _read_html_rows(html_data: bytes, encoding: str=None):
+    """Filas de texto de la primera tabla segun `pd.read_html`"""
+
+    table = pd.read_html(BytesIO(html_data), encoding=encoding)[0]
+    columns = [x if isinstance(x, tuple) else (x,) for x in table.columns]
+    head = [[str(column[level]) for column in columns] for level in range(len(columns[0]))]
+    body = [["" if pd.isnull(x) else str(x) for x in row] for row in table.itertuples(index=False)]
+
+    return head, body
+
+
+def rows_to_statement(head: list, body: list) -> pd.DataFrame:
+    """Estado financiero tipado a partir de las filas de texto de la tabla.
+
+    Return
+    ------
+    statement (pd.DataFrame): un periodo por fila, indexado por `earning_date`
+        (datetime, en el orden de la pagina) y un indicador (float) por columna.
+        Las celdas sin valor numerico ("-", vacias) quedan en NaN y los periodos
+        bloqueados ("Upgrade") y sin fecha de cierre se descartan
+    """
+    n_cols = max(len(row) for row in head + body)
+
+    # fecha de cierre de cada columna de periodos, buscada en todas las filas del encabezado
+    dates = []
+    for i in range(1, n_cols):
+        texts = " ".join(row[i] for row in head if i<len(row))
+        match = _RE_PERIOD_DATE.search(texts)
+        dates.append(pd.to_datetime(match.group(0), format="%b %d, %Y") if match else pd.NaT)
+
+    labels = [row[0] if row else "" for row in body]
+    cells = [row[1:] + [""]*(n_cols - len(row)) for row in body]
+
+    statement = pd.DataFrame(cells, index=labels, columns=pd.DatetimeIndex(dates, name="earning_date")).T
+    statement.columns.name = None
+    # indicadores repetidos en la pagina: se conserva el primero
+    statement = statement.loc[:, ~statement.columns.duplicated()]
+
+    locked = (statement==LOCKED_CELL).any(axis=1) | statement.index.isna()
+    if locked.any():
+        logging.info(f"Periodos bloqueados o sin fecha descartados: {int(locked.sum())}")
+        statement = statement[~locked.to_numpy()]
+
+    numbers = statement.apply(lambda x: x.str.replace(",", "", regex=False).str.rstrip("%"))
+
+    return numbers.apply(pd.to_numeric, errors="coerce").astype(float)
+
+
+def read_html_statement(html_data: bytes, encoding: str=None) -> pd.DataFrame:
+    """Estado financiero a partir de la primera tabla de `pd.read_html` (parseo
+    de toda la pagina), para las tablas que no se pueden extraer de forma directa"""
+    return rows_to_statement(*_read_html_rows(html_data, encoding=encoding))
+
+
+def extract_statement_table(html_data: bytes) -> pd.DataFrame:
+    """Extrae el estado financiero de una pagina de stockanalysis (ver
+    `rows_to_statement` para el formato).
+
+    En lugar de construir el DOM de toda la pagina y convertir todas sus tablas
+    (como `pd.read_html`), se aisla el fragmento de la primera tabla y solo
+    este se parsea; si la tabla tiene una estructura no soportada se usa `pd.read_html`.
+    """
+    fragment = _find_first_table(html_data)
+    if fragment is not None:
+        charset = _RE_CHARSET.search(html_data[:html_data.find(fragment)])
+        encoding = charset.group(1).decode() if charset else "utf-8"
+        try:
+            table = fromstring(fragment, parser=HTMLParser(recover=True, encoding=encoding))
+            rows = _table_rows(table)
+            if rows is not None:
+                return rows_to_statement(*rows)
+        except Exception as e:
+            logging.warning(f"No se pudo extraer la tabla de forma directa - {e}")
+
+        logging.info("Estructura de tabla no soportada, usando pd.read_html sobre la tabla")
+        return read_html_statement(fragment, encoding=encoding)
+
+    logging.info("No se encontro una tabla aislable, usando pd.read_html sobre la pagina")
+    return read_html_statement(html_data)
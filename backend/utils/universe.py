@@ -0,0 +1,6 @@
+def load_universe(path: str) -> list:
+    """Tickers del universo, uno por linea (se ignoran lineas vacias y comentarios #)"""
+    with open(path) as f:
+        tickers = [line.split("#")[0].strip().upper() for line in f]
+
+    return list(dict.fromkeys(x for x in tickers if x))